@@ -0,0 +1,320 @@
+import heapq
+import re
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from DistanceMatrix import DistanceMatrix
+from Truck import Truck
+
+# Packages flagged with a wrong address stay at the hub until the corrected address arrives.
+ADDRESS_CORRECTION_TIME = timedelta(hours=10, minutes=20)
+
+# Number of times trucks are re-centered on their assigned stops and unpinned packages reassigned.
+DEFAULT_REFINEMENT_ROUNDS = 2
+
+# Largest number of stops sampled when re-centering a truck on its assigned stops.
+MEDOID_SAMPLE_SIZE = 64
+
+_TRUCK_PATTERN = re.compile(r"can only be on truck\s+(\d+)", re.IGNORECASE)
+_DELAY_PATTERN = re.compile(r"until\s+(\d{1,2}):(\d{2})\s*([ap]m)", re.IGNORECASE)
+_GROUP_PATTERN = re.compile(r"must be delivered with\s+([\d,\s]+)", re.IGNORECASE)
+_WRONG_ADDRESS_PATTERN = re.compile(r"wrong address", re.IGNORECASE)
+
+
+class PackageConstraints:
+    def __init__(self, required_truck: Optional[int] = None, available_time: timedelta = timedelta(),
+                 delivered_with: Optional[List[int]] = None, wrong_address: bool = False):
+        """
+        Initializes the constraints parsed from a package's special instructions.
+
+        :param required_truck: Number (1-based) of the only truck that may carry the package, or None.
+        :param available_time: Earliest time the package is at the hub and can leave on a truck.
+        :param delivered_with: IDs of packages that must be on the same truck.
+        :param wrong_address: Whether the listed address is wrong and will be corrected later.
+        """
+        self.required_truck = required_truck
+        self.available_time = available_time
+        self.delivered_with = delivered_with if delivered_with is not None else []
+        self.wrong_address = wrong_address
+
+
+def parse_special_notes(notes: str, address_correction_time: timedelta = ADDRESS_CORRECTION_TIME) \
+        -> PackageConstraints:
+    """
+    Parses the special-instruction column of the package file.
+
+    Recognized instructions:
+    - "Can only be on truck 2"
+    - "Delayed on flight---will not arrive to depot until 9:05 am"
+    - "Must be delivered with 15, 19"
+    - "Wrong address listed" (the package is held until address_correction_time)
+
+    :param notes: The special instructions, possibly empty.
+    :param address_correction_time: When corrected addresses become known.
+    :return: The parsed constraints.
+    :rtype: PackageConstraints
+    """
+    constraints = PackageConstraints()
+    if not notes:
+        return constraints
+
+    truck_match = _TRUCK_PATTERN.search(notes)
+    if truck_match:
+        constraints.required_truck = int(truck_match.group(1))
+
+    delay_match = _DELAY_PATTERN.search(notes)
+    if delay_match:
+        hour, minute, meridiem = int(delay_match.group(1)), int(delay_match.group(2)), delay_match.group(3).lower()
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+        constraints.available_time = timedelta(hours=hour, minutes=minute)
+
+    group_match = _GROUP_PATTERN.search(notes)
+    if group_match:
+        constraints.delivered_with = [int(number) for number in re.findall(r"\d+", group_match.group(1))]
+
+    if _WRONG_ADDRESS_PATTERN.search(notes):
+        constraints.wrong_address = True
+        constraints.available_time = max(constraints.available_time, address_correction_time)
+
+    return constraints
+
+
+class _Unit:
+    """Packages that must travel on the same truck, with their combined constraints."""
+
+    __slots__ = ("package_ids", "locations", "required_truck", "available_seconds", "deadline_seconds",
+                 "hub_miles", "pinned_truck", "seed_distances")
+
+    def __init__(self):
+        self.package_ids = []
+        self.locations = []
+        self.required_truck = None
+        self.available_seconds = 0.0
+        self.deadline_seconds = float('inf')
+        self.hub_miles = 0.0
+        self.pinned_truck = None
+        self.seed_distances = None
+
+
+def _find(parents: Dict[int, int], package_id: int) -> int:
+    # Union-find root lookup with path halving.
+    while parents[package_id] != package_id:
+        parents[package_id] = parents[parents[package_id]]
+        package_id = parents[package_id]
+    return package_id
+
+
+def _build_units(packages: list, constraints: Dict[int, PackageConstraints]) -> List[_Unit]:
+    """
+    Merges "must be delivered with" groups (transitively) into units.
+
+    :raises: ValueError if a group's members require different trucks.
+    """
+    parents = {package.package_id: package.package_id for package in packages}
+    for package in packages:
+        for other_id in constraints[package.package_id].delivered_with:
+            if other_id in parents:
+                root_a, root_b = _find(parents, package.package_id), _find(parents, other_id)
+                if root_a != root_b:
+                    parents[root_b] = root_a
+
+    units_by_root: Dict[int, _Unit] = {}
+    for package in packages:
+        unit = units_by_root.setdefault(_find(parents, package.package_id), _Unit())
+        package_constraints = constraints[package.package_id]
+        deadline = package.deadline_time
+
+        unit.package_ids.append(package.package_id)
+        if package.location_index not in unit.locations:
+            unit.locations.append(package.location_index)
+        unit.available_seconds = max(unit.available_seconds, package_constraints.available_time.total_seconds())
+        unit.deadline_seconds = min(unit.deadline_seconds,
+                                    deadline.hour * 3600 + deadline.minute * 60 + deadline.second)
+
+        required = package_constraints.required_truck
+        if required is not None:
+            if unit.required_truck is not None and unit.required_truck != required:
+                raise ValueError(f"Packages {unit.package_ids} must be delivered together but require "
+                                 f"trucks {unit.required_truck} and {required}.")
+            unit.required_truck = required
+
+    return list(units_by_root.values())
+
+
+def _medoid(locations: List[int], distance_matrix: DistanceMatrix) -> int:
+    """
+    Returns the location (from a bounded sample) with the smallest total distance to all locations.
+
+    Time Complexity:
+        O(n * s) where n is the number of locations and s is MEDOID_SAMPLE_SIZE.
+    """
+    step = max(1, len(locations) // MEDOID_SAMPLE_SIZE)
+    candidates = locations[::step]
+    return min(candidates, key=lambda candidate: sum(map(distance_matrix.row(candidate).__getitem__, locations)))
+
+
+def _farthest_point_seeds(count: int, units: List[_Unit], fixed_seeds: List[int], hub_location: int,
+                          distance_matrix: DistanceMatrix) -> List[int]:
+    """
+    Picks `count` seed locations spread across the unit locations, each as far as possible from
+    the hub and from the seeds chosen before it.
+
+    Time Complexity:
+        O(count * u) where u is the number of units.
+    """
+    locations = list({unit.locations[0] for unit in units})
+    seed_rows = [distance_matrix.row(seed) for seed in fixed_seeds + [hub_location]]
+    nearest = [min(row[location] for row in seed_rows) for location in locations]
+
+    seeds = []
+    for _ in range(min(count, len(locations))):
+        best = max(range(len(locations)), key=nearest.__getitem__)
+        seed = locations[best]
+        seeds.append(seed)
+        seed_row = distance_matrix.row(seed)
+        for index, location in enumerate(locations):
+            distance = seed_row[location]
+            if distance < nearest[index]:
+                nearest[index] = distance
+    return seeds
+
+
+def assign_packages(trucks: List[Truck], packages: list, distance_matrix: DistanceMatrix, hub_location: int,
+                    refinement_rounds: int = DEFAULT_REFINEMENT_ROUNDS,
+                    address_correction_time: timedelta = ADDRESS_CORRECTION_TIME) -> List[int]:
+    """
+    Assigns packages to trucks, filling each truck's package list.
+
+    The special instructions of every package are parsed first. Packages that must be delivered
+    together become one unit. Each unit can only go on a truck that has room for it, that it is
+    allowed on ("Can only be on truck N", numbered from 1 in list order) and that departs after the
+    unit reaches the hub. Units with a deadline prefer trucks that can reach them in time on a direct
+    drive from the hub.
+
+    Trucks are then clustered around seed stops: trucks holding pinned units (those with only one
+    possible truck) are centered on them, the rest get seeds spread across the service area.
+    Deadline units are placed first, earliest deadline first, and the others in order of regret
+    (how much worse their second-best truck is). Each refinement round re-centers every truck on
+    the medoid of its stops and reassigns the unpinned units.
+
+    :param trucks: The trucks to fill. Their capacity and depart_time are respected.
+    :param packages: The packages to assign. Each must have location_index, deadline_time and notes.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param hub_location: Location index of the hub the trucks leave from.
+    :param refinement_rounds: Number of re-centering rounds.
+    :param address_correction_time: When corrected addresses become known.
+    :return: IDs of packages that could not be placed on any truck (empty if all fit).
+    :rtype: list
+    :raises: ValueError if packages that must travel together require different trucks.
+
+    Time Complexity:
+        O(u * t * r) where u is the number of units, t the number of trucks and r the number of rounds.
+    Space Complexity:
+        O(u * t)
+    """
+    constraints = {package.package_id: parse_special_notes(getattr(package, "notes", ""), address_correction_time)
+                   for package in packages}
+    units = _build_units(packages, constraints)
+    truck_count = len(trucks)
+    depart_seconds = [truck.depart_time.total_seconds() for truck in trucks]
+
+    def eligible_trucks(unit: _Unit) -> List[int]:
+        if unit.required_truck is not None:
+            candidates = [unit.required_truck - 1] if 0 < unit.required_truck <= truck_count else []
+        else:
+            candidates = range(truck_count)
+        return [index for index in candidates
+                if depart_seconds[index] >= unit.available_seconds
+                and len(unit.package_ids) <= trucks[index].capacity]
+
+    def reaches_in_time(unit: _Unit, index: int) -> bool:
+        return depart_seconds[index] + unit.hub_miles / trucks[index].speed * 3600 <= unit.deadline_seconds
+
+    hub_row = distance_matrix.row(hub_location)
+    for unit in units:
+        unit.hub_miles = max(hub_row[location] for location in unit.locations)
+
+    # Units with the same truck restriction, availability and size share one eligibility list.
+    eligible_lists = {}
+    eligible = {}
+    for unit in units:
+        key = (unit.required_truck, unit.available_seconds, len(unit.package_ids))
+        if key not in eligible_lists:
+            eligible_lists[key] = eligible_trucks(unit)
+        eligible[id(unit)] = eligible_lists[key]
+    for unit in units:
+        if len(eligible[id(unit)]) == 1:
+            unit.pinned_truck = eligible[id(unit)][0]
+
+    # Seed trucks with pinned units on their pinned stops, the others across the remaining area.
+    pinned_locations: List[List[int]] = [[] for _ in trucks]
+    for unit in units:
+        if unit.pinned_truck is not None:
+            pinned_locations[unit.pinned_truck].extend(unit.locations)
+    seeds: List[Optional[int]] = [_medoid(locations, distance_matrix) if locations else None
+                                  for locations in pinned_locations]
+    free_trucks = [index for index, seed in enumerate(seeds) if seed is None]
+    spread = _farthest_point_seeds(len(free_trucks), units, [seed for seed in seeds if seed is not None],
+                                   hub_location, distance_matrix)
+    for index, seed in zip(free_trucks, spread):
+        seeds[index] = seed
+    seeds = [seed if seed is not None else hub_location for seed in seeds]
+
+    unassigned: List[_Unit] = []
+    for _ in range(max(1, refinement_rounds + 1)):
+        loads = [0] * truck_count
+        members: List[List[_Unit]] = [[] for _ in trucks]
+        unassigned = []
+
+        def place(unit: _Unit, options) -> bool:
+            for index in options:
+                if loads[index] + len(unit.package_ids) <= trucks[index].capacity:
+                    loads[index] += len(unit.package_ids)
+                    members[index].append(unit)
+                    return True
+            return False
+
+        seed_rows = [distance_matrix.row(seed) for seed in seeds]
+        for unit in units:
+            if len(unit.locations) == 1:
+                location = unit.locations[0]
+                unit.seed_distances = [row[location] for row in seed_rows]
+            else:
+                unit.seed_distances = [min(row[location] for location in unit.locations) for row in seed_rows]
+
+        def ranked(unit: _Unit) -> List[int]:
+            return sorted(eligible[id(unit)], key=unit.seed_distances.__getitem__)
+
+        def regret(unit: _Unit) -> float:
+            costs = heapq.nsmallest(2, (unit.seed_distances[index] for index in eligible[id(unit)]))
+            return costs[1] - costs[0] if len(costs) > 1 else float('inf')
+
+        # Pinned units first, then deadline units by deadline, then the rest by descending regret.
+        pinned = [unit for unit in units if unit.pinned_truck is not None]
+        timed = sorted((unit for unit in units if unit.pinned_truck is None and unit.deadline_seconds != float('inf')),
+                       key=lambda unit: (unit.deadline_seconds, -len(unit.package_ids)))
+        untimed = sorted((unit for unit in units
+                          if unit.pinned_truck is None and unit.deadline_seconds == float('inf')),
+                         key=lambda unit: (-regret(unit), -len(unit.package_ids)))
+
+        for unit in pinned:
+            if not place(unit, [unit.pinned_truck]):
+                unassigned.append(unit)
+        for unit in timed:
+            options = ranked(unit)
+            on_time = (index for index in options if reaches_in_time(unit, index))
+            if not place(unit, on_time) and not place(unit, options):
+                unassigned.append(unit)
+        for unit in untimed:
+            if not place(unit, ranked(unit)):
+                unassigned.append(unit)
+
+        # Re-center each truck on the medoid of its assigned stops for the next round.
+        seeds = [_medoid([location for unit in assigned for location in unit.locations], distance_matrix)
+                 if assigned else seeds[index] for index, assigned in enumerate(members)]
+
+    for truck, assigned in zip(trucks, members):
+        truck.packages.clear()
+        truck.packages.extend(sorted(package_id for unit in assigned for package_id in unit.package_ids))
+
+    return sorted(package_id for unit in unassigned for package_id in unit.package_ids)
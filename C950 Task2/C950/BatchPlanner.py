@@ -0,0 +1,380 @@
+import csv
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional
+
+from BatchQuery import parse_time
+from DistanceMatrix import DistanceMatrix
+from ScenarioCache import input_checksum
+from ShortestPaths import close_distance_matrix
+from TimeModel import format_seconds
+
+# File names looked for in the manifest directory tree. A directory with a package file is a
+# manifest; its address and distance tables are the nearest ones in it or a parent directory.
+PACKAGE_FILE_NAME = "PackageFile.csv"
+ADDRESS_FILE_NAME = "AddressFile.csv"
+DISTANCE_FILE_NAME = "DistanceFile.csv"
+
+# Optional fleet of a manifest, found the same way: one row per truck with its departure time and
+# optionally its capacity and speed (blank for the configured ones), under a header row.
+FLEET_FILE_NAME = "FleetFile.csv"
+FLEET_FIELDS = ["departure", "capacity", "speed"]
+
+# Workers are replaced after this many manifests, so memory held by one manifest cannot pile up.
+MAX_JOBS_PER_WORKER = 32
+
+# Manifests submitted but not finished, per worker. Distance tables are only kept in shared memory
+# while one of their manifests is in flight, which bounds the tables alive at once.
+JOBS_IN_FLIGHT_PER_WORKER = 2
+
+# Shared distance tables a worker keeps mapped between manifests.
+WORKER_TABLE_SLOTS = 4
+
+SUMMARY_FIELDS = ["manifest", "hub", "hub_address", "packages", "rejected_rows", "trucks", "mileage", "on_time",
+                  "late", "unassigned", "finish_time", "plan_seconds", "error"]
+
+# The distance tables mapped by a worker process: shared memory name -> (segment, float view, matrix), least
+# recently used first.
+_worker_tables: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+class Manifest:
+    __slots__ = ("name", "hub", "package_file", "address_file", "distance_file", "fleet_file")
+
+    def __init__(self, name: str, hub: str, package_file: str, address_file: Optional[str],
+                 distance_file: Optional[str], fleet_file: Optional[str] = None):
+        """
+        One day's package file at one hub.
+
+        :param name: Path of the manifest directory relative to the manifest root ("." for the root itself).
+        :param hub: Path of the directory holding the manifest's tables, relative to the manifest root.
+        :param package_file: The package CSV file.
+        :param address_file: The hub's address table, or None if none was found.
+        :param distance_file: The hub's distance table, or None if none was found.
+        :param fleet_file: The manifest's fleet file, or None to plan with the configured fleet.
+        """
+        self.name = name
+        self.hub = hub
+        self.package_file = package_file
+        self.address_file = address_file
+        self.distance_file = distance_file
+        self.fleet_file = fleet_file
+
+
+def find_manifests(root: str) -> List[Manifest]:
+    """
+    Finds every manifest under a directory, in sorted path order. A typical layout is one
+    directory per hub holding its AddressFile.csv and DistanceFile.csv, with one subdirectory per
+    day holding that day's PackageFile.csv; a directory holding all three files also works. A
+    FleetFile.csv is looked up the same way, independently of the tables.
+
+    :param root: The manifest directory.
+    :return: The manifests found.
+    :rtype: list
+    """
+    root = os.path.abspath(root)
+    manifests = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        if PACKAGE_FILE_NAME not in files:
+            continue
+        address_file, distance_file = _find_tables(directory, root)
+        hub = os.path.relpath(os.path.dirname(address_file), root) if address_file is not None else ""
+        manifests.append(Manifest(os.path.relpath(directory, root), hub, os.path.join(directory, PACKAGE_FILE_NAME),
+                                  address_file, distance_file, _find_nearest(directory, root, FLEET_FILE_NAME)[0]))
+    return manifests
+
+
+def _find_tables(directory: str, root: str) -> tuple:
+    return _find_nearest(directory, root, ADDRESS_FILE_NAME, DISTANCE_FILE_NAME)
+
+
+def _find_nearest(directory: str, root: str, *names: str) -> tuple:
+    # The nearest directory, from this one up to the root, that holds all the named files.
+    while True:
+        paths = tuple(os.path.join(directory, name) for name in names)
+        if all(os.path.isfile(path) for path in paths):
+            return paths
+        if directory == root or os.path.dirname(directory) == directory:
+            return (None,) * len(names)
+        directory = os.path.dirname(directory)
+
+
+def load_fleet(path: str) -> List[tuple]:
+    """
+    Reads a fleet file: a header row naming the columns departure, capacity and speed, then one
+    row per truck in truck number order. Capacity and speed may be left blank (or left out).
+
+    :param path: The fleet CSV file.
+    :return: (departure, capacity or None, speed or None) of each truck.
+    :rtype: list
+    :raises: ValueError if a row is invalid or there are no trucks.
+    """
+    fleet = []
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames is None or "departure" not in reader.fieldnames:
+            raise ValueError(f"{path}: expected a header row with the columns {', '.join(FLEET_FIELDS)}.")
+        for row in reader:
+            try:
+                departure = parse_time(row["departure"] or "")
+                capacity = int(row["capacity"]) if (row.get("capacity") or "").strip() else None
+                speed = float(row["speed"]) if (row.get("speed") or "").strip() else None
+            except ValueError as error:
+                raise ValueError(f"{path}, line {reader.line_num}: {error}") from None
+            if (capacity is not None and capacity < 1) or (speed is not None and speed <= 0):
+                raise ValueError(f"{path}, line {reader.line_num}: capacity and speed must be positive.")
+            fleet.append((departure, capacity, speed))
+    if not fleet:
+        raise ValueError(f"{path}: no trucks.")
+    return fleet
+
+
+def _attach_table(memory_name: str, size: int, addresses: List[str]) -> DistanceMatrix:
+    """Maps a shared distance table into this worker, keeping the most recently used few mapped."""
+    entry = _worker_tables.get(memory_name)
+    if entry is None:
+        # Workers share the parent's resource tracker, so the parent's unlink is the only cleanup needed.
+        memory = shared_memory.SharedMemory(name=memory_name)
+        view = memory.buf.cast('d')
+        matrix = DistanceMatrix(size, view[:size * size], addresses)
+        entry = _worker_tables[memory_name] = (memory, view, matrix)
+        while len(_worker_tables) > WORKER_TABLE_SLOTS:
+            _, (old_memory, old_view, old_matrix) = _worker_tables.popitem(last=False)
+            # Views into the segment must be released before it can be unmapped.
+            old_matrix.distances.release()
+            old_view.release()
+            old_memory.close()
+    _worker_tables.move_to_end(memory_name)
+    return entry[2]
+
+
+def _error_row(manifest: Manifest, error: Exception) -> dict:
+    return {"manifest": manifest.name, "hub": manifest.hub, "error": f"{type(error).__name__}: {error}"}
+
+
+def _plan_one(plan_function: Callable, manifest: Manifest, distance_matrix: DistanceMatrix,
+              output_directory: str) -> dict:
+    # Plans one manifest and writes its plan file; failures become a summary row with the error.
+    started = time.perf_counter()
+    hub_address = distance_matrix.addresses[0]
+    row = {"manifest": manifest.name, "hub": manifest.hub, "hub_address": hub_address}
+    try:
+        fleet = load_fleet(manifest.fleet_file) if manifest.fleet_file is not None else None
+        plan, report = plan_function(distance_matrix, manifest.package_file, hub_address, fleet)
+        deadline_report = plan.deadline_report()
+        finish = max((truck.time.total_seconds() for truck in plan.trucks), default=0.0)
+        row.update({
+            "packages": len(plan.package_table),
+            "rejected_rows": report.error_count,
+            "trucks": len(plan.trucks),
+            "mileage": round(plan.total_mileage, 1),
+            "on_time": deadline_report.on_time,
+            "late": deadline_report.late,
+            "unassigned": len(plan.unassigned_packages),
+            "finish_time": format_seconds(finish),
+        })
+        write_plan(os.path.join(output_directory, manifest.name, "plan.json"), manifest, plan, report,
+                   deadline_report)
+    except Exception as error:  # One bad manifest must not stop the batch.
+        row.update(_error_row(manifest, error))
+    row["plan_seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def _plan_in_worker(plan_function: Callable, manifest: Manifest, table: tuple, output_directory: str) -> dict:
+    memory_name, size, addresses = table
+    return _plan_one(plan_function, manifest, _attach_table(memory_name, size, addresses), output_directory)
+
+
+def write_plan(path: str, manifest: Manifest, plan, report, deadline_report):
+    """
+    Writes one manifest's plan as JSON: each truck's delivery order and times, the unassigned
+    packages, the deadline report and the package file's validation problems.
+
+    :param path: The file to write (its directory is created if missing).
+    :param manifest: The manifest the plan is for.
+    :param plan: The computed plan.
+    :param report: The package file's validation report.
+    :param deadline_report: The plan's deadline report.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "manifest": manifest.name,
+        "package_file": manifest.package_file,
+        "fleet_file": manifest.fleet_file,
+        "hub_address": plan.distance_matrix.addresses[plan.hub_location],
+        "total_mileage": round(plan.total_mileage, 1),
+        "trucks": [{
+            "truck": number,
+            "depart_time": str(truck.depart_time),
+            "finish_time": str(truck.time),
+            "mileage": round(truck.mileage, 1),
+            "packages": list(truck.packages),
+        } for number, truck in enumerate(plan.trucks, start=1)],
+        "unassigned": list(plan.unassigned_packages),
+        "deadlines": deadline_report.as_dict(),
+        "validation": {"rows_read": report.rows_read, "rows_loaded": report.rows_loaded,
+                       "errors": [{"line": line, "message": message} for line, message in report.errors]},
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+
+def _load_table(manifest: Manifest, cache_directory: str, close_tables: bool) -> DistanceMatrix:
+    matrix = DistanceMatrix.from_csv(manifest.distance_file, manifest.address_file)
+    if close_tables:
+        checksum = input_checksum([manifest.distance_file, manifest.address_file])
+        matrix = close_distance_matrix(matrix, os.path.join(cache_directory, checksum.hex()[:32] + ".cache"),
+                                       checksum)
+    return matrix
+
+
+def plan_manifests(root: str, output_directory: str, plan_function: Callable, workers: Optional[int] = None,
+                   close_tables: bool = True) -> List[dict]:
+    """
+    Plans every manifest under a directory and writes a plan.json per manifest (mirroring the
+    manifest tree under output_directory) plus summary.csv and summary.json.
+
+    Manifests with identical address and distance files share one table: it is loaded (and
+    closed under shortest paths, cached in output_directory/tables) once, copied into shared
+    memory, and mapped by the workers instead of being sent with every manifest. Manifests are
+    submitted table by table with a bounded number in flight, and a table's shared memory is
+    released as soon as its last manifest is done, so memory stays bounded however many
+    manifests there are. With one worker, manifests are planned in this process instead.
+
+    :param root: The manifest directory.
+    :param output_directory: Where to write the plans and the summary.
+    :param plan_function: A picklable function (distance matrix, package file, hub address, fleet) -> (plan,
+        validation report), such as main.plan_manifest. The hub is the first address of the manifest's address
+        table; the fleet is read from its FleetFile.csv (see load_fleet), or None without one.
+    :param workers: Number of worker processes (None for one per CPU).
+    :param close_tables: Whether to replace each distance table by its shortest-path closure.
+    :return: One summary row per manifest, in manifest order.
+    :rtype: list
+    """
+    started = time.perf_counter()
+    workers = workers if workers is not None else os.cpu_count() or 1
+    manifests = find_manifests(root)
+    cache_directory = os.path.join(output_directory, "tables")
+    os.makedirs(cache_directory, exist_ok=True)
+
+    # Group manifests by the contents of their tables, keeping the first-seen order.
+    groups: Dict[bytes, List[int]] = {}
+    rows: List[Optional[dict]] = [None] * len(manifests)
+    for index, manifest in enumerate(manifests):
+        if manifest.address_file is None:
+            rows[index] = _error_row(manifest, FileNotFoundError(f"No {ADDRESS_FILE_NAME} and {DISTANCE_FILE_NAME} "
+                                                                 f"found for this manifest."))
+            continue
+        groups.setdefault(input_checksum([manifest.distance_file, manifest.address_file]), []).append(index)
+
+    if workers <= 1:
+        for indexes in groups.values():
+            try:
+                matrix = _load_table(manifests[indexes[0]], cache_directory, close_tables)
+            except (OSError, ValueError) as error:
+                for index in indexes:
+                    rows[index] = _error_row(manifests[index], error)
+                continue
+            for index in indexes:
+                rows[index] = _plan_one(plan_function, manifests[index], matrix, output_directory)
+    else:
+        _plan_in_pool(plan_function, manifests, groups, rows, output_directory, cache_directory, close_tables, workers)
+
+    write_summary(output_directory, rows, time.perf_counter() - started, len(groups))
+    return rows
+
+
+def _plan_in_pool(plan_function: Callable, manifests: List[Manifest], groups: Dict[bytes, List[int]],
+                  rows: List[Optional[dict]], output_directory: str, cache_directory: str, close_tables: bool,
+                  workers: int):
+    segments: Dict[bytes, list] = {}  # Table checksum -> [shared memory, manifests not yet finished]
+    pending = {}  # Future -> (manifest index, table checksum)
+
+    def collect(limit: int):
+        # Waits until fewer than limit manifests are in flight, recording finished ones.
+        while len(pending) >= limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = pending.pop(future)
+                try:
+                    rows[index] = future.result()
+                except Exception as error:  # The worker itself failed (for example it ran out of memory).
+                    rows[index] = _error_row(manifests[index], error)
+                segment = segments[key]
+                segment[1] -= 1
+                if segment[1] == 0:
+                    segment[0].close()
+                    segment[0].unlink()
+                    del segments[key]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=MAX_JOBS_PER_WORKER) as pool:
+            for key, indexes in groups.items():
+                try:
+                    matrix = _load_table(manifests[indexes[0]], cache_directory, close_tables)
+                except (OSError, ValueError) as error:
+                    for index in indexes:
+                        rows[index] = _error_row(manifests[index], error)
+                    continue
+
+                # Copy the table into shared memory and drop this process's copy.
+                size = matrix.size
+                memory = shared_memory.SharedMemory(create=True, size=max(8, 8 * size * size))
+                memory.buf[:8 * size * size] = memoryview(matrix.distances).cast('B')
+                segments[key] = [memory, len(indexes)]
+                table = (memory.name, size, matrix.addresses)
+                del matrix
+
+                for index in indexes:
+                    collect(workers * JOBS_IN_FLIGHT_PER_WORKER)
+                    future = pool.submit(_plan_in_worker, plan_function, manifests[index], table, output_directory)
+                    pending[future] = (index, key)
+            collect(1)
+    finally:
+        for memory, _ in segments.values():
+            memory.close()
+            memory.unlink()
+
+
+def write_summary(output_directory: str, rows: List[dict], wall_seconds: float, table_count: int):
+    """
+    Writes summary.csv (one row per manifest) and summary.json (totals overall and per hub).
+
+    :param output_directory: Where to write the summary files.
+    :param rows: The summary rows of the manifests.
+    :param wall_seconds: How long the whole batch took.
+    :param table_count: Number of distinct distance tables loaded.
+    """
+    with open(os.path.join(output_directory, "summary.csv"), "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS, restval="", lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    def totals(group: List[dict]) -> dict:
+        planned = [row for row in group if not row.get("error")]
+        return {
+            "manifests": len(group),
+            "failed": len(group) - len(planned),
+            "packages": sum(row["packages"] for row in planned),
+            "mileage": round(sum(row["mileage"] for row in planned), 1),
+            "on_time": sum(row["on_time"] for row in planned),
+            "late": sum(row["late"] for row in planned),
+            "unassigned": sum(row["unassigned"] for row in planned),
+            "plan_seconds": round(sum(row.get("plan_seconds", 0.0) for row in group), 3),
+        }
+
+    hubs: Dict[str, List[dict]] = {}
+    for row in rows:
+        hubs.setdefault(row.get("hub", ""), []).append(row)
+    summary = dict(totals(rows), wall_seconds=round(wall_seconds, 3), distance_tables=table_count,
+                   hubs={hub: totals(group) for hub, group in sorted(hubs.items())})
+    with open(os.path.join(output_directory, "summary.json"), "w") as file:
+        json.dump(summary, file, indent=2)
+        file.write("\n")
@@ -0,0 +1,157 @@
+import csv
+import json
+import sys
+from datetime import timedelta
+from typing import Iterable, Iterator, Optional, TextIO, Tuple
+
+from StatusTimeline import StatusTimeline
+
+OUTPUT_FIELDS = ["query_time", "package_id", "address", "city", "state", "zipcode", "deadline_time", "weight",
+                 "delivery_time", "status", "error"]
+
+# Result files are written through a buffer of this many bytes, so large batches are not flushed per line.
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+
+def parse_time(text: str) -> timedelta:
+    """
+    Parses a query time given as HH:MM or HH:MM:SS.
+
+    :param text: The time to parse.
+    :return: The time since midnight.
+    :rtype: timedelta
+    :raises: ValueError if the text is not a valid time.
+    """
+    parts = text.strip().split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time '{text}'. Expected HH:MM or HH:MM:SS.")
+    hours, minutes = int(parts[0]), int(parts[1])
+    seconds = int(parts[2]) if len(parts) == 3 else 0
+    if not (0 <= minutes < 60 and 0 <= seconds < 60 and hours >= 0):
+        raise ValueError(f"Invalid time '{text}'.")
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+
+def parse_queries(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[timedelta], Optional[str], str]]:
+    """
+    Parses query lines of the form "time,package_id" or "time,all" (commas or whitespace).
+    Blank lines and lines starting with '#' are skipped.
+
+    :param lines: The query lines.
+    :return: For each query, the raw line, the parsed time and target (None when invalid) and an error message.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.replace(",", " ").split()
+        if len(fields) != 2:
+            yield line, None, None, "Expected 'time,package_id' or 'time,all'."
+            continue
+        try:
+            time = parse_time(fields[0])
+        except ValueError as error:
+            yield line, None, None, str(error)
+            continue
+        target = fields[1].lower()
+        if target != "all" and not target.isdigit():
+            yield line, time, None, f"Invalid package ID '{fields[1]}'."
+            continue
+        yield line, time, target, ""
+
+
+def package_record(query_time: timedelta, package, status: str, address: Optional[tuple] = None) -> dict:
+    street, city, zipcode = address if address is not None else (package.address, package.city, package.zipcode)
+    return {
+        "query_time": str(query_time),
+        "package_id": package.package_id,
+        "address": street,
+        "city": city,
+        "state": package.state,
+        "zipcode": zipcode,
+        "deadline_time": package.deadline_time.strftime("%H:%M:%S"),
+        "weight": package.weight,
+        "delivery_time": str(package.delivery_time) if package.delivery_time is not None else "",
+        "status": status,
+        "error": "",
+    }
+
+
+def answer_queries(lines: Iterable[str], timeline: StatusTimeline, package_table) -> Iterator[dict]:
+    """
+    Answers a stream of status queries from one computed plan, one record per package.
+    Invalid queries produce a record with only the error filled in.
+
+    :param lines: The query lines.
+    :param timeline: The status timeline of the computed plan.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :return: Result records with the fields in OUTPUT_FIELDS.
+    """
+    for line, time, target, error in parse_queries(lines):
+        if error:
+            yield {"query_time": line, "error": error}
+        elif target == "all":
+            for package, status, address in timeline.snapshot(time):
+                yield package_record(time, package, status, address)
+        else:
+            package_id = int(target)
+            if package_id not in timeline:
+                yield {"query_time": str(time), "package_id": package_id, "error": "Unknown package ID."}
+            else:
+                yield package_record(time, package_table.lookup(package_id), timeline.status_of(package_id, time),
+                                     timeline.address_at(package_id, time))
+
+
+def write_results(records: Iterable[dict], output: TextIO, output_format: str = "csv") -> int:
+    """
+    Writes result records as CSV (with a header row) or as JSON lines.
+
+    :param records: The records to write.
+    :param output: The text stream to write to.
+    :param output_format: "csv" or "jsonl".
+    :return: The number of records written.
+    :rtype: int
+    """
+    if output_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown output format '{output_format}'.")
+
+    count = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=OUTPUT_FIELDS, restval="", lineterminator="\n")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            output.write(json.dumps(record))
+            output.write("\n")
+            count += 1
+    output.flush()
+    return count
+
+
+def run_batch(query_source: str, timeline: StatusTimeline, package_table, output_path: str = "-",
+              output_format: str = "csv") -> int:
+    """
+    Reads queries from a file (or stdin for '-'), answers them and writes the results to a file
+    (or stdout for '-').
+
+    :param query_source: Path of the query file, or '-' for stdin.
+    :param timeline: The status timeline of the computed plan.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param output_path: Path of the result file, or '-' for stdout.
+    :param output_format: "csv" or "jsonl".
+    :return: The number of records written.
+    :rtype: int
+    """
+    input_stream = open(query_source, "r") if query_source != "-" else sys.stdin
+    output_stream = open(output_path, "w", newline="", buffering=OUTPUT_BUFFER_SIZE) \
+        if output_path != "-" else sys.stdout
+    try:
+        return write_results(answer_queries(input_stream, timeline, package_table), output_stream, output_format)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
@@ -0,0 +1,208 @@
+from array import array
+from bisect import bisect_left
+from itertools import compress, repeat
+from operator import gt, sub
+from typing import Dict, List, Optional
+
+import Instrumentation
+from DistanceMatrix import DistanceMatrix
+from PackageStore import NO_TIME, PackageStore
+from TimeModel import NEVER, format_seconds, package_deadline_seconds, seconds_since_midnight
+from Truck import Truck
+
+# Upper bounds, in minutes, of the lateness buckets; later deliveries fall in the last, open bucket.
+LATENESS_BUCKET_MINUTES = [15, 30, 60]
+
+# A delivery this many seconds after its deadline still counts as on time (float rounding of truck clocks).
+ON_TIME_TOLERANCE = 1e-6
+
+
+class RouteCheck:
+    __slots__ = ("late", "miles", "min_slack", "first_late")
+
+    def __init__(self, late: int, miles: float, min_slack: float, first_late: int):
+        """
+        The deadline feasibility of one route.
+
+        :param late: Number of route items delivered after their deadline.
+        :param miles: Miles driven along the route.
+        :param min_slack: Smallest deadline minus arrival time in seconds (negative when something is late).
+        :param first_late: Position in the route of the first late item, or -1 if none is late.
+        """
+        self.late = late
+        self.miles = miles
+        self.min_slack = min_slack
+        self.first_late = first_late
+
+    @property
+    def feasible(self) -> bool:
+        """Whether every item is on time."""
+        return self.late == 0
+
+
+def check_route(locations: List[int], deadlines: List[float], distance_matrix: DistanceMatrix, start_location: int,
+                start_seconds: float, speed: float) -> RouteCheck:
+    """
+    Times a route against its deadlines, cheaply enough to call for every candidate route
+    inside an optimizer.
+
+    :param locations: Location index of each route item, in delivery order.
+    :param deadlines: Deadline of each route item in seconds since midnight.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour.
+    :return: The route's late count, miles, minimum slack and first late position.
+    :rtype: RouteCheck
+
+    Time Complexity:
+        O(n) where n is the number of route items.
+    Space Complexity:
+        O(n)
+    """
+    distances = distance_matrix.distances
+    size = distance_matrix.size
+    seconds_per_mile = 3600.0 / speed
+    limit = -ON_TIME_TOLERANCE
+
+    miles = 0.0
+    late = 0
+    first_late = -1
+    min_slack = NEVER
+    current = start_location
+    # A single pass with everything in locals; for truck-sized routes this beats building
+    # intermediate lists, and it is what the optimizers call per candidate.
+    if Instrumentation.is_enabled():
+        Instrumentation.count("distance.lookups", len(locations))
+    for position, (location, deadline) in enumerate(zip(locations, deadlines)):
+        miles += distances[current * size + location]
+        current = location
+        slack = deadline - (start_seconds + miles * seconds_per_mile)
+        if slack < min_slack:
+            min_slack = slack
+            if slack < limit:
+                late += 1
+                if first_late < 0:
+                    first_late = position
+        elif slack < limit:
+            late += 1
+    return RouteCheck(late, miles, min_slack, first_late)
+
+
+def _finite(record: dict) -> dict:
+    # JSON has no infinity: report "never" (no delivery, or no packages to bound the slack) as None.
+    return {key: None if value == NEVER else value for key, value in record.items()}
+
+
+class DeadlineReport:
+    def __init__(self, package_table, trucks: List[Truck]):
+        """
+        Compares every package's delivery time with its deadline, both in seconds since
+        midnight, and summarizes the result: on-time and late counts, a lateness distribution,
+        each truck's slack and the first package to go late.
+
+        A PackageStore's deadline and delivery columns are read directly; other package tables
+        are converted once. The comparisons themselves run over whole columns with map.
+
+        :param package_table: The hash table or package store holding the routed packages.
+        :param trucks: The trucks, with their package lists in delivery order (numbered from 1).
+
+        Time Complexity:
+            O(n) where n is the number of packages, plus O(k log b) for k late packages and b buckets.
+        Space Complexity:
+            O(n)
+        """
+        if isinstance(package_table, PackageStore) and len(package_table) == len(package_table.ids):
+            ids = package_table.ids
+            deadlines = package_table.deadlines
+            deliveries = array('d', (NEVER if seconds == NO_TIME else seconds for seconds in package_table.deliveries))
+        else:
+            packages = list(package_table.values())
+            ids = array('q', (package.package_id for package in packages))
+            deadlines = array('d', (package_deadline_seconds(package) for package in packages))
+            deliveries = array('d', (seconds_since_midnight(package.delivery_time) for package in packages))
+
+        position: Dict[int, int] = dict(zip(ids, range(len(ids))))
+        slack = list(map(sub, deadlines, deliveries))
+        late_positions = list(compress(range(len(slack)), map(gt, repeat(-ON_TIME_TOLERANCE), slack)))
+
+        self.package_count = len(ids)
+        self.late = len(late_positions)
+        self.on_time = self.package_count - self.late
+        self.undelivered = sum(1 for index in late_positions if deliveries[index] == NEVER)
+
+        # Lateness distribution of the delivered late packages, in minutes.
+        self.lateness_buckets = [0] * (len(LATENESS_BUCKET_MINUTES) + 1)
+        lateness = [-slack[index] for index in late_positions if deliveries[index] != NEVER]
+        for seconds in lateness:
+            self.lateness_buckets[bisect_left(LATENESS_BUCKET_MINUTES, seconds / 60)] += 1
+        self.max_lateness = max(lateness, default=0.0)
+        self.mean_lateness = sum(lateness) / len(lateness) if lateness else 0.0
+
+        # The first package to go late is the late package whose deadline passes first.
+        self.first_late: Optional[dict] = None
+        truck_of = {package_id: number for number, truck in enumerate(trucks, start=1) for package_id in truck.packages}
+        if late_positions:
+            index = min(late_positions, key=lambda late_index: (deadlines[late_index], ids[late_index]))
+            self.first_late = {
+                "package_id": ids[index],
+                "truck": truck_of.get(ids[index]),
+                "deadline": deadlines[index],
+                "delivery": deliveries[index],
+            }
+
+        # Per truck: packages, late packages and the smallest slack (the package closest to its deadline).
+        self.trucks = []
+        for number, truck in enumerate(trucks, start=1):
+            truck_positions = [position[package_id] for package_id in truck.packages if package_id in position]
+            truck_slack = list(map(slack.__getitem__, truck_positions))
+            tightest = min(range(len(truck_slack)), key=truck_slack.__getitem__, default=None)
+            self.trucks.append({
+                "truck": number,
+                "packages": len(truck_positions),
+                "late": sum(1 for value in truck_slack if value < -ON_TIME_TOLERANCE),
+                "min_slack": truck_slack[tightest] if tightest is not None else NEVER,
+                "tightest_package": ids[truck_positions[tightest]] if tightest is not None else None,
+            })
+
+    @property
+    def feasible(self) -> bool:
+        """Whether every package is delivered on time."""
+        return self.late == 0
+
+    def bucket_labels(self) -> List[str]:
+        """Labels of the lateness buckets, e.g. "0-15 min" ... "60+ min"."""
+        bounds = [0] + LATENESS_BUCKET_MINUTES
+        labels = [f"{low}-{high} min" for low, high in zip(bounds, bounds[1:])]
+        labels.append(f"{bounds[-1]}+ min")
+        return labels
+
+    def as_dict(self) -> dict:
+        """Returns the report as plain data, suitable for JSON."""
+        return {
+            "packages": self.package_count,
+            "on_time": self.on_time,
+            "late": self.late,
+            "undelivered": self.undelivered,
+            "lateness": dict(zip(self.bucket_labels(), self.lateness_buckets)),
+            "max_lateness_seconds": self.max_lateness,
+            "mean_lateness_seconds": self.mean_lateness,
+            "first_late": _finite(self.first_late) if self.first_late is not None else None,
+            "trucks": [_finite(truck) for truck in self.trucks],
+        }
+
+    def __str__(self) -> str:
+        lines = [f"On time: {self.on_time} of {self.package_count} packages, late: {self.late}"
+                 f" ({self.undelivered} not delivered)"]
+        if self.late:
+            lines.append("Lateness: " + ", ".join(f"{label}: {count}" for label, count
+                                                  in zip(self.bucket_labels(), self.lateness_buckets)))
+            lines.append(f"Max lateness: {format_seconds(self.max_lateness)}, "
+                         f"mean: {format_seconds(self.mean_lateness)}")
+            first = self.first_late
+            lines.append(f"First late package: {first['package_id']} on truck {first['truck']}, "
+                         f"due {format_seconds(first['deadline'])}, delivered {format_seconds(first['delivery'])}")
+        for truck in self.trucks:
+            lines.append(f"Truck {truck['truck']}: {truck['packages']} packages, {truck['late']} late, "
+                         f"min slack {format_seconds(truck['min_slack'])} (package {truck['tightest_package']})")
+        return "\n".join(lines)
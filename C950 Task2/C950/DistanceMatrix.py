@@ -0,0 +1,163 @@
+import csv
+import hashlib
+from array import array
+from typing import Dict, List
+
+
+class DistanceMatrix:
+    def __init__(self, size: int, distances: array, addresses: List[str]):
+        """
+        Initializes a DistanceMatrix from an already built flat distance array.
+
+        :param size: Number of locations in the matrix.
+        :type size: int
+        :param distances: Row-major, symmetric array of size * size float distances.
+        :type distances: array.array
+        :param addresses: Street address of each location, indexed by location number.
+        :type addresses: list
+
+        Time Complexity:
+            O(n) where n is the number of locations. (For building the address index.)
+        Space Complexity:
+            O(n^2) for the distance array.
+        """
+        if len(distances) != size * size:
+            raise ValueError(f"Expected {size * size} distances for {size} locations, got {len(distances)}.")
+
+        self.size = size
+        self.distances = distances
+        self.addresses = addresses
+        # Exact address -> location index, used instead of scanning the address rows.
+        self.address_index: Dict[str, int] = {address: index for index, address in enumerate(addresses)}
+
+    @classmethod
+    def from_csv(cls, distance_file: str, address_file: str) -> "DistanceMatrix":
+        """
+        Loads the lower-triangular distance CSV and the address CSV once and builds a
+        symmetric matrix of floats.
+
+        :param distance_file: Path to the CSV file containing the distance table.
+        :type distance_file: str
+        :param address_file: Path to the CSV file containing the address list.
+        :type address_file: str
+        :return: The loaded distance matrix.
+        :rtype: DistanceMatrix
+
+        Time Complexity:
+            O(n^2) where n is the number of locations.
+        Space Complexity:
+            O(n^2)
+        """
+        addresses = []
+        with open(address_file, 'r') as file:
+            for row in csv.reader(file):
+                if not row:
+                    continue
+                # The first column holds the address number, the third the street address.
+                index = int(row[0])
+                if index != len(addresses):
+                    raise ValueError(f"Address numbers in '{address_file}' must be consecutive from 0.")
+                addresses.append(row[2])
+
+        size = len(addresses)
+        distances = array('d', bytes(8 * size * size))
+
+        with open(distance_file, 'r') as file:
+            for row_index, row in enumerate(csv.reader(file)):
+                if row_index >= size:
+                    break
+                for column_index, cell in enumerate(row[:size]):
+                    # Only the lower triangle (and diagonal) is filled in; mirror it to the upper half.
+                    if cell:
+                        value = float(cell)
+                        distances[row_index * size + column_index] = value
+                        distances[column_index * size + row_index] = value
+
+        return cls(size, distances, addresses)
+
+    def distance(self, point_a: int, point_b: int) -> float:
+        """
+        Returns the distance between two location indices.
+
+        :param point_a: Index of the first location.
+        :type point_a: int
+        :param point_b: Index of the second location.
+        :type point_b: int
+        :return: Distance between the two locations.
+        :rtype: float
+
+        Time Complexity:
+            O(1)
+        Space Complexity:
+            O(1)
+        """
+        return self.distances[point_a * self.size + point_b]
+
+    def row(self, point: int) -> array:
+        """
+        Returns the distances from one location to every other location.
+
+        :param point: Index of the location.
+        :type point: int
+        :return: A copy of the matrix row for the location.
+        :rtype: array.array
+
+        Time Complexity:
+            O(n) where n is the number of locations.
+        Space Complexity:
+            O(n)
+        """
+        start = point * self.size
+        return self.distances[start:start + self.size]
+
+    def checksum(self) -> bytes:
+        """
+        Returns a SHA-256 digest of the matrix's addresses and distances, computed on first use.
+        Results derived from the matrix (such as cached routes) are keyed by it.
+
+        :return: The 32-byte digest.
+        :rtype: bytes
+
+        Time Complexity:
+            O(n^2) on first use, O(1) afterwards.
+        """
+        digest = getattr(self, "_checksum", None)
+        if digest is None:
+            hasher = hashlib.sha256()
+            hasher.update(self.size.to_bytes(8, "little"))
+            hasher.update("\0".join(self.addresses).encode())
+            hasher.update(memoryview(self.distances).cast('B'))
+            digest = self._checksum = hasher.digest()
+        return digest
+
+    def index_of(self, address: str) -> int:
+        """
+        Returns the location index of an address.
+
+        An exact match is tried first. Otherwise the first known address that contains the given
+        one as a substring matches (for example "Dalton Ave" for "1060 Dalton Ave S"), as in the
+        original lookup, and the result is remembered so the scan runs at most once per address
+        string. An address with extra text, such as an appended suite number, does not match.
+
+        :param address: The street address to look up.
+        :type address: str
+        :return: The location index of the address.
+        :rtype: int
+        :raises: ValueError if the address is not in the address table.
+
+        Time Complexity:
+            Average case: O(1)
+            First lookup of a non-exact address: O(n) where n is the number of locations.
+        Space Complexity:
+            O(1)
+        """
+        index = self.address_index.get(address)
+        if index is not None:
+            return index
+
+        for index, known_address in enumerate(self.addresses):
+            if address in known_address:
+                self.address_index[address] = index
+                return index
+
+        raise ValueError(f"The address '{address}' was not found in the CSV.")
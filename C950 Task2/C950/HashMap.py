@@ -1,17 +1,112 @@
+# Markers for slots that have never been used and for slots whose entry was removed.
+# Removed slots keep probe chains intact until the next rehash.
+_EMPTY = object()
+_DELETED = object()
+
+
 class HashMap:
-    def __init__(self, initial_capacity: int = 20):
+    def __init__(self, initial_capacity: int = 20, load_factor: float = 0.75):
         """
         Initializes a HashMap with given initial capacity.
 
-        :param initial_capacity: Initial size of the hash map. Default is 20.
+        Entries are stored with open addressing (linear probing) in two parallel lists, one for
+        keys and one for items, instead of a list of [key, item] lists per bucket. The table
+        doubles in size whenever the share of used slots would exceed the load factor.
+
+        :param initial_capacity: Initial number of slots in the hash map. Default is 20.
         :type initial_capacity: int
+        :param load_factor: Maximum share of used slots before the table grows. Default is 0.75.
+        :type load_factor: float
 
         Time Complexity:
-            O(n) where n is the initial_capacity. (For initializing the list of lists.)
+            O(n) where n is the initial_capacity. (For initializing the slot lists.)
         Space Complexity:
             O(n) where n is the initial_capacity.
         """
-        self.buckets = [[] for _ in range(initial_capacity)]
+        if initial_capacity < 1:
+            raise ValueError("initial_capacity must be at least 1.")
+        if not 0.0 < load_factor < 1.0:
+            raise ValueError("load_factor must be between 0 and 1 (exclusive).")
+
+        self.load_factor = load_factor
+        self._keys = [_EMPTY] * initial_capacity
+        self._items = [None] * initial_capacity
+        self._size = 0  # Number of live entries
+        self._used = 0  # Number of live entries plus removed markers
+
+    def _find_slot(self, key) -> int:
+        """
+        Returns the slot index holding the key, or -1 if the key is not present.
+
+        Time Complexity:
+            Average case: O(1)
+            Worst case: O(n) where n is the capacity of the table.
+        Space Complexity:
+            O(1)
+        """
+        keys = self._keys
+        capacity = len(keys)
+        index = hash(key) % capacity
+
+        while True:
+            slot_key = keys[index]
+            if slot_key is _EMPTY:
+                return -1
+            if slot_key is not _DELETED and slot_key == key:
+                return index
+            index += 1
+            if index == capacity:
+                index = 0
+
+    def _resize(self, new_capacity: int):
+        """
+        Rehashes every live entry into a table with the given number of slots.
+        Removed markers are dropped in the process.
+
+        Time Complexity:
+            O(n + m) where n is the old capacity and m is the new capacity.
+        Space Complexity:
+            O(m) where m is the new capacity.
+        """
+        old_keys = self._keys
+        old_items = self._items
+        keys = [_EMPTY] * new_capacity
+        items = [None] * new_capacity
+
+        for slot_key, item in zip(old_keys, old_items):
+            if slot_key is _EMPTY or slot_key is _DELETED:
+                continue
+            index = hash(slot_key) % new_capacity
+            while keys[index] is not _EMPTY:
+                index += 1
+                if index == new_capacity:
+                    index = 0
+            keys[index] = slot_key
+            items[index] = item
+
+        self._keys = keys
+        self._items = items
+        self._used = self._size
+
+    def _reserve(self, additional: int):
+        """
+        Grows the table, if needed, so that `additional` new entries fit under the load factor.
+
+        Time Complexity:
+            Amortized O(1) per reserved entry.
+        Space Complexity:
+            O(n) where n is the new capacity when a resize happens.
+        """
+        capacity = len(self._keys)
+        if self._used + additional <= capacity * self.load_factor:
+            return
+
+        needed = self._size + additional
+        new_capacity = capacity
+        # Only grow when live entries need the room; otherwise rehashing clears removed markers.
+        while needed > new_capacity * self.load_factor:
+            new_capacity *= 2
+        self._resize(new_capacity)
 
     def insert(self, key, item) -> bool:
         """
@@ -22,21 +117,55 @@ class HashMap:
         :return: Always returns True for successful insert/update.
 
         Time Complexity:
-            Average case: O(1)
-            Worst case (if all keys collide): O(n) where n is the number of items with the same hash.
+            Average case: O(1) (amortized over resizes)
+            Worst case: O(n) where n is the number of items in the table.
         Space Complexity:
-            O(1)
+            O(1) amortized
+        """
+        index = self._find_slot(key)
+        if index >= 0:
+            self._items[index] = item
+            return True
+
+        self._reserve(1)
+
+        keys = self._keys
+        capacity = len(keys)
+        index = hash(key) % capacity
+        # Reuse the first removed or empty slot on the probe path.
+        while keys[index] is not _EMPTY and keys[index] is not _DELETED:
+            index += 1
+            if index == capacity:
+                index = 0
+
+        if keys[index] is _EMPTY:
+            self._used += 1
+        keys[index] = key
+        self._items[index] = item
+        self._size += 1
+        return True
+
+    def bulk_insert(self, entries) -> int:
         """
-        bucket_index = hash(key) % len(self.buckets)
-        bucket = self.buckets[bucket_index]
+        Inserts many (key, item) pairs, growing the table at most once when the number of
+        entries is known up front.
 
-        for kv_pair in bucket:
-            if kv_pair[0] == key:
-                kv_pair[1] = item
-                return True
+        :param entries: An iterable of (key, item) pairs.
+        :return: The number of pairs processed.
 
-        bucket.append([key, item])
-        return True
+        Time Complexity:
+            Average case: O(k) where k is the number of pairs.
+        Space Complexity:
+            O(k) for the grown table.
+        """
+        if hasattr(entries, '__len__'):
+            self._reserve(len(entries))
+
+        count = 0
+        for key, item in entries:
+            self.insert(key, item)
+            count += 1
+        return count
 
     def lookup(self, key):
         """
@@ -47,18 +176,14 @@ class HashMap:
 
         Time Complexity:
             Average case: O(1)
-            Worst case (if all keys collide): O(n) where n is the number of items with the same hash.
+            Worst case: O(n) where n is the number of items in the table.
         Space Complexity:
             O(1)
         """
-        bucket_index = hash(key) % len(self.buckets)
-        bucket = self.buckets[bucket_index]
-
-        for kv_pair in bucket:
-            if kv_pair[0] == key:
-                return kv_pair[1]
-
-        return None  # Key was not found
+        index = self._find_slot(key)
+        if index < 0:
+            return None  # Key was not found
+        return self._items[index]
 
     def hash_remove(self, key) -> bool:
         """
@@ -69,16 +194,61 @@ class HashMap:
 
         Time Complexity:
             Average case: O(1)
-            Worst case (if all keys collide): O(n) where n is the number of items with the same hash.
+            Worst case: O(n) where n is the number of items in the table.
         Space Complexity:
             O(1)
         """
-        bucket_index = hash(key) % len(self.buckets)
-        bucket = self.buckets[bucket_index]
+        index = self._find_slot(key)
+        if index < 0:
+            return False  # Key was not found
+
+        self._keys[index] = _DELETED
+        self._items[index] = None
+        self._size -= 1
+        return True
 
-        for idx, kv_pair in enumerate(bucket):
-            if kv_pair[0] == key:
-                bucket.pop(idx)
-                return True
+    def items(self):
+        """
+        Yields every (key, item) pair in the table, in slot order.
 
-        return False  # Key was not found
+        Time Complexity:
+            O(n) where n is the capacity of the table.
+        Space Complexity:
+            O(1)
+        """
+        for key, item in zip(self._keys, self._items):
+            if key is not _EMPTY and key is not _DELETED:
+                yield key, item
+
+    def keys(self):
+        """Yields every key in the table, in slot order."""
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """Yields every item in the table, in slot order."""
+        for _, item in self.items():
+            yield item
+
+    @property
+    def capacity(self) -> int:
+        """Number of slots currently allocated."""
+        return len(self._keys)
+
+    def __getstate__(self) -> dict:
+        # The slot markers are module-level sentinels compared by identity, so pickle the live
+        # entries rather than the slot lists and rebuild the slots on load.
+        return {"load_factor": self.load_factor, "capacity": len(self._keys), "entries": list(self.items())}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["capacity"], state["load_factor"])
+        self.bulk_insert(state["entries"])
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key) -> bool:
+        return self._find_slot(key) >= 0
@@ -0,0 +1,191 @@
+import time
+from array import array
+from typing import List, Optional
+
+import Instrumentation
+from DistanceMatrix import DistanceMatrix
+from Stop import build_stops, expand_stops
+
+# Largest number of distinct stops solved exactly by default (a full truck). The table has 2^n * n
+# entries and the dynamic program does about 2^n * n^2 relaxations: about 2 seconds at 16 stops,
+# and each stop fewer roughly halves that.
+DEFAULT_MAX_STOPS = 16
+
+INFINITY = float('inf')
+
+
+class ExactSolverLimitExceeded(Exception):
+    """Raised when a load is too large, or too slow, to solve exactly."""
+
+
+def _solve(distance_matrix: DistanceMatrix, start_location: int, stops: List[int],
+           stop_deadlines: Optional[List[float]], start_seconds: float, seconds_per_mile: float,
+           deadline: Optional[float]) -> Optional[List[int]]:
+    """
+    Runs the Held-Karp dynamic program over an open path from the start location.
+
+    cost[mask * n + last] is the shortest distance that starts at the start location, visits
+    exactly the stops in mask and ends at stop last. When stop deadlines are given, states that
+    reach their last stop after its deadline are dropped. Because the shortest path to a state is
+    also the earliest arrival there, the pruned program still finds the shortest on-time order.
+
+    :return: Stop positions (indices into stops) in optimal order, or None if every order is late.
+    :raises: ExactSolverLimitExceeded if the wall-clock deadline passes.
+    """
+    n = len(stops)
+    size = distance_matrix.size
+    distances = distance_matrix.distances
+    rows = [[distances[a * size + b] for b in stops] for a in stops]
+    full = (1 << n) - 1
+
+    cost = array('d', [INFINITY]) * ((1 << n) * n)
+    parent = array('b', [-1]) * ((1 << n) * n)
+    # Relaxations tallied once per (mask, last) state, so instrumentation stays out of the inner loop.
+    relaxations = 0
+
+    for stop in range(n):
+        miles = distances[start_location * size + stops[stop]]
+        if stop_deadlines is None or start_seconds + miles * seconds_per_mile <= stop_deadlines[stop] + 1e-6:
+            cost[(1 << stop) * n + stop] = miles
+
+    for mask in range(1, full + 1):
+        if deadline is not None and not mask & 0xFF and time.perf_counter() > deadline:
+            raise ExactSolverLimitExceeded("Exact solver ran out of its time budget.")
+
+        base = mask * n
+        unvisited = [stop for stop in range(n) if not mask >> stop & 1]
+        if not unvisited:
+            continue
+
+        for last in range(n):
+            miles = cost[base + last]
+            if miles == INFINITY:
+                continue
+            row = rows[last]
+            relaxations += len(unvisited)
+            for stop in unvisited:
+                candidate = miles + row[stop]
+                if stop_deadlines is not None and \
+                        start_seconds + candidate * seconds_per_mile > stop_deadlines[stop] + 1e-6:
+                    continue
+                index = (mask | 1 << stop) * n + stop
+                if candidate < cost[index]:
+                    cost[index] = candidate
+                    parent[index] = last
+
+    if Instrumentation.is_enabled():
+        # The matrix is read once into rows (n * n) plus once per first leg (n); relaxations read rows.
+        Instrumentation.count("distance.lookups", n * n + n)
+        Instrumentation.count("held_karp.relaxations", relaxations)
+
+    final = full * n
+    best_last = min(range(n), key=lambda stop: cost[final + stop])
+    if cost[final + best_last] == INFINITY:
+        return None
+
+    # Walk the parent table back from the best final state.
+    order = []
+    mask, last = full, best_last
+    while last != -1:
+        order.append(last)
+        previous = parent[mask * n + last]
+        mask &= ~(1 << last)
+        last = previous
+    order.reverse()
+    return order
+
+
+def solve_exact(packages: list, distance_matrix: DistanceMatrix, start_location: int,
+                start_seconds: float = 0.0, speed: float = 18.0, deadlines: Optional[List[float]] = None,
+                max_stops: int = DEFAULT_MAX_STOPS, time_budget: Optional[float] = None) -> list:
+    """
+    Returns the shortest delivery order for a truck's load, found with the Held-Karp bitmask
+    dynamic program over the load's distinct stops. Packages at the same stop are delivered
+    together, in their original order.
+
+    :param packages: The packages (or already grouped stops) to order. Each must have a location_index.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour.
+    :param deadlines: Deadline of each package in seconds since midnight, or None to ignore deadlines.
+        With deadlines, the shortest order that is on time for every package is returned; if no such
+        order exists, the shortest order overall is returned.
+    :param max_stops: Largest number of distinct stops to solve exactly.
+    :param time_budget: Maximum number of seconds to spend solving (None for no limit).
+    :return: The packages in optimal delivery order.
+    :rtype: list
+    :raises: ExactSolverLimitExceeded if the load has more than max_stops stops or runs out of time.
+
+    Time Complexity:
+        O(2^n * n^2) where n is the number of distinct stops.
+    Space Complexity:
+        O(2^n * n)
+    """
+    stops = build_stops(packages, deadlines)
+    if len(stops) > max_stops:
+        raise ExactSolverLimitExceeded(f"{len(stops)} stops exceed the exact solver limit of {max_stops}.")
+    if not stops:
+        return []
+
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    seconds_per_mile = 3600.0 / speed
+    locations = [stop.location_index for stop in stops]
+
+    order = None
+    if deadlines is not None:
+        order = _solve(distance_matrix, start_location, locations, [stop.deadline for stop in stops], start_seconds,
+                       seconds_per_mile, deadline)
+    if order is None:
+        order = _solve(distance_matrix, start_location, locations, None, start_seconds, seconds_per_mile, deadline)
+
+    return expand_stops([stops[stop] for stop in order])
+
+
+def route_miles(route: list, distance_matrix: DistanceMatrix, start_location: int) -> float:
+    """
+    Returns the miles driven along an open route from the start location.
+
+    :param route: Items in delivery order. Each must have a location_index.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :return: Total miles.
+    :rtype: float
+    """
+    miles = 0.0
+    current = start_location
+    for item in route:
+        miles += distance_matrix.distance(current, item.location_index)
+        current = item.location_index
+    return miles
+
+
+def optimality_gap(heuristic_route: list, distance_matrix: DistanceMatrix, start_location: int,
+                   max_stops: int = DEFAULT_MAX_STOPS, time_budget: Optional[float] = None,
+                   start_seconds: float = 0.0, speed: float = 18.0, deadlines: Optional[List[float]] = None) -> dict:
+    """
+    Compares a heuristic route with the exact optimum for the same packages: the shortest order
+    that keeps every package on time when deadlines are given, the shortest order otherwise.
+
+    :param heuristic_route: Packages in the heuristic's delivery order.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param max_stops: Largest number of distinct stops to solve exactly.
+    :param time_budget: Maximum number of seconds to spend solving (None for no limit).
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour.
+    :param deadlines: Deadline of each package in seconds since midnight, or None to ignore deadlines.
+    :return: Heuristic miles, optimal miles and the gap as a percentage of the optimum.
+    :rtype: dict
+    :raises: ExactSolverLimitExceeded if the load is too large to solve exactly.
+    """
+    optimal_route = solve_exact(heuristic_route, distance_matrix, start_location, start_seconds, speed, deadlines,
+                                max_stops=max_stops, time_budget=time_budget)
+    heuristic_miles = route_miles(heuristic_route, distance_matrix, start_location)
+    optimal_miles = route_miles(optimal_route, distance_matrix, start_location)
+    gap = (heuristic_miles - optimal_miles) / optimal_miles * 100 if optimal_miles else 0.0
+    return {
+        "heuristic_miles": round(heuristic_miles, 2),
+        "optimal_miles": round(optimal_miles, 2),
+        "gap_percent": round(gap, 2),
+    }
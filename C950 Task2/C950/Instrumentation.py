@@ -0,0 +1,286 @@
+import cProfile
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+# Environment variables that enable instrumentation without command-line options: a JSON metrics
+# file ('-' for stderr), a cProfile/pstats dump file, and "1" to trace allocation peaks.
+METRICS_ENV = "WGUPS_METRICS"
+PROFILE_ENV = "WGUPS_PROFILE"
+TRACE_MEMORY_ENV = "WGUPS_TRACE_MEMORY"
+
+# Stage names are joined into paths such as "plan/route/truck 1".
+STAGE_SEPARATOR = "/"
+
+_enabled = False
+_trace_memory = False
+_profiler: Optional[cProfile.Profile] = None
+_started = 0.0
+
+_stack: List["_Stage"] = []
+_stages: Dict[str, dict] = {}
+_counters: Dict[str, int] = {}
+_probe_lengths: Dict[int, int] = {}
+# (owner, attribute, original) of every method wrapped while enabled, restored by disable().
+_patched: List[tuple] = []
+
+# What stage() returns while disabled: entering and leaving it does nothing.
+_NO_STAGE = nullcontext()
+
+
+def is_enabled() -> bool:
+    """Whether instrumentation is collecting."""
+    return _enabled
+
+
+class _Stage:
+    __slots__ = ("name", "path", "started", "peak", "counters")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = name
+        self.started = 0.0
+        self.peak = 0
+        self.counters: Dict[str, int] = {}
+
+    def __enter__(self):
+        if _stack:
+            parent = _stack[-1]
+            self.path = parent.path + STAGE_SEPARATOR + self.name
+            if _trace_memory:
+                # Keep the parent's peak so far before measuring this stage's own peak.
+                parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        if _trace_memory:
+            tracemalloc.reset_peak()
+        _stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        _stack.pop()
+        record = _stages.get(self.path)
+        if record is None:
+            record = _stages[self.path] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "counters": {}}
+        record["calls"] += 1
+        record["seconds"] += elapsed
+        record["max_seconds"] = max(record["max_seconds"], elapsed)
+        for name, amount in self.counters.items():
+            record["counters"][name] = record["counters"].get(name, 0) + amount
+
+        if _trace_memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = max(record.get("peak_bytes", 0), self.peak)
+            if _stack:
+                _stack[-1].peak = max(_stack[-1].peak, self.peak)
+        return False
+
+
+def stage(name: str):
+    """
+    Returns a context manager that times a stage of the program (and, when tracing memory,
+    records its allocation peak). Stages nest; counts made inside a stage are attributed to the
+    innermost one. While instrumentation is disabled this is a shared no-op.
+
+    :param name: The stage name, e.g. "load" or "truck 1".
+    :return: The context manager.
+    """
+    return _Stage(name) if _enabled else _NO_STAGE
+
+
+def count(name: str, amount: int = 1):
+    """
+    Adds to a counter, both in total and for the innermost active stage. Only called by
+    instrumented code, so it costs nothing while disabled.
+
+    :param name: The counter name, e.g. "distance.lookups".
+    :param amount: How much to add.
+    """
+    _counters[name] = _counters.get(name, 0) + amount
+    if _stack:
+        counters = _stack[-1].counters
+        counters[name] = counters.get(name, 0) + amount
+
+
+def _wrap(owner, attribute: str, make_wrapper):
+    original = owner.__dict__[attribute]
+    wrapper = functools.wraps(original)(make_wrapper(original))
+    setattr(owner, attribute, wrapper)
+    _patched.append((owner, attribute, original))
+
+
+def _counting(counter: str):
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            count(counter)
+            return original(*args, **kwargs)
+        return wrapper
+    return make_wrapper
+
+
+def _hashmap_probe_counting(original):
+    from HashMap import _EMPTY
+
+    def wrapper(self, key):
+        slot = original(self, key)
+        # Probe length: slots examined from the key's home slot to the key (or to the empty slot ending the chain).
+        keys = self._keys
+        capacity = len(keys)
+        home = hash(key) % capacity
+        if slot >= 0:
+            probes = (slot - home) % capacity + 1
+        else:
+            probes = 1
+            index = home
+            while keys[index] is not _EMPTY and probes <= capacity:
+                index = index + 1 if index + 1 < capacity else 0
+                probes += 1
+        _probe_lengths[probes] = _probe_lengths.get(probes, 0) + 1
+        count("hashmap.probes", probes)
+        return slot
+    return wrapper
+
+
+def _address_counting(original):
+    def wrapper(self, address):
+        count("address.lookups")
+        if address not in self.address_index:
+            count("address.scans")
+        return original(self, address)
+    return wrapper
+
+
+def _instrument_hot_paths():
+    # The routing loops (nearest neighbor, local search, Held-Karp, route cache insertion, check_route
+    # and the sweep's tours) read the flat distance array directly; they add their own tallies to
+    # "distance.lookups" once per call. Not counted: the shortest-path closure, and anything done in
+    # ParallelRouting or BatchPlanner worker processes, whose counters are never sent back.
+    # Imported here so that merely importing this module never loads (or slows) anything.
+    from DistanceMatrix import DistanceMatrix
+    from HashMap import HashMap
+    from PackageStore import PackageStore
+    from StatusTimeline import StatusTimeline
+
+    _wrap(DistanceMatrix, "distance", _counting("distance.lookups"))
+    _wrap(DistanceMatrix, "row", _counting("distance.rows"))
+    _wrap(DistanceMatrix, "index_of", _address_counting)
+    _wrap(HashMap, "lookup", _counting("hashmap.lookups"))
+    _wrap(HashMap, "insert", _counting("hashmap.inserts"))
+    _wrap(HashMap, "_find_slot", _hashmap_probe_counting)
+    _wrap(PackageStore, "lookup", _counting("package_store.lookups"))
+    _wrap(StatusTimeline, "status_of", _counting("status.queries"))
+    _wrap(StatusTimeline, "snapshot", _counting("status.snapshots"))
+
+
+def enable(trace_memory: bool = False, profile: bool = False):
+    """
+    Starts collecting: wraps the hot-path methods with counters and, if requested, starts
+    tracemalloc and cProfile. Nothing is wrapped or traced until this is called.
+
+    :param trace_memory: Whether to record allocation peaks per stage (slows Python down noticeably).
+    :param profile: Whether to run the whole program under cProfile.
+    """
+    global _enabled, _trace_memory, _profiler, _started
+    if _enabled:
+        return
+    _enabled = True
+    _started = time.perf_counter()
+    _instrument_hot_paths()
+    if trace_memory:
+        _trace_memory = True
+        tracemalloc.start()
+    if profile:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def disable():
+    """Stops collecting and restores the original methods. Collected data is kept until reset()."""
+    global _enabled, _trace_memory
+    if not _enabled:
+        return
+    if _profiler is not None:
+        _profiler.disable()
+    if _trace_memory:
+        tracemalloc.stop()
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+    _enabled = False
+    _trace_memory = False
+
+
+def reset():
+    """Discards everything collected so far."""
+    global _profiler
+    _stages.clear()
+    _counters.clear()
+    _probe_lengths.clear()
+    _profiler = None
+
+
+def report() -> dict:
+    """
+    Returns everything collected as plain data, suitable for JSON.
+
+    :return: Stage timings (and peaks), counters, the HashMap probe length histogram and the environment.
+    :rtype: dict
+    """
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "wall_seconds": time.perf_counter() - _started if _started else 0.0,
+        "stages": {path: dict(record, counters=dict(record["counters"])) for path, record in _stages.items()},
+        "counters": dict(sorted(_counters.items())),
+        "hashmap_probe_lengths": {str(length): _probe_lengths[length] for length in sorted(_probe_lengths)},
+    }
+    try:
+        import resource
+        # Peak resident set size of the process (kilobytes on Linux).
+        data["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass  # Not available on Windows.
+    return data
+
+
+def export(metrics_path: Optional[str] = None, profile_path: Optional[str] = None):
+    """
+    Writes the collected metrics as JSON and the cProfile statistics as a pstats dump (readable
+    with python -m pstats).
+
+    :param metrics_path: The JSON file to write ('-' for stderr, None to skip).
+    :param profile_path: The pstats file to write (None to skip; needs enable(profile=True)).
+    """
+    if _profiler is not None:
+        _profiler.disable()
+        if profile_path is not None:
+            _profiler.dump_stats(profile_path)
+    if metrics_path is not None:
+        text = json.dumps(report(), indent=2)
+        if metrics_path == "-":
+            print(text, file=sys.stderr)
+        else:
+            with open(metrics_path, "w") as file:
+                file.write(text + "\n")
+
+
+def settings_from_environment(metrics_path: Optional[str] = None, profile_path: Optional[str] = None,
+                              trace_memory: bool = False) -> tuple:
+    """
+    Combines command-line instrumentation options with the WGUPS_METRICS, WGUPS_PROFILE and
+    WGUPS_TRACE_MEMORY environment variables; options given on the command line win.
+
+    :return: (metrics path, profile path, trace memory)
+    :rtype: tuple
+    """
+    metrics_path = metrics_path or os.environ.get(METRICS_ENV) or None
+    profile_path = profile_path or os.environ.get(PROFILE_ENV) or None
+    trace_memory = trace_memory or os.environ.get(TRACE_MEMORY_ENV, "") not in ("", "0")
+    return metrics_path, profile_path, trace_memory
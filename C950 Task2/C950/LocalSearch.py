@@ -0,0 +1,259 @@
+import heapq
+import time
+from collections import deque
+from typing import List, Optional
+
+import Instrumentation
+from DistanceMatrix import DistanceMatrix
+
+# Smallest saving that counts as an improvement. Keeps float noise from cycling moves.
+IMPROVEMENT_EPSILON = 1e-9
+
+# Number of candidate neighbors examined per node.
+DEFAULT_NEIGHBORS = 8
+
+# Longest segment an Or-opt move relocates.
+MAX_SEGMENT_LENGTH = 3
+
+
+class _OpenTour:
+    """
+    An open path that starts at a fixed node 0 (the truck's start location) and visits every
+    route item once, without returning. Node i (i >= 1) is route item i - 1.
+    """
+
+    def __init__(self, route: list, distance_matrix: DistanceMatrix, start_location: int,
+                 start_seconds: float, speed: float, deadlines: Optional[List[float]], neighbors: int):
+        self.route = route
+        self.size = distance_matrix.size
+        self.distances = distance_matrix.distances
+        self.locations = [start_location] + [item.location_index for item in route]
+        self.path = list(range(len(self.locations)))
+        self.position = list(self.path)
+        self.start_seconds = start_seconds
+        self.seconds_per_mile = 3600.0 / speed
+        self.deadlines = [float('inf')] + list(deadlines) if deadlines is not None else None
+        # Edge distances priced so far. Tallied per move or pass rather than per distance() call, so
+        # that instrumentation costs the inner loops nothing.
+        self.lookups = 0
+        self.neighbors = self._build_neighbor_lists(neighbors)
+        self.late = self._late_nodes(self.path)
+
+    def _build_neighbor_lists(self, k: int) -> List[List[int]]:
+        """
+        Builds each node's candidate list from the route's own nodes: its k nearest other nodes,
+        ties by node. Nodes at the same location come first, since they are zero miles apart.
+
+        Time Complexity:
+            O(n^2 log k) where n is the number of nodes.
+        """
+        locations = self.locations
+        nodes = range(len(locations))
+        self.lookups += len(locations) * len(locations)
+        neighbor_lists = []
+        for node, location in enumerate(locations):
+            row_start = location * self.size
+            row = [self.distances[row_start + other_location] for other_location in locations]
+            neighbor_lists.append(heapq.nsmallest(k, (other for other in nodes if other != node),
+                                                  key=row.__getitem__))
+        return neighbor_lists
+
+    def distance(self, node_a: int, node_b: Optional[int]) -> float:
+        # The path is open, so an edge to "no next node" costs nothing.
+        if node_b is None:
+            return 0.0
+        return self.distances[self.locations[node_a] * self.size + self.locations[node_b]]
+
+    def next_node(self, position: int) -> Optional[int]:
+        return self.path[position + 1] if position + 1 < len(self.path) else None
+
+    def _late_nodes(self, path: List[int]) -> set:
+        """
+        Returns the nodes delivered after their deadline when driving the given path.
+
+        Time Complexity:
+            O(n) where n is the number of nodes.
+        """
+        if self.deadlines is None:
+            return set()
+
+        late = set()
+        miles = 0.0
+        self.lookups += len(path) - 1
+        previous = path[0]
+        for node in path[1:]:
+            miles += self.distance(previous, node)
+            if self.start_seconds + miles * self.seconds_per_mile > self.deadlines[node] + 1e-6:
+                late.add(node)
+            previous = node
+        return late
+
+    def _accept(self, candidate_path: List[int]) -> bool:
+        """
+        Installs the candidate path unless it makes a package late that was on time before.
+        """
+        late = self._late_nodes(candidate_path)
+        if not late <= self.late:
+            return False
+
+        self.late = late
+        self.path = candidate_path
+        for position, node in enumerate(candidate_path):
+            self.position[node] = position
+        return True
+
+    def try_two_opt(self, node: int) -> Optional[tuple]:
+        """
+        Looks for an improving 2-opt move that creates an edge between the node and one of its
+        neighbors. Each candidate is priced in O(1) from the four edges it touches.
+
+        :return: The nodes whose edges changed, or None if no move was applied.
+        """
+        path = self.path
+        last = len(path) - 1
+
+        for neighbor in self.neighbors[node]:
+            low, high = sorted((self.position[node], self.position[neighbor]))
+
+            # Variant 1: the new edge joins path[i] and path[j]; variant 2: path[i + 1] and path[j + 1].
+            for i, j in ((low, high), (low - 1, high - 1)):
+                if i < 0 or j - i < 2:
+                    continue
+                a, b, c = path[i], path[i + 1], path[j]
+                e = path[j + 1] if j < last else None
+                self.lookups += 4
+                delta = (self.distance(a, c) + self.distance(b, e)
+                         - self.distance(a, b) - self.distance(c, e))
+                if delta >= -IMPROVEMENT_EPSILON:
+                    continue
+
+                candidate = path[:i + 1] + path[i + 1:j + 1][::-1] + path[j + 1:]
+                if self._accept(candidate):
+                    return tuple(touched for touched in (a, b, c, e) if touched is not None)
+        return None
+
+    def try_or_opt(self, node: int) -> Optional[tuple]:
+        """
+        Looks for an improving Or-opt move that relocates a segment of up to MAX_SEGMENT_LENGTH
+        nodes starting at the node, in either orientation, next to a neighbor of its end points.
+
+        :return: The nodes whose edges changed, or None if no move was applied.
+        """
+        path = self.path
+        start = self.position[node]
+        if start == 0:
+            return None  # The start location never moves.
+
+        for length in range(1, MAX_SEGMENT_LENGTH + 1):
+            end = start + length - 1
+            if end >= len(path):
+                break
+
+            first, last = path[start], path[end]
+            previous, following = path[start - 1], self.next_node(end)
+            self.lookups += 3
+            removal_gain = (self.distance(previous, first) + self.distance(last, following)
+                            - (self.distance(previous, following) if following is not None else 0.0))
+
+            for anchor in set(self.neighbors[first]) | set(self.neighbors[last]):
+                anchor_position = self.position[anchor]
+                if start <= anchor_position <= end:
+                    continue
+
+                # Insert either right after the anchor or right before it.
+                edges = [(anchor, self.next_node(anchor_position))]
+                if anchor_position > 0:
+                    edges.append((path[anchor_position - 1], anchor))
+
+                for p, q in edges:
+                    if q is not None and start <= self.position[q] <= end:
+                        continue
+                    if self.position[p] >= start and self.position[p] <= end:
+                        continue
+                    self.lookups += 5
+                    kept_edge = self.distance(p, q)
+                    forward = self.distance(p, first) + self.distance(last, q) - kept_edge
+                    backward = self.distance(p, last) + self.distance(first, q) - kept_edge
+
+                    for insertion_cost, reverse in ((forward, False), (backward, True)):
+                        if insertion_cost - removal_gain >= -IMPROVEMENT_EPSILON:
+                            continue
+
+                        segment = path[start:end + 1]
+                        if reverse:
+                            segment.reverse()
+                        remaining = path[:start] + path[end + 1:]
+                        insert_at = remaining.index(p) + 1
+                        candidate = remaining[:insert_at] + segment + remaining[insert_at:]
+                        if self._accept(candidate):
+                            return tuple(touched for touched in (previous, following, first, last, p, q)
+                                         if touched is not None)
+        return None
+
+    def ordered_route(self) -> list:
+        return [self.route[node - 1] for node in self.path[1:]]
+
+
+def improve_route(route: list, distance_matrix: DistanceMatrix, start_location: int, start_seconds: float,
+                  speed: float, deadlines: Optional[List[float]] = None, max_iterations: Optional[int] = None,
+                  time_budget: Optional[float] = None, neighbors: int = DEFAULT_NEIGHBORS) -> list:
+    """
+    Refines a delivery order with 2-opt and Or-opt moves.
+
+    The route is an open path from the start location. Candidate moves come from each node's
+    list of its nearest other route nodes and are priced in O(1); don't-look bits (a queue of nodes whose
+    surroundings changed) keep the search from re-examining settled parts of the route. A move
+    is only accepted if no package that was on time becomes late.
+
+    :param route: Items in their current delivery order. Each must have a location_index.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour, used to time deliveries against deadlines.
+    :param deadlines: Deadline of each route item in seconds since midnight, or None to ignore deadlines.
+    :param max_iterations: Maximum number of improving moves to apply (None for no limit).
+    :param time_budget: Maximum number of seconds to search (None for no limit).
+    :param neighbors: Number of candidate neighbors per node.
+    :return: The items in improved delivery order.
+    :rtype: list
+
+    Time Complexity:
+        O(n^2 log k) to build the neighbor lists, then O(n * k) per pass to price moves, plus O(n)
+        for each applied move, where n is the number of route items and k the neighbor list length.
+    Space Complexity:
+        O(n * k)
+    """
+    if len(route) < 3:
+        return list(route)
+
+    tour = _OpenTour(route, distance_matrix, start_location, start_seconds, speed, deadlines, neighbors)
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+
+    active = deque(tour.path)
+    queued = [True] * len(tour.path)
+    moves = 0
+
+    while active:
+        if max_iterations is not None and moves >= max_iterations:
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+        node = active.popleft()
+        queued[node] = False
+
+        touched = tour.try_two_opt(node) or tour.try_or_opt(node)
+        if touched is None:
+            continue
+
+        moves += 1
+        # Clear the don't-look bits of every node next to a changed edge.
+        for changed in touched:
+            if not queued[changed]:
+                queued[changed] = True
+                active.append(changed)
+
+    if Instrumentation.is_enabled():
+        Instrumentation.count("distance.lookups", tour.lookups)
+        Instrumentation.count("local_search.moves", moves)
+    return tour.ordered_route()
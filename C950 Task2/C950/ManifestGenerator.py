@@ -0,0 +1,134 @@
+import argparse
+import csv
+import math
+import os
+import random
+from typing import Optional
+
+STREET_NAMES = ["State St", "Main St", "900 East", "700 East", "500 S", "Redwood Rd", "Highland Dr",
+                "2100 S", "3300 S", "4500 S", "Parkway Blvd", "Canyon Rd", "Van Winkle Expy", "Bangerter Hwy"]
+CITIES = [("Salt Lake City", "84101"), ("West Valley City", "84119"), ("Murray", "84107"),
+          ("Holladay", "84117"), ("Millcreek", "84106"), ("Taylorsville", "84118")]
+
+# Share of packages with a morning deadline, and the deadlines used.
+DEADLINE_SHARE = 0.25
+DEADLINES = ["9:00 AM", "10:30 AM", "10:30 AM", "12:00 PM"]
+
+# Share of packages with each kind of special instruction.
+TRUCK_RESTRICTION_SHARE = 0.03
+DELAY_SHARE = 0.03
+GROUP_SHARE = 0.02
+
+# Road distances are straight-line distances scaled by a random detour factor in this range.
+DETOUR_RANGE = (1.15, 1.45)
+
+
+def generate_manifest(directory: str, stops: int, packages: Optional[int] = None, trucks: int = 3,
+                      area_miles: Optional[float] = None, seed: int = 0) -> dict:
+    """
+    Writes a synthetic AddressFile.csv, DistanceFile.csv and PackageFile.csv triple in the same
+    formats as the sample data.
+
+    Stops are spread uniformly over a square service area with the hub (address 0) in the middle.
+    The distance file holds only the lower triangle, one row per address, without the trailing
+    empty cells of the sample file. Rows grow to n values, so the file has n^2 / 2 cells (about
+    6 GB at 50k stops) and loading it needs 8 * n^2 bytes.
+
+    :param directory: Directory to write the three files into (created if missing).
+    :param stops: Number of delivery addresses, not counting the hub.
+    :param packages: Number of packages (default 1.5 per stop).
+    :param trucks: Number of trucks that "Can only be on truck N" instructions may refer to.
+    :param area_miles: Side of the square service area (default grows with the square root of stops).
+    :param seed: Random seed, so the same arguments always write the same files.
+    :return: A summary of what was written, including the file paths.
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    packages = packages if packages is not None else stops * 3 // 2
+    area_miles = area_miles if area_miles is not None else max(10.0, 2.0 * math.sqrt(stops))
+    os.makedirs(directory, exist_ok=True)
+
+    locations = stops + 1
+    half = area_miles / 2
+    points = [(half, half)] + [(rng.uniform(0, area_miles), rng.uniform(0, area_miles)) for _ in range(stops)]
+    addresses = ["4001 South 700 East"] + [f"{number} {rng.choice(STREET_NAMES)} #{number}"
+                                           for number in range(1, locations)]
+    cities = [CITIES[0]] + [rng.choice(CITIES) for _ in range(stops)]
+
+    address_path = os.path.join(directory, "AddressFile.csv")
+    with open(address_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([0, "Hub", addresses[0]])
+        for index in range(1, locations):
+            writer.writerow([index, f"Stop {index}", addresses[index]])
+
+    distance_path = os.path.join(directory, "DistanceFile.csv")
+    with open(distance_path, "w", newline="") as file:
+        for row in range(locations):
+            x, y = points[row]
+            cells = []
+            for column in range(row):
+                other_x, other_y = points[column]
+                miles = math.hypot(x - other_x, y - other_y) * rng.uniform(*DETOUR_RANGE)
+                cells.append(f"{max(0.1, round(miles, 1)):g}")
+            cells.append("0")
+            file.write(",".join(cells))
+            file.write("\n")
+
+    package_path = os.path.join(directory, "PackageFile.csv")
+    with open(package_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        package_id = 1
+        while package_id <= packages:
+            roll = rng.random()
+            if roll < GROUP_SHARE and package_id + 2 <= packages:
+                # A group of three packages that must travel together.
+                group = [package_id, package_id + 1, package_id + 2]
+                for member in group:
+                    others = ", ".join(str(other) for other in group if other != member)
+                    writer.writerow(_package_row(rng, member, addresses, cities, locations,
+                                                 f"Must be delivered with {others}"))
+                package_id += 3
+                continue
+
+            roll -= GROUP_SHARE
+            notes = ""
+            if roll < TRUCK_RESTRICTION_SHARE:
+                notes = f"Can only be on truck {rng.randint(1, trucks)}"
+            elif roll < TRUCK_RESTRICTION_SHARE + DELAY_SHARE:
+                notes = "Delayed on flight---will not arrive to depot until 9:05 am"
+            writer.writerow(_package_row(rng, package_id, addresses, cities, locations, notes))
+            package_id += 1
+
+    return {
+        "stops": stops,
+        "packages": packages,
+        "area_miles": area_miles,
+        "address_file": address_path,
+        "distance_file": distance_path,
+        "package_file": package_path,
+    }
+
+
+def _package_row(rng: random.Random, package_id: int, addresses: list, cities: list, locations: int,
+                 notes: str) -> list:
+    location = rng.randrange(1, locations)
+    city, zipcode = cities[location]
+    deadline = rng.choice(DEADLINES) if rng.random() < DEADLINE_SHARE else "EOD"
+    weight = f"{rng.randint(1, 60)} Kilos"
+    return [package_id, addresses[location], city, "UT", zipcode, deadline, weight, f"'{notes}'" if notes else ""]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic address/distance/package file triple.")
+    parser.add_argument("directory", help="Directory to write the files into.")
+    parser.add_argument("--stops", type=int, default=100, help="Number of delivery addresses.")
+    parser.add_argument("--packages", type=int, help="Number of packages (default 1.5 per stop).")
+    parser.add_argument("--trucks", type=int, default=3, help="Highest truck number used in instructions.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+    print(generate_manifest(args.directory, args.stops, args.packages, args.trucks, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
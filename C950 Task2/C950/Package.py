@@ -1,6 +1,7 @@
 class Package:
     def __init__(self, package_id: int, address: str, city: str, state: str,
-                 zipcode: str, deadline_time, weight: float, status: str = "At the hub"):
+                 zipcode: str, deadline_time, weight: float, status: str = "At the hub",
+                 location_index: int = -1, notes: str = ""):
         """
         Initializes the Package object with given attributes.
 
@@ -20,6 +21,10 @@ class Package:
         :type weight: float
         :param status: Current status of the package (default is "At the hub").
         :type status: str
+        :param location_index: Index of the delivery address in the distance matrix (-1 if unresolved).
+        :type location_index: int
+        :param notes: Special handling instructions from the package file (empty if none).
+        :type notes: str
         """
         self.package_id = package_id
         self.address = address
@@ -31,6 +36,8 @@ class Package:
         self.status = status
         self.departure_time = None
         self.delivery_time = None
+        self.location_index = location_index
+        self.notes = notes
 
     def __str__(self) -> str:
         """
@@ -39,10 +46,25 @@ class Package:
         :return: A string detailing the package's attributes.
         :rtype: str
         """
+        return self.format_status(self.status)
+
+    def format_status(self, status: str, address=None) -> str:
+        """
+        Returns the same string as __str__, but with the given status (and optionally address) in
+        place of the stored ones. Lets status queries print a package without modifying it.
+
+        :param status: The status to show.
+        :type status: str
+        :param address: The (address, city, zipcode) to show, e.g. the one known at the query time.
+        :type address: tuple
+        :return: A string detailing the package's attributes.
+        :rtype: str
+        """
+        street, city, zipcode = address if address is not None else (self.address, self.city, self.zipcode)
         return (
-            f"{self.package_id}, {self.address}, {self.city}, {self.state}, "
-            f"{self.zipcode}, {self.deadline_time}, {self.weight}kg, "
-            f"{self.delivery_time}, {self.status}"
+            f"{self.package_id}, {street}, {city}, {self.state}, "
+            f"{zipcode}, {self.deadline_time}, {self.weight}kg, "
+            f"{self.delivery_time}, {status}"
         )
 
     def update_status(self, current_time):
@@ -0,0 +1,224 @@
+import csv
+import datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Container, Iterable, Iterator, List, Optional, Tuple
+
+from DistanceMatrix import DistanceMatrix
+from Package import Package
+from PackageStore import PackageStore
+
+# Rows parsed and validated per step of the pipeline; memory use is bounded by one chunk.
+DEFAULT_CHUNK_SIZE = 4096
+
+# End-of-day packages get the last second of the day as their deadline.
+END_OF_DAY_SECONDS = 23 * 3600 + 59 * 60 + 59
+
+# Only this many problems are kept with their details; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
+
+# Status given to freshly loaded packages.
+LOADED_STATUS = "At the Hub"
+
+_DEADLINE_DATE = datetime.datetime(1900, 1, 1)
+
+
+class ValidationReport:
+    def __init__(self, max_reported: int = MAX_REPORTED_ERRORS):
+        """
+        Initializes an empty report of the rows read while loading a package file.
+
+        :param max_reported: Number of problems kept with their line number and message.
+        :type max_reported: int
+        """
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.error_count = 0
+        self.errors: List[Tuple[int, str]] = []
+        self.max_reported = max_reported
+
+    def add_error(self, line_number: int, message: str):
+        """
+        Records a rejected row.
+
+        :param line_number: Line of the row in the package file.
+        :param message: What was wrong with the row.
+        """
+        self.error_count += 1
+        if len(self.errors) < self.max_reported:
+            self.errors.append((line_number, message))
+
+    @property
+    def ok(self) -> bool:
+        """Whether every row was loaded."""
+        return self.error_count == 0
+
+    def __str__(self) -> str:
+        lines = [f"Loaded {self.rows_loaded} of {self.rows_read} package rows ({self.error_count} rejected)."]
+        lines.extend(f"  line {line_number}: {message}" for line_number, message in self.errors)
+        if self.error_count > len(self.errors):
+            lines.append(f"  ... and {self.error_count - len(self.errors)} more")
+        return "\n".join(lines)
+
+
+@lru_cache(maxsize=256)
+def parse_deadline(text: str) -> int:
+    """
+    Parses a deadline such as "10:30 AM" or "EOD" into seconds since midnight. Manifests repeat
+    a handful of deadlines, so results are cached.
+
+    :param text: The deadline column of a package row.
+    :return: Seconds since midnight.
+    :rtype: int
+    :raises: ValueError if the text is not a deadline.
+    """
+    text = text.strip()
+    if text.upper() == "EOD":
+        return END_OF_DAY_SECONDS
+
+    clock, _, meridiem = text.partition(" ")
+    hours, _, minutes = clock.partition(":")
+    meridiem = meridiem.strip().upper()
+    if not (hours.isdigit() and minutes.isdigit() and len(minutes) == 2 and meridiem in ("AM", "PM")):
+        raise ValueError(f"Invalid deadline '{text}'. Expected 'HH:MM AM/PM' or 'EOD'.")
+    hours, minutes = int(hours), int(minutes)
+    if not (1 <= hours <= 12 and minutes < 60):
+        raise ValueError(f"Invalid deadline '{text}'.")
+    # 12 AM is midnight and 12 PM is noon, as with strptime's %I %p.
+    hours = hours % 12 + (12 if meridiem == "PM" else 0)
+    return hours * 3600 + minutes * 60
+
+
+def parse_weight(text: str) -> float:
+    """
+    Parses a weight such as "21 Kilos" (or a bare number) into kilograms.
+
+    :param text: The weight column of a package row.
+    :return: The weight.
+    :rtype: float
+    :raises: ValueError if the weight is missing, not a number or negative.
+    """
+    fields = text.split()
+    if not fields:
+        raise ValueError("Missing weight.")
+    try:
+        weight = float(fields[0])
+    except ValueError:
+        raise ValueError(f"Invalid weight '{text}'.") from None
+    if weight < 0 or weight != weight:
+        raise ValueError(f"Invalid weight '{text}'.")
+    return weight
+
+
+def read_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Tuple[int, list]]]:
+    """
+    Reads a CSV file lazily, yielding lists of at most chunk_size (line number, row) pairs.
+
+    :param path: The CSV file to read.
+    :param chunk_size: Number of rows per chunk.
+    :return: The chunks, in file order.
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        rows = ((reader.line_num, row) for row in reader if row)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def parse_rows(chunks: Iterable[List[Tuple[int, list]]], distance_matrix: DistanceMatrix,
+               report: ValidationReport, loaded_ids: Optional[Container[int]] = None) -> Iterator[tuple]:
+    """
+    Validates package rows and yields the parsed fields of each valid one. Invalid rows are
+    recorded in the report and skipped.
+
+    :param chunks: Chunks of (line number, row) pairs, as from read_chunks.
+    :param distance_matrix: The distance matrix used to resolve package addresses.
+    :param report: The report to record rows and problems in.
+    :param loaded_ids: The IDs loaded so far, checked for duplicates (for example the package table being
+        filled, so no second set of IDs is kept). By default the IDs yielded by this call are tracked.
+    :return: (package ID, address, city, state, zipcode, deadline seconds, weight, location index, notes)
+        for every valid row.
+    """
+    seen_ids = set() if loaded_ids is None else None
+    # Addresses already known to be missing, so each one costs a single scan of the address table.
+    unknown_addresses = set()
+
+    for chunk in chunks:
+        for line_number, row in chunk:
+            report.rows_read += 1
+            if len(row) < 7:
+                report.add_error(line_number, f"Expected at least 7 columns, got {len(row)}.")
+                continue
+            try:
+                package_id = int(row[0])
+            except ValueError:
+                report.add_error(line_number, f"Invalid package ID '{row[0]}'.")
+                continue
+            if package_id in (seen_ids if seen_ids is not None else loaded_ids):
+                report.add_error(line_number, f"Duplicate package ID {package_id}.")
+                continue
+
+            address = row[1]
+            location_index = -1
+            if address not in unknown_addresses:
+                try:
+                    location_index = distance_matrix.index_of(address)
+                except ValueError:
+                    unknown_addresses.add(address)
+            if location_index < 0:
+                report.add_error(line_number, f"Package {package_id}: unknown address '{address}'.")
+                continue
+
+            try:
+                deadline = parse_deadline(row[5])
+                weight = parse_weight(row[6])
+            except ValueError as error:
+                report.add_error(line_number, f"Package {package_id}: {error}")
+                continue
+
+            # Special instructions are not CSV-quoted, so "Must be delivered with 15, 19" spans several columns.
+            notes = ",".join(row[7:]).rstrip(",").strip().strip("'")
+
+            if seen_ids is not None:
+                seen_ids.add(package_id)
+            report.rows_loaded += 1
+            yield package_id, address, row[2], row[3], row[4], deadline, weight, location_index, notes
+
+
+def load_packages(path: str, package_table, distance_matrix: DistanceMatrix, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  report: Optional[ValidationReport] = None) -> ValidationReport:
+    """
+    Streams a package file into a package store (or hash table) without reading the whole file
+    into memory. Rows with unknown addresses, bad deadlines or bad weights, and IDs already in
+    the table, are reported and skipped instead of stopping the load.
+
+    :param path: The package CSV file.
+    :param package_table: A PackageStore, or a hash table that Package objects are inserted into.
+    :param distance_matrix: The distance matrix used to resolve package addresses.
+    :param chunk_size: Number of rows read and validated at a time.
+    :param report: The report to record into (a new one by default).
+    :return: The validation report.
+    :rtype: ValidationReport
+
+    Time Complexity:
+        O(n) where n is the number of rows, plus one address table scan per distinct unknown address.
+    Space Complexity:
+        O(chunk_size) beyond the loaded packages.
+    """
+    report = report if report is not None else ValidationReport()
+    rows = parse_rows(read_chunks(path, chunk_size), distance_matrix, report, loaded_ids=package_table)
+
+    if isinstance(package_table, PackageStore):
+        append = package_table.append
+        for package_id, address, city, state, zipcode, deadline, weight, location_index, notes in rows:
+            append(package_id, address, city, state, zipcode, deadline, weight, LOADED_STATUS, location_index, notes)
+    else:
+        for package_id, address, city, state, zipcode, deadline, weight, location_index, notes in rows:
+            package = Package(package_id=package_id, address=address, city=city, state=state, zipcode=zipcode,
+                              deadline_time=_DEADLINE_DATE + datetime.timedelta(seconds=deadline), weight=weight,
+                              status=LOADED_STATUS, location_index=location_index, notes=notes)
+            package_table.insert(package_id, package)
+    return report
@@ -0,0 +1,342 @@
+import datetime
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from HashMap import HashMap
+from Package import Package
+from TimeModel import seconds_since_midnight
+
+# Departure and delivery times that have not happened yet are stored as this many seconds.
+NO_TIME = -1.0
+
+# Deadlines are reported as times on this date, like datetime.strptime("10:30 AM", "%I:%M %p").
+_DEADLINE_DATE = datetime.datetime(1900, 1, 1)
+
+# Package IDs below this many times the number of packages (plus a margin) are indexed by a flat
+# array; larger, sparse IDs go to a HashMap instead.
+DENSE_ID_FACTOR = 4
+DENSE_ID_MARGIN = 1024
+
+
+def _time_seconds(time: Optional[datetime.timedelta]) -> float:
+    return seconds_since_midnight(time) if time is not None else NO_TIME
+
+
+def _deadline_seconds(deadline_time) -> int:
+    return int(seconds_since_midnight(deadline_time))
+
+
+class PackageView:
+    """
+    A package stored in a PackageStore. Exposes the same attributes and methods as Package, but
+    holds only the store and a row number; every attribute reads or writes the store's columns.
+    """
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "PackageStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def package_id(self) -> int:
+        return self._store.ids[self._row]
+
+    @property
+    def address(self) -> str:
+        return self._store.text(self._store.addresses[self._row])
+
+    @address.setter
+    def address(self, value: str):
+        self._store.addresses[self._row] = self._store.intern(value)
+
+    @property
+    def city(self) -> str:
+        return self._store.text(self._store.cities[self._row])
+
+    @city.setter
+    def city(self, value: str):
+        self._store.cities[self._row] = self._store.intern(value)
+
+    @property
+    def state(self) -> str:
+        return self._store.text(self._store.states[self._row])
+
+    @state.setter
+    def state(self, value: str):
+        self._store.states[self._row] = self._store.intern(value)
+
+    @property
+    def zipcode(self) -> str:
+        return self._store.text(self._store.zipcodes[self._row])
+
+    @zipcode.setter
+    def zipcode(self, value: str):
+        self._store.zipcodes[self._row] = self._store.intern(value)
+
+    @property
+    def deadline_seconds(self) -> int:
+        return self._store.deadlines[self._row]
+
+    @property
+    def deadline_time(self) -> datetime.datetime:
+        return _DEADLINE_DATE + datetime.timedelta(seconds=self._store.deadlines[self._row])
+
+    @deadline_time.setter
+    def deadline_time(self, value):
+        self._store.deadlines[self._row] = _deadline_seconds(value)
+
+    @property
+    def weight(self) -> float:
+        return self._store.weights[self._row]
+
+    @weight.setter
+    def weight(self, value: float):
+        self._store.weights[self._row] = value
+
+    @property
+    def status(self) -> str:
+        return self._store.text(self._store.statuses[self._row])
+
+    @status.setter
+    def status(self, value: str):
+        self._store.statuses[self._row] = self._store.intern(value)
+
+    @property
+    def departure_time(self) -> Optional[datetime.timedelta]:
+        seconds = self._store.departures[self._row]
+        return datetime.timedelta(seconds=seconds) if seconds != NO_TIME else None
+
+    @departure_time.setter
+    def departure_time(self, value: Optional[datetime.timedelta]):
+        self._store.departures[self._row] = _time_seconds(value)
+
+    @property
+    def delivery_time(self) -> Optional[datetime.timedelta]:
+        seconds = self._store.deliveries[self._row]
+        return datetime.timedelta(seconds=seconds) if seconds != NO_TIME else None
+
+    @delivery_time.setter
+    def delivery_time(self, value: Optional[datetime.timedelta]):
+        self._store.deliveries[self._row] = _time_seconds(value)
+
+    @property
+    def location_index(self) -> int:
+        return self._store.locations[self._row]
+
+    @location_index.setter
+    def location_index(self, value: int):
+        self._store.locations[self._row] = value
+
+    @property
+    def notes(self) -> str:
+        return self._store.text(self._store.notes[self._row])
+
+    @notes.setter
+    def notes(self, value: str):
+        self._store.notes[self._row] = self._store.intern(value)
+
+    # Same output and status rules as Package.
+    __str__ = Package.__str__
+    format_status = Package.format_status
+    update_status = Package.update_status
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PackageView) and self._store is other._store and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._row))
+
+    def __repr__(self) -> str:
+        return f"PackageView({self.package_id})"
+
+
+class PackageStore:
+    def __init__(self, initial_capacity: int = 0):
+        """
+        Initializes an empty columnar package store.
+
+        Each package field is one column: typed arrays for the numeric fields (seconds since
+        midnight for times) and, for text fields, array indices into a table of distinct
+        strings, so a city or status shared by many packages is stored once. lookup() and
+        values() return PackageView objects, which behave like Package objects without
+        holding any data themselves. The store also offers the HashMap methods the rest of
+        the program uses, so it can stand in for the package hash table.
+
+        :param initial_capacity: Expected number of packages, used to size the ID index.
+        :type initial_capacity: int
+
+        Time Complexity:
+            O(1)
+        Space Complexity:
+            O(1) per package field, plus O(s) for s distinct strings.
+        """
+        self.ids = array('q')
+        self.locations = array('i')
+        self.deadlines = array('i')
+        self.weights = array('d')
+        self.departures = array('d')
+        self.deliveries = array('d')
+        self.addresses = array('i')
+        self.cities = array('i')
+        self.states = array('i')
+        self.zipcodes = array('i')
+        self.statuses = array('i')
+        self.notes = array('i')
+
+        # String table: code -> string, and string -> code.
+        self._strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+
+        # Package ID -> row: a flat array for small IDs (-1 where unused) and a HashMap for the rest.
+        self._dense_rows = array('l', [-1]) * max(0, initial_capacity + 1)
+        self._sparse_rows = HashMap()
+        self._size = 0
+
+    def intern(self, text: str) -> int:
+        """
+        Returns the string table code of a string, adding the string if it is new.
+
+        Time Complexity:
+            Average case: O(1)
+        """
+        code = self._string_codes.get(text)
+        if code is None:
+            code = self._string_codes[text] = len(self._strings)
+            self._strings.append(text)
+        return code
+
+    def text(self, code: int) -> str:
+        """Returns the string with the given string table code."""
+        return self._strings[code]
+
+    def _row_of(self, package_id: int) -> int:
+        if 0 <= package_id < len(self._dense_rows):
+            row = self._dense_rows[package_id]
+            # IDs stored before the flat index grew past them stay in the HashMap.
+            if row >= 0 or not self._sparse_rows:
+                return row
+        row = self._sparse_rows.lookup(package_id)
+        return row if row is not None else -1
+
+    def _set_row(self, package_id: int, row: int):
+        limit = DENSE_ID_FACTOR * (len(self.ids) + 1) + DENSE_ID_MARGIN
+        if 0 <= package_id < limit:
+            if package_id >= len(self._dense_rows):
+                # Grow the flat index geometrically, up to the dense limit.
+                new_length = min(limit, max(package_id + 1, 2 * len(self._dense_rows)))
+                self._dense_rows.extend(array('l', [-1]) * (new_length - len(self._dense_rows)))
+            self._dense_rows[package_id] = row
+        else:
+            self._sparse_rows.insert(package_id, row)
+
+    def append(self, package_id: int, address: str, city: str, state: str, zipcode: str, deadline_seconds: int,
+               weight: float, status: str = "At the hub", location_index: int = -1, notes: str = "") -> int:
+        """
+        Adds a package from its field values (or replaces the package with the same ID) without
+        creating a Package object.
+
+        :return: The package's row number.
+        :rtype: int
+
+        Time Complexity:
+            Amortized O(1)
+        """
+        row = self._row_of(package_id)
+        if row < 0:
+            row = len(self.ids)
+            self.ids.append(package_id)
+            for column in (self.locations, self.deadlines, self.addresses, self.cities, self.states,
+                           self.zipcodes, self.statuses, self.notes):
+                column.append(0)
+            for column in (self.weights, self.departures, self.deliveries):
+                column.append(0.0)
+            self._set_row(package_id, row)
+            self._size += 1
+
+        self.locations[row] = location_index
+        self.deadlines[row] = deadline_seconds
+        self.weights[row] = weight
+        self.departures[row] = NO_TIME
+        self.deliveries[row] = NO_TIME
+        self.addresses[row] = self.intern(address)
+        self.cities[row] = self.intern(city)
+        self.states[row] = self.intern(state)
+        self.zipcodes[row] = self.intern(zipcode)
+        self.statuses[row] = self.intern(status)
+        self.notes[row] = self.intern(notes)
+        return row
+
+    def insert(self, key: int, item) -> bool:
+        """
+        Copies a Package (or any object with the same attributes) into the store under the given
+        ID, like HashMap.insert.
+
+        :param key: The package ID.
+        :param item: The package to copy.
+        :return: Always returns True.
+
+        Time Complexity:
+            Amortized O(1)
+        """
+        row = self.append(key, item.address, item.city, item.state, item.zipcode,
+                          _deadline_seconds(item.deadline_time), item.weight, item.status,
+                          getattr(item, "location_index", -1), getattr(item, "notes", ""))
+        self.departures[row] = _time_seconds(item.departure_time)
+        self.deliveries[row] = _time_seconds(item.delivery_time)
+        return True
+
+    def lookup(self, key: int) -> Optional[PackageView]:
+        """
+        Returns a view of the package with the given ID, or None if there is none.
+
+        Time Complexity:
+            Average case: O(1)
+        """
+        row = self._row_of(key)
+        return PackageView(self, row) if row >= 0 else None
+
+    def hash_remove(self, key: int) -> bool:
+        """
+        Removes a package from the ID index. Its row stays allocated but is no longer listed.
+
+        :return: True if the package was found and removed, False otherwise.
+        """
+        row = self._row_of(key)
+        if row < 0:
+            return False
+        if 0 <= key < len(self._dense_rows) and self._dense_rows[key] == row:
+            self._dense_rows[key] = -1
+        else:
+            self._sparse_rows.hash_remove(key)
+        self._size -= 1
+        return True
+
+    def _live_rows(self) -> Iterator[int]:
+        ids = self.ids
+        for row in range(len(ids)):
+            if self._row_of(ids[row]) == row:
+                yield row
+
+    def items(self):
+        """Yields (package ID, package view) pairs in insertion order."""
+        for row in self._live_rows():
+            yield self.ids[row], PackageView(self, row)
+
+    def keys(self):
+        """Yields every package ID in insertion order."""
+        for row in self._live_rows():
+            yield self.ids[row]
+
+    def values(self):
+        """Yields a view of every package in insertion order."""
+        for row in self._live_rows():
+            yield PackageView(self, row)
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key) -> bool:
+        return self._row_of(key) >= 0
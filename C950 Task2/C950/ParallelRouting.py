@@ -0,0 +1,202 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+from DeadlineReport import check_route
+from DistanceMatrix import DistanceMatrix
+from LocalSearch import improve_route
+from RouteCache import RouteCache
+from Routing import apply_route, cached_route, nearest_neighbor_route
+from Stop import Stop, build_stops, expand_stops
+from TimeModel import package_deadline_seconds
+from Truck import Truck
+
+# Construction-plus-improvement runs per truck. Run 0 is the plain nearest neighbor route.
+DEFAULT_STARTS = 8
+
+# Randomized runs pick each next stop uniformly among this many nearest remaining stops.
+RANDOMIZED_CHOICES = 3
+
+# The distance matrix as seen by a worker process, attached to shared memory once per worker.
+_worker_matrix: Optional[DistanceMatrix] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+
+
+def randomized_route(stops: list, distance_matrix: DistanceMatrix, start_location: int, rng: random.Random,
+                     choices: int = RANDOMIZED_CHOICES) -> list:
+    """
+    Builds a nearest neighbor style route that picks each next stop at random among the
+    `choices` nearest remaining ones, so different seeds give different starting routes for
+    local search.
+
+    :param stops: The stops to order. Each must have a location_index.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param rng: The random number generator of this run.
+    :param choices: How many of the nearest remaining stops to choose from.
+    :return: The stops in delivery order.
+    :rtype: list
+
+    Time Complexity:
+        O(n^2) where n is the number of stops.
+    Space Complexity:
+        O(n)
+    """
+    remaining = list(stops)
+    route = []
+    current_location = start_location
+
+    while remaining:
+        row = distance_matrix.row(current_location)
+        nearest = sorted(range(len(remaining)), key=lambda position: row[remaining[position].location_index])
+        position = nearest[rng.randrange(min(choices, len(nearest)))]
+        # Swap the chosen stop to the end so removing it is O(1).
+        remaining[position], remaining[-1] = remaining[-1], remaining[position]
+        stop = remaining.pop()
+        route.append(stop)
+        current_location = stop.location_index
+
+    return route
+
+
+def score_route(route: list, distance_matrix: DistanceMatrix, start_location: int, start_seconds: float,
+                speed: float) -> tuple:
+    """
+    Returns the number of late stops and the miles driven along a route; lower is better in
+    that order.
+
+    :param route: Stops in delivery order, each with a location_index and a deadline.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour.
+    :return: (late stops, miles)
+    :rtype: tuple
+    """
+    check = check_route([stop.location_index for stop in route], [stop.deadline for stop in route], distance_matrix,
+                        start_location, start_seconds, speed)
+    return check.late, check.miles
+
+
+def _solve_start(distance_matrix: DistanceMatrix, stop_data: list, start_location: int, start_seconds: float,
+                 speed: float, seed: int, improve: bool, max_iterations: Optional[int],
+                 time_budget: Optional[float]) -> tuple:
+    # Stops carry their position in the truck's stop list in place of packages.
+    stops = []
+    for position, (location_index, deadline) in enumerate(stop_data):
+        stop = Stop(location_index, deadline)
+        stop.packages.append(position)
+        stops.append(stop)
+
+    if seed == 0:
+        route = nearest_neighbor_route(stops, distance_matrix, start_location)
+    else:
+        route = randomized_route(stops, distance_matrix, start_location, random.Random(seed))
+
+    if improve:
+        route = improve_route(route, distance_matrix, start_location, start_seconds, speed,
+                              deadlines=[stop.deadline for stop in route],
+                              max_iterations=max_iterations, time_budget=time_budget)
+
+    late, miles = score_route(route, distance_matrix, start_location, start_seconds, speed)
+    return late, miles, [stop.packages[0] for stop in route]
+
+
+def _attach_worker(memory_name: str, size: int, addresses: List[str]):
+    """Process pool initializer: maps the shared distance array into this worker."""
+    global _worker_matrix, _worker_memory
+    # Workers share the parent's resource tracker, so the parent's unlink is the only cleanup needed.
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    distances = _worker_memory.buf.cast('d')
+    _worker_matrix = DistanceMatrix(size, distances[:size * size], addresses)
+
+
+def _solve_start_in_worker(*args) -> tuple:
+    return _solve_start(_worker_matrix, *args)
+
+
+def deliver_trucks(trucks: List[Truck], package_table, distance_matrix: DistanceMatrix,
+                   starts: int = DEFAULT_STARTS, workers: Optional[int] = None, improve: bool = True,
+                   max_iterations: Optional[int] = None, time_budget: Optional[float] = None,
+                   seed: int = 0, route_cache: Optional[RouteCache] = None) -> List[List[int]]:
+    """
+    Routes every truck with several construction-plus-improvement runs and keeps, per truck,
+    the run with the fewest late stops and then the fewest miles. Run 0 of each truck is the
+    plain nearest neighbor route; the others start from randomized routes.
+
+    All runs of all trucks are spread over a process pool. The distance matrix is copied into
+    shared memory once and mapped by each worker, so tasks only carry the truck's stops.
+    With one worker, the runs are done in this process instead.
+
+    :param trucks: The trucks to route, with their assigned package IDs.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param starts: Runs per truck.
+    :param workers: Number of worker processes (None for one per CPU).
+    :param improve: Whether each run refines its route with local search.
+    :param max_iterations: Maximum number of improving moves per run (None for no limit).
+    :param time_budget: Maximum number of seconds of local search per run (None for no limit).
+    :param seed: Base seed of the randomized runs.
+    :param route_cache: Cache of optimized stop orders. Trucks whose stops (or, with improve, nearly
+        the same stops) have an on-time cached order skip their runs; the chosen routes are stored in it.
+    :return: Each truck's package IDs in delivery order.
+    :rtype: list
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+    starts = max(1, starts)
+
+    # Per truck: its stops, start location and cached route; tasks only send (location, deadline) pairs.
+    jobs = []
+    tasks = []
+    for truck_index, truck in enumerate(trucks):
+        packages = [package_table.lookup(package_id) for package_id in truck.packages]
+        stops = build_stops(packages, [package_deadline_seconds(package) for package in packages])
+        start_location = distance_matrix.index_of(truck.address)
+        cached = None
+        if route_cache is not None:
+            cached = cached_route(route_cache, stops, distance_matrix, start_location, truck.time.total_seconds(),
+                                  truck.speed, improve, max_iterations, time_budget)
+        jobs.append((stops, start_location, cached))
+        if cached is not None:
+            continue
+        stop_data = [(stop.location_index, stop.deadline) for stop in stops]
+        for start in range(starts):
+            run_seed = 0 if start == 0 else seed * 1_000_003 + truck_index * starts + start
+            tasks.append((truck_index, (stop_data, start_location, truck.time.total_seconds(), truck.speed,
+                                        run_seed, improve, max_iterations, time_budget)))
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_solve_start(distance_matrix, *arguments) for _, arguments in tasks]
+    else:
+        results = _run_in_pool(distance_matrix, [arguments for _, arguments in tasks], workers)
+
+    best = [None] * len(trucks)
+    for (truck_index, _), result in zip(tasks, results):
+        if best[truck_index] is None or result[:2] < best[truck_index][:2]:
+            best[truck_index] = result
+
+    for truck, (stops, start_location, cached), result in zip(trucks, jobs, best):
+        if cached is not None:
+            stop_route = cached
+        else:
+            stop_route = [stops[position] for position in result[2]] if result is not None else []
+            if route_cache is not None:
+                route_cache.store(distance_matrix, start_location, stop_route)
+        apply_route(truck, expand_stops(stop_route), distance_matrix, start_location, truck.time, truck.mileage)
+    return [truck.packages for truck in trucks]
+
+
+def _run_in_pool(distance_matrix: DistanceMatrix, task_arguments: list, workers: int) -> list:
+    size = distance_matrix.size
+    memory = shared_memory.SharedMemory(create=True, size=max(8, 8 * size * size))
+    try:
+        memory.buf[:8 * size * size] = memoryview(distance_matrix.distances).cast('B')
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                 initargs=(memory.name, size, distance_matrix.addresses)) as pool:
+            futures = [pool.submit(_solve_start_in_worker, *arguments) for arguments in task_arguments]
+            return [future.result() for future in futures]
+    finally:
+        memory.close()
+        memory.unlink()
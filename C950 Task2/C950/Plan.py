@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from DeadlineReport import DeadlineReport
+from DistanceMatrix import DistanceMatrix
+from StatusTimeline import StatusTimeline
+from Truck import Truck
+
+
+class Plan:
+    def __init__(self, distance_matrix: DistanceMatrix, package_table, trucks: List[Truck], hub_location: int,
+                 unassigned_packages: Optional[List[int]] = None, address_changes: Optional[List[tuple]] = None):
+        """
+        Initializes a computed delivery plan: the loaded scenario together with the routed trucks.
+
+        :param distance_matrix: The distance matrix the plan was computed with.
+        :param package_table: The hash table holding the packages, keyed by package ID.
+        :param trucks: The trucks, with their package lists in delivery order.
+        :param hub_location: Location index of the hub.
+        :param unassigned_packages: IDs of packages that could not be placed on a truck.
+        :param address_changes: Addresses replaced during the day, as recorded by Simulation.address_changes.
+        """
+        self.distance_matrix = distance_matrix
+        self.package_table = package_table
+        self.trucks = trucks
+        self.hub_location = hub_location
+        self.unassigned_packages = unassigned_packages if unassigned_packages is not None else []
+        # Index departure and delivery times (and replaced addresses) once so status queries never touch the
+        # packages.
+        self.status_timeline = StatusTimeline(package_table.values(), address_changes or ())
+
+    def deadline_report(self) -> DeadlineReport:
+        """Compares every package's delivery time with its deadline under this plan."""
+        return DeadlineReport(self.package_table, self.trucks)
+
+    @property
+    def total_mileage(self) -> float:
+        """Total miles driven by all trucks."""
+        return sum(truck.mileage for truck in self.trucks)
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import Instrumentation
+from DistanceMatrix import DistanceMatrix
+
+# Largest number of routes kept; the least recently used route is evicted first.
+DEFAULT_MAX_ENTRIES = 4096
+
+# A cached route whose stop set differs from the requested one by at most this many stops
+# (added plus removed) is used as the starting point of local search.
+NEAR_MISS_MAX_DIFFERENCE = 3
+
+# File layout: magic bytes, one format version byte, then the pickled entries.
+ROUTE_CACHE_MAGIC = b"WGUPSROUTES"
+ROUTE_CACHE_VERSION = 1
+_HEADER_SIZE = len(ROUTE_CACHE_MAGIC) + 1
+
+
+class RouteCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, namespace: str = ""):
+        """
+        Initializes an empty least-recently-used cache of optimized stop orders.
+
+        A route is keyed by a SHA-256 digest of the distance matrix checksum, the start
+        location, the set of stop locations and the namespace, so the same stops yield the same
+        key in any order. Routes are also grouped by everything but the stop set ("family"), so
+        near misses are searched only among routes over the same matrix and start.
+
+        :param max_entries: Largest number of routes kept.
+        :param namespace: Identifies the routing settings; routes stored under other settings are never returned.
+
+        Time Complexity:
+            O(1)
+        Space Complexity:
+            O(s) for s cached stops in total.
+        """
+        self.max_entries = max_entries
+        self.namespace = namespace
+        # Key -> (family, stop locations in delivery order), least recently used first.
+        self._entries: "OrderedDict[bytes, Tuple[bytes, Tuple[int, ...]]]" = OrderedDict()
+        # Family -> {key: set of stop locations}, for near-miss searches.
+        self._families: Dict[bytes, Dict[bytes, frozenset]] = {}
+        # Lookups of an exact stop set that hit or missed, and near misses found by nearest().
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+
+    def _family(self, distance_matrix: DistanceMatrix, start_location: int) -> bytes:
+        digest = hashlib.sha256(distance_matrix.checksum())
+        digest.update(start_location.to_bytes(8, "little", signed=True))
+        digest.update(self.namespace.encode())
+        return digest.digest()
+
+    @staticmethod
+    def _key(family: bytes, locations) -> bytes:
+        digest = hashlib.sha256(family)
+        digest.update(b",".join(str(location).encode() for location in sorted(locations)))
+        return digest.digest()
+
+    def lookup(self, distance_matrix: DistanceMatrix, start_location: int, stops: list) -> Optional[list]:
+        """
+        Returns the stops in their cached delivery order if this exact stop set was routed before.
+
+        :param distance_matrix: The distance matrix the route is over.
+        :param start_location: Location index the route starts from.
+        :param stops: The stops to order, one per distinct location.
+        :return: The stops in cached order, or None on a miss.
+        :rtype: list
+
+        Time Complexity:
+            O(n log n) where n is the number of stops (hashing the sorted stop set).
+        """
+        key = self._key(self._family(distance_matrix, start_location), (stop.location_index for stop in stops))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        by_location = {stop.location_index: stop for stop in stops}
+        return [by_location[location] for location in entry[1]]
+
+    def nearest(self, distance_matrix: DistanceMatrix, start_location: int, stops: list,
+                max_difference: int = NEAR_MISS_MAX_DIFFERENCE) -> Optional[list]:
+        """
+        Finds the cached route over the same matrix and start whose stop set differs least from
+        the given stops (at most max_difference stops added or removed), drops the stops that
+        are gone from it and inserts the new ones where they add the fewest miles.
+
+        :param distance_matrix: The distance matrix the route is over.
+        :param start_location: Location index the route starts from.
+        :param stops: The stops to order, one per distinct location.
+        :param max_difference: Largest number of added plus removed stops.
+        :return: The stops in a warm-start order, or None if no cached route is close enough.
+        :rtype: list
+
+        Time Complexity:
+            O(r * n) for r cached routes in the family, plus O(d * n) to insert d new stops.
+        """
+        family = self._family(distance_matrix, start_location)
+        wanted = frozenset(stop.location_index for stop in stops)
+        best_key = None
+        best_difference = max_difference + 1
+        for key, locations in self._families.get(family, {}).items():
+            if abs(len(locations) - len(wanted)) < best_difference:
+                difference = len(locations ^ wanted)
+                if difference < best_difference:
+                    best_key, best_difference = key, difference
+        if best_key is None:
+            return None
+
+        self._entries.move_to_end(best_key)
+        self.near_misses += 1
+        by_location = {stop.location_index: stop for stop in stops}
+        route = [by_location[location] for location in self._entries[best_key][1] if location in by_location]
+        cached = self._families[family][best_key]
+        lookups = 0
+        for stop in stops:
+            if stop.location_index not in cached:
+                # One lookup to append at the end plus three per insertion point.
+                lookups += 1 + 3 * len(route)
+                _cheapest_insert(route, stop, distance_matrix, start_location)
+        if Instrumentation.is_enabled():
+            Instrumentation.count("distance.lookups", lookups)
+        return route
+
+    def store(self, distance_matrix: DistanceMatrix, start_location: int, route: list):
+        """
+        Stores a stop route, replacing any route over the same stop set and evicting the least
+        recently used routes beyond max_entries.
+
+        :param distance_matrix: The distance matrix the route is over.
+        :param start_location: Location index the route starts from.
+        :param route: The stops in delivery order.
+
+        Time Complexity:
+            O(n log n) where n is the number of stops.
+        """
+        family = self._family(distance_matrix, start_location)
+        locations = tuple(stop.location_index for stop in route)
+        key = self._key(family, locations)
+        self._entries[key] = (family, locations)
+        self._entries.move_to_end(key)
+        self._families.setdefault(family, {})[key] = frozenset(locations)
+
+        while len(self._entries) > self.max_entries:
+            evicted_key, (evicted_family, _) = self._entries.popitem(last=False)
+            members = self._families[evicted_family]
+            del members[evicted_key]
+            if not members:
+                del self._families[evicted_family]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self, path: str):
+        """
+        Writes the cached routes to a file, through a temporary file so readers never see a
+        partial one.
+
+        :param path: The cache file to write.
+        """
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(ROUTE_CACHE_MAGIC)
+            file.write(bytes([ROUTE_CACHE_VERSION]))
+            pickle.dump(list(self._entries.items()), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, namespace: str = "") -> "RouteCache":
+        """
+        Reads cached routes from a file. A missing, unreadable or outdated file gives an empty cache.
+
+        :param path: The cache file to read.
+        :param max_entries: Largest number of routes kept.
+        :param namespace: Identifies the current routing settings.
+        :return: The cache.
+        :rtype: RouteCache
+        """
+        cache = cls(max_entries, namespace)
+        try:
+            with open(path, 'rb') as file:
+                if file.read(_HEADER_SIZE) != ROUTE_CACHE_MAGIC + bytes([ROUTE_CACHE_VERSION]):
+                    return cache
+                entries = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            return cache
+
+        # Oldest first, so the most recently used routes survive a smaller max_entries.
+        for key, (family, locations) in entries[-max_entries:] if max_entries > 0 else []:
+            cache._entries[key] = (family, locations)
+            cache._families.setdefault(family, {})[key] = frozenset(locations)
+        return cache
+
+
+def _cheapest_insert(route: list, stop, distance_matrix: DistanceMatrix, start_location: int):
+    # Insert where the open path from the start grows the least; appending costs only the last leg.
+    distances = distance_matrix.distances
+    size = distance_matrix.size
+    location = stop.location_index
+    path = [start_location] + [item.location_index for item in route]
+
+    best_position = len(route)
+    best_cost = distances[path[-1] * size + location]
+    for position in range(len(route)):
+        before, after = path[position], path[position + 1]
+        cost = (distances[before * size + location] + distances[location * size + after]
+                - distances[before * size + after])
+        if cost < best_cost:
+            best_position, best_cost = position, cost
+    route.insert(best_position, stop)
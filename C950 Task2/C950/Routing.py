@@ -0,0 +1,277 @@
+import datetime
+import heapq
+from typing import Dict, List, Optional
+
+import Instrumentation
+from DeadlineReport import check_route
+from DistanceMatrix import DistanceMatrix
+from HeldKarp import DEFAULT_MAX_STOPS, ExactSolverLimitExceeded, solve_exact
+from LocalSearch import improve_route
+from RouteCache import RouteCache
+from Stop import build_stops, expand_stops
+from TimeModel import package_deadline_seconds
+from Truck import Truck
+
+# Length of the k-nearest candidate lists the nearest neighbor heuristic walks before scanning.
+DEFAULT_CANDIDATES = 10
+
+
+def nearest_neighbor_route(packages: list, distance_matrix: DistanceMatrix, start_location: int,
+                           candidates: int = DEFAULT_CANDIDATES) -> list:
+    """
+    Orders packages with the nearest neighbor heuristic, starting from the given location.
+    Ties go to the package listed last, as in the original greedy loop.
+
+    Undelivered packages are kept in per-location buckets, so delivering one is an O(1) pop
+    instead of a list removal. Each step walks the current location's k-nearest candidate list,
+    built over the route's own stop locations, to find the next stop, and only scans every
+    remaining location when the candidates are all used up (or may hide a tie).
+
+    :param packages: The packages (or stops) to order. Each must have a location_index.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param candidates: Length of the candidate lists (0 to always scan every remaining location).
+    :return: The packages in delivery order.
+    :rtype: list
+
+    Time Complexity:
+        O(m^2 log k) to build the candidate lists, where m is the number of distinct locations and k
+        the number of candidates, plus O(n * k) for n packages when candidates cover most steps;
+        O(n * m) in the worst case.
+    Space Complexity:
+        O(n + m * k)
+    """
+    # Location index -> undelivered (input position, package) pairs, in input order.
+    buckets: Dict[int, list] = {}
+    for position, package in enumerate(packages):
+        bucket = buckets.get(package.location_index)
+        if bucket is None:
+            buckets[package.location_index] = [(position, package)]
+        else:
+            bucket.append((position, package))
+
+    distances = distance_matrix.distances
+    size = distance_matrix.size
+    route = []
+    current_location = start_location
+    # Distances read directly from the matrix, reported once at the end when instrumentation is on.
+    lookups = 0
+
+    candidate_lists = None
+    if candidates > 0:
+        candidate_lists = _candidate_lists(list(buckets), distance_matrix, start_location, candidates)
+        lookups += len(candidate_lists) * len(buckets)
+
+    while buckets:
+        row_start = current_location * size
+        nearest_location = -1
+
+        if candidate_lists is not None:
+            # Packages left at the current location come first, then the candidates by distance.
+            nearest_distance = float('inf')
+            if current_location in buckets:
+                nearest_distance = distances[row_start + current_location]
+                nearest_location = current_location
+                lookups += 1
+
+            exhausted = True
+            for location in candidate_lists[current_location]:
+                lookups += 1
+                current_distance = distances[row_start + location]
+                if current_distance > nearest_distance:
+                    exhausted = False
+                    break
+                bucket = buckets.get(location)
+                if bucket is not None and (current_distance < nearest_distance
+                                           or bucket[-1][0] > buckets[nearest_location][-1][0]):
+                    nearest_distance = current_distance
+                    nearest_location = location
+
+            if exhausted:
+                # Nothing found, or the list ended while still tied: scan every remaining location.
+                nearest_location = -1
+
+        if nearest_location < 0:
+            nearest_distance = float('inf')
+            nearest_position = -1
+            lookups += len(buckets)
+            # For each location with undelivered packages, determine its distance from the current location.
+            for location, bucket in buckets.items():
+                current_distance = distances[row_start + location]
+                if current_distance < nearest_distance or (current_distance == nearest_distance
+                                                           and bucket[-1][0] > nearest_position):
+                    nearest_distance = current_distance
+                    nearest_position = bucket[-1][0]
+                    nearest_location = location
+
+        bucket = buckets[nearest_location]
+        route.append(bucket.pop()[1])
+        if not bucket:
+            del buckets[nearest_location]
+        current_location = nearest_location
+
+    if Instrumentation.is_enabled():
+        Instrumentation.count("distance.lookups", lookups)
+    return route
+
+
+def _candidate_lists(locations: list, distance_matrix: DistanceMatrix, start_location: int,
+                     k: int) -> Dict[int, List[int]]:
+    """
+    Builds the candidate lists of a route from its own stops: for each stop location, and the
+    start location, the k nearest other stop locations ordered by distance.
+
+    Time Complexity:
+        O(m^2 log k) where m is the number of distinct stop locations.
+    """
+    distances = distance_matrix.distances
+    size = distance_matrix.size
+    candidate_lists = {}
+    for location in locations + ([start_location] if start_location not in locations else []):
+        row_start = location * size
+        candidate_lists[location] = heapq.nsmallest(k, (other for other in locations if other != location),
+                                                    key=lambda other: distances[row_start + other])
+    return candidate_lists
+
+
+def cached_route(route_cache: RouteCache, stops: list, distance_matrix: DistanceMatrix, start_location: int,
+                 start_seconds: float, speed: float, warm_start: bool = False, max_iterations: Optional[int] = None,
+                 time_budget: Optional[float] = None) -> Optional[list]:
+    """
+    Returns a route for the stops from the route cache: the cached order of the same stops or,
+    with warm_start, local search started from the cached order of nearly the same stops.
+    Cached orders were optimized for other deadlines and start times, so a route is only
+    returned if it keeps every stop on time now.
+
+    :param route_cache: The cache to look in.
+    :param stops: The stops to order, one per distinct location.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_seconds: Time the route starts, in seconds since midnight.
+    :param speed: Truck speed in miles per hour.
+    :param warm_start: Whether to refine a near miss with local search.
+    :param max_iterations: Maximum number of improving moves of the local search (None for no limit).
+    :param time_budget: Maximum number of seconds of local search (None for no limit).
+    :return: The stops in delivery order, or None if the route must be computed from scratch.
+    :rtype: list
+    """
+    route = route_cache.lookup(distance_matrix, start_location, stops)
+    if route is None and warm_start:
+        route = route_cache.nearest(distance_matrix, start_location, stops)
+        if route is not None:
+            route = improve_route(route, distance_matrix, start_location, start_seconds, speed,
+                                  deadlines=[stop.deadline for stop in route],
+                                  max_iterations=max_iterations, time_budget=time_budget)
+    if route is None:
+        return None
+    check = check_route([stop.location_index for stop in route], [stop.deadline for stop in route],
+                        distance_matrix, start_location, start_seconds, speed)
+    return route if check.feasible else None
+
+
+def apply_route(truck: Truck, route: list, distance_matrix: DistanceMatrix, start_location: int,
+                start_time: datetime.timedelta, start_mileage: float = 0.0):
+    """
+    Drives a truck along a fixed package order and records the result:
+    - The truck's package list is replaced by the package IDs in delivery order.
+    - The truck's mileage, time and address reflect the end of the route.
+    - Each package gets its delivery time and the truck's departure time.
+
+    :param truck: The truck driving the route.
+    :param route: The packages in delivery order.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param start_location: Location index the route starts from.
+    :param start_time: Time the truck starts driving the route.
+    :param start_mileage: Mileage on the truck before the route starts.
+
+    Time Complexity:
+        O(n) where n is the number of packages on the route.
+    Space Complexity:
+        O(1)
+    """
+    truck.packages.clear()
+    truck.mileage = start_mileage
+    truck.time = start_time
+    current_location = start_location
+
+    for package in route:
+        distance = distance_matrix.distance(current_location, package.location_index)
+
+        truck.packages.append(package.package_id)
+        truck.mileage += distance
+        truck.address = package.address
+        current_location = package.location_index
+
+        # Update the truck's current time by adding the time taken to travel to the package.
+        truck.time += datetime.timedelta(hours=distance / truck.speed)
+
+        package.delivery_time = truck.time
+        package.departure_time = truck.depart_time
+
+
+def deliver_packages(truck: Truck, package_table, distance_matrix: DistanceMatrix, improve: bool = False,
+                     max_iterations: Optional[int] = None, time_budget: Optional[float] = None,
+                     method: str = "nearest_neighbor", max_exact_stops: int = DEFAULT_MAX_STOPS,
+                     route_cache: Optional[RouteCache] = None, exact_time_budget: Optional[float] = None) -> List[int]:
+    """
+    Determine the delivery order for packages on a truck using the nearest neighbor algorithm,
+    optionally refined by 2-opt / Or-opt local search, or with the exact Held-Karp solver.
+    The exact solver falls back to the heuristic when the load has more than max_exact_stops
+    distinct stops or cannot be solved within exact_time_budget.
+    Packages are grouped into one stop per address before routing, so every method works on
+    distinct stops rather than individual packages.
+    This function will:
+    - Update the truck's package list in the order they should be delivered.
+    - Calculate the mileage the truck drives.
+    - Record the delivery time for each package.
+
+    :param truck: An instance of the Truck class that is being used for delivery.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param improve: Whether to run the local search improvement stage after nearest neighbor.
+    :param max_iterations: Maximum number of improving moves local search may apply (None for no limit).
+    :param time_budget: Maximum number of seconds local search may run (None for no limit).
+    :param method: "nearest_neighbor" for the greedy heuristic or "exact" for the Held-Karp solver.
+    :param max_exact_stops: Largest number of distinct stops the exact solver is used for.
+    :param route_cache: Cache of optimized stop orders. A cached order for the same stops is reused
+        if it is on time; with improve, a cached order for nearly the same stops is the starting
+        point of local search. New routes are stored in it.
+    :param exact_time_budget: Maximum number of seconds the exact solver may run (None for no limit).
+    :return: The truck's package IDs in delivery order.
+    :rtype: list
+    """
+    packages = [package_table.lookup(package_id) for package_id in truck.packages]
+    start_location = distance_matrix.index_of(truck.address)
+    start_time = truck.time
+
+    if method not in ("nearest_neighbor", "exact"):
+        raise ValueError(f"Unknown routing method '{method}'.")
+
+    # Route over distinct addresses; packages sharing an address are delivered together.
+    stops = build_stops(packages, [package_deadline_seconds(package) for package in packages])
+
+    stop_route = None
+    if route_cache is not None:
+        stop_route = cached_route(route_cache, stops, distance_matrix, start_location, start_time.total_seconds(),
+                                  truck.speed, improve and method == "nearest_neighbor", max_iterations, time_budget)
+    if stop_route is None and method == "exact":
+        try:
+            stop_route = solve_exact(stops, distance_matrix, start_location, start_time.total_seconds(), truck.speed,
+                                     deadlines=[stop.deadline for stop in stops],
+                                     max_stops=max_exact_stops, time_budget=exact_time_budget)
+        except ExactSolverLimitExceeded:
+            stop_route = None  # Too large or too slow to solve exactly; use the heuristic below.
+
+    if stop_route is None:
+        stop_route = nearest_neighbor_route(stops, distance_matrix, start_location)
+
+        if improve:
+            stop_route = improve_route(stop_route, distance_matrix, start_location, start_time.total_seconds(),
+                                       truck.speed, deadlines=[stop.deadline for stop in stop_route],
+                                       max_iterations=max_iterations, time_budget=time_budget)
+
+    if route_cache is not None:
+        route_cache.store(distance_matrix, start_location, stop_route)
+
+    apply_route(truck, expand_stops(stop_route), distance_matrix, start_location, start_time, truck.mileage)
+    return truck.packages
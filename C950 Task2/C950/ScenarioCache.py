@@ -0,0 +1,83 @@
+import glob
+import hashlib
+import os
+import pickle
+from typing import Iterable, List, Optional
+
+from Plan import Plan
+
+# File layout: magic bytes, one format version byte, the 32-byte input checksum, then the pickled plan.
+# Bump the version when the layout changes; code changes are caught by checksumming the sources.
+CACHE_MAGIC = b"WGUPSPLAN"
+CACHE_VERSION = 2
+_HEADER_SIZE = len(CACHE_MAGIC) + 1 + 32
+
+
+def planning_sources() -> List[str]:
+    """
+    Returns the program's Python source files, in a fixed order. Including them in the input
+    checksum means a cached plan is never reused by a different version of the planning code
+    (or of the classes pickled with it).
+
+    :return: Paths of the .py files next to this module.
+    :rtype: list
+    """
+    return sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py")))
+
+
+def input_checksum(paths: Iterable[str], settings=None) -> bytes:
+    """
+    Returns a SHA-256 digest over the contents of the input files and the planning settings.
+    Any change to either invalidates a cached plan.
+
+    :param paths: The scenario input files, in a fixed order.
+    :param settings: Any value whose repr() captures the settings the plan depends on.
+    :return: The 32-byte digest.
+    :rtype: bytes
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 16), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    digest.update(repr(settings).encode())
+    return digest.digest()
+
+
+def save_plan(path: str, checksum: bytes, plan: Plan):
+    """
+    Writes a computed plan to a compact binary cache file. The file is written to a temporary
+    name first and then moved into place, so readers never see a partial file.
+
+    :param path: The cache file to write.
+    :param checksum: The input checksum the plan was computed from.
+    :param plan: The plan to store.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(CACHE_MAGIC)
+        file.write(bytes([CACHE_VERSION]))
+        file.write(checksum)
+        pickle.dump(plan, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_plan(path: str, checksum: bytes) -> Optional[Plan]:
+    """
+    Reads a cached plan if the file exists, has the current format and matches the checksum.
+
+    :param path: The cache file to read.
+    :param checksum: The checksum of the current inputs.
+    :return: The cached plan, or None if there is no valid cache for these inputs.
+    :rtype: Plan
+    """
+    try:
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER_SIZE)
+            if header != CACHE_MAGIC + bytes([CACHE_VERSION]) + checksum:
+                return None
+            plan = pickle.load(file)
+    except Exception:  # Unreadable, truncated or pickled by incompatible classes: recompute.
+        return None
+    return plan if isinstance(plan, Plan) else None
@@ -0,0 +1,316 @@
+import csv
+import heapq
+import json
+from bisect import bisect_left
+from datetime import timedelta
+from itertools import accumulate, product
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+import Instrumentation
+from Assignment import parse_special_notes
+from DeadlineReport import ON_TIME_TOLERANCE
+from DistanceMatrix import DistanceMatrix
+from TimeModel import NEVER, format_seconds, package_deadline_seconds
+from Truck import Truck
+
+SWEEP_FIELDS = ["trucks", "capacity", "drivers", "speed", "departures", "mileage", "late", "unassigned",
+                "total_lateness_minutes", "max_lateness_minutes", "min_slack_minutes", "finish_time"]
+
+
+class Tour:
+    __slots__ = ("package_ids", "miles", "ready_seconds", "_cumulative", "_deadlines", "_latest")
+
+    def __init__(self, package_ids: List[int], locations: List[int], deadlines: List[float], start_location: int,
+                 distance_matrix: DistanceMatrix, ready_seconds: float = 0.0):
+        """
+        A truck's fixed delivery order, prepared so it can be re-timed for any departure time
+        and speed without driving it again.
+
+        A package is on time when departure + miles to it / speed <= deadline, that is when the
+        truck leaves no later than the package's latest departure, deadline - miles / speed. For
+        each speed the latest departures are sorted once (with prefix sums); after that, the late
+        count and total lateness for any departure time come from one binary search.
+
+        :param package_ids: The truck's package IDs in delivery order.
+        :param locations: Location index of each package, in the same order.
+        :param deadlines: Deadline of each package in seconds since midnight, in the same order.
+        :param start_location: Location index the tour starts from.
+        :param distance_matrix: The distance matrix to read distances from.
+        :param ready_seconds: Earliest time the truck can leave (its packages are at the hub and their addresses known).
+
+        Time Complexity:
+            O(n) where n is the number of packages.
+        Space Complexity:
+            O(n)
+        """
+        distances = distance_matrix.distances
+        size = distance_matrix.size
+        self.package_ids = package_ids
+        self._cumulative = list(accumulate(distances[origin * size + destination] for origin, destination
+                                           in zip([start_location] + locations, locations)))
+        self.miles = self._cumulative[-1] if self._cumulative else 0.0
+        if Instrumentation.is_enabled():
+            Instrumentation.count("distance.lookups", len(locations))
+        self._deadlines = deadlines
+        self.ready_seconds = ready_seconds
+        # Speed -> (sorted latest departures, their prefix sums).
+        self._latest: Dict[float, Tuple[List[float], List[float]]] = {}
+
+    def _latest_departures(self, speed: float) -> Tuple[List[float], List[float]]:
+        table = self._latest.get(speed)
+        if table is None:
+            seconds_per_mile = 3600.0 / speed
+            latest = sorted(deadline - miles * seconds_per_mile
+                            for deadline, miles in zip(self._deadlines, self._cumulative))
+            table = self._latest[speed] = (latest, list(accumulate(latest, initial=0.0)))
+        return table
+
+    def retime(self, depart_seconds: float, speed: float) -> Tuple[int, float, float, float]:
+        """
+        Times the tour for a departure time and speed.
+
+        :param depart_seconds: When the truck leaves, in seconds since midnight.
+        :param speed: Truck speed in miles per hour.
+        :return: (late packages, total lateness in seconds, largest lateness in seconds, smallest slack in seconds)
+        :rtype: tuple
+
+        Time Complexity:
+            O(log n) once the speed has been seen, O(n log n) the first time.
+        """
+        latest, prefix = self._latest_departures(speed)
+        if not latest:
+            return 0, 0.0, 0.0, NEVER
+        late = bisect_left(latest, depart_seconds - ON_TIME_TOLERANCE)
+        total_lateness = late * depart_seconds - prefix[late]
+        max_lateness = depart_seconds - latest[0] if late else 0.0
+        return late, total_lateness, max_lateness, latest[0] - depart_seconds
+
+
+def build_tours(trucks: List[Truck], package_table, distance_matrix: DistanceMatrix, hub_location: int,
+                address_corrections: Iterable[tuple] = ()) -> List[Tour]:
+    """
+    Turns routed trucks into re-timeable tours. Packages with a corrected address are timed at
+    the corrected address, and their truck is not ready to leave before the correction is known,
+    just like a truck carrying delayed packages is not ready before they reach the hub.
+
+    :param trucks: The routed trucks, with their package lists in delivery order.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param hub_location: Location index of the hub the tours start from.
+    :param address_corrections: (time known, package ID, address, ...) tuples, as in main.ADDRESS_CORRECTIONS.
+    :return: One tour per truck.
+    :rtype: list
+    """
+    corrections = {package_id: (time.total_seconds(), distance_matrix.index_of(address))
+                   for time, package_id, address, *_ in address_corrections}
+
+    tours = []
+    for truck in trucks:
+        locations = []
+        deadlines = []
+        ready = 0.0
+        for package_id in truck.packages:
+            package = package_table.lookup(package_id)
+            location = package.location_index
+            ready = max(ready, parse_special_notes(package.notes).available_time.total_seconds())
+            if package_id in corrections:
+                known, location = corrections[package_id]
+                ready = max(ready, known)
+            locations.append(location)
+            deadlines.append(package_deadline_seconds(package))
+        tours.append(Tour(list(truck.packages), locations, deadlines, hub_location, distance_matrix, ready))
+    return tours
+
+
+def dispatch(ready: List[float], durations: List[float], drivers: Optional[int] = None) -> List[float]:
+    """
+    Returns each truck's departure time when trucks leave in the order they become ready, each
+    waiting for a free driver; a driver is free again once their truck's last delivery is made.
+    This is the order Simulation dispatches trucks in.
+
+    :param ready: Earliest departure of each truck, in seconds since midnight.
+    :param durations: Driving time of each truck's tour, in seconds.
+    :param drivers: Number of drivers (None for one per truck).
+    :return: Departure time of each truck.
+    :rtype: list
+
+    Time Complexity:
+        O(t log t) where t is the number of trucks.
+    """
+    count = len(ready)
+    free = [0.0] * min(count, drivers if drivers is not None else count)
+    departures = [0.0] * count
+    for index in sorted(range(count), key=lambda truck_index: (ready[truck_index], truck_index)):
+        depart = max(ready[index], heapq.heappop(free)) if free else NEVER
+        departures[index] = depart
+        if depart != NEVER:
+            heapq.heappush(free, depart + durations[index])
+    return departures
+
+
+def retime_fleet(tours: List[Tour], departures: Sequence[timedelta], speed: float,
+                 drivers: Optional[int] = None) -> dict:
+    """
+    Times a fleet's fixed tours for one set of departure times, a speed and a driver count.
+
+    :param tours: The fleet's tours, in truck order.
+    :param departures: Scheduled departure time of each truck.
+    :param speed: Truck speed in miles per hour.
+    :param drivers: Number of drivers (None for one per truck).
+    :return: Late packages, total and largest lateness and smallest slack (seconds), and the last finish time.
+    :rtype: dict
+
+    Time Complexity:
+        O(t log n) for t trucks of at most n packages, once each speed has been seen.
+    """
+    seconds_per_mile = 3600.0 / speed
+    durations = [tour.miles * seconds_per_mile for tour in tours]
+    ready = [max(departure.total_seconds(), tour.ready_seconds) for departure, tour in zip(departures, tours)]
+
+    late = 0
+    total_lateness = 0.0
+    max_lateness = 0.0
+    min_slack = NEVER
+    finish = 0.0
+    for tour, depart, duration in zip(tours, dispatch(ready, durations, drivers), durations):
+        if depart == NEVER:
+            # No driver at all: nothing on this truck is delivered.
+            late += len(tour.package_ids)
+            finish = NEVER
+            continue
+        tour_late, tour_lateness, tour_max, tour_slack = tour.retime(depart, speed)
+        late += tour_late
+        total_lateness += tour_lateness
+        max_lateness = max(max_lateness, tour_max)
+        min_slack = min(min_slack, tour_slack)
+        finish = max(finish, depart + duration)
+    return {"late": late, "total_lateness": total_lateness, "max_lateness": max_lateness, "min_slack": min_slack,
+            "finish": finish}
+
+
+def sweep(route_fleet: Callable[[List[Truck]], List[int]], package_table, distance_matrix: DistanceMatrix,
+          hub_address: str, departures: Sequence[Sequence[timedelta]], speeds: Sequence[float],
+          capacities: Sequence[int], truck_counts: Sequence[int], driver_counts: Sequence[Optional[int]] = (None,),
+          planning_speed: Optional[float] = None, address_corrections: Iterable[tuple] = ()) -> List[dict]:
+    """
+    Evaluates every combination of departure times, speed, capacity, truck count and driver
+    count, and returns one result row per scenario.
+
+    Only the fleet (capacity and truck count) decides which packages go on which truck and in
+    what order, so each fleet is assigned and routed once, with every truck's first departure
+    option and the planning speed. All departure, speed and driver combinations of that fleet
+    re-time its fixed tours instead of routing again.
+
+    :param route_fleet: Assigns and routes packages onto the given trucks, returning the IDs that did not fit.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param hub_address: Address of the hub the trucks leave from.
+    :param departures: Departure time options of each truck, in truck order; a fleet of n trucks
+        combines the options of the first n.
+    :param speeds: Truck speeds in miles per hour.
+    :param capacities: Truck capacities in packages.
+    :param truck_counts: Fleet sizes.
+    :param driver_counts: Numbers of drivers (None for one per truck).
+    :param planning_speed: Speed the fleets are routed with (the first speed by default).
+    :param address_corrections: (time known, package ID, address, ...) tuples, as in main.ADDRESS_CORRECTIONS.
+    :return: Result rows with the fields in SWEEP_FIELDS, fleet by fleet.
+    :rtype: list
+    :raises: ValueError if a truck count exceeds the number of trucks with departure options.
+
+    Time Complexity:
+        O(f * R + s * t log n) for f fleets costing R to route, s scenarios, t trucks and n packages per truck.
+    """
+    if max(truck_counts, default=0) > len(departures):
+        raise ValueError(f"Departure options are given for {len(departures)} trucks, "
+                         f"but fleets of up to {max(truck_counts)} trucks are swept.")
+    planning_speed = planning_speed if planning_speed is not None else speeds[0]
+    hub_location = distance_matrix.index_of(hub_address)
+    address_corrections = list(address_corrections)
+
+    rows = []
+    for truck_count, capacity in product(truck_counts, capacities):
+        trucks = [Truck(capacity=capacity, speed=planning_speed, address=hub_address, depart_time=options[0])
+                  for options in departures[:truck_count]]
+        unassigned = len(route_fleet(trucks))
+        tours = build_tours(trucks, package_table, distance_matrix, hub_location, address_corrections)
+        mileage = round(sum(tour.miles for tour in tours), 1)
+
+        for drivers, speed, truck_departures in product(driver_counts, speeds, product(*departures[:truck_count])):
+            timing = retime_fleet(tours, truck_departures, speed, drivers)
+            rows.append({
+                "trucks": truck_count,
+                "capacity": capacity,
+                "drivers": drivers if drivers is not None else truck_count,
+                "speed": speed,
+                "departures": " ".join(str(departure) for departure in truck_departures),
+                "mileage": mileage,
+                # Packages left at the hub are never delivered, so they count as late.
+                "late": timing["late"] + unassigned,
+                "unassigned": unassigned,
+                "total_lateness_minutes": round(timing["total_lateness"] / 60, 1),
+                "max_lateness_minutes": round(timing["max_lateness"] / 60, 1),
+                "min_slack_minutes": round(timing["min_slack"] / 60, 1) if timing["min_slack"] != NEVER else None,
+                "finish_time": format_seconds(timing["finish"]),
+            })
+    return rows
+
+
+def parse_grid(text: str, convert: Callable[[str], object], default_step: Optional[str] = None) -> list:
+    """
+    Parses sweep values given as a comma-separated list ("15,18,25") and/or inclusive ranges
+    written start..stop/step ("15..25/5", "8:00..9:00/0:15").
+
+    :param text: The values.
+    :param convert: Converts one value, e.g. int, float or BatchQuery.parse_time.
+    :param default_step: Step used when a range has none (None to require one).
+    :return: The values, in the order given.
+    :rtype: list
+    :raises: ValueError if a value or range is invalid.
+    """
+    values = []
+    for part in text.split(","):
+        part = part.strip()
+        if ".." not in part:
+            values.append(convert(part))
+            continue
+        bounds, _, step = part.partition("/")
+        start, _, stop = bounds.partition("..")
+        step = step or default_step
+        if step is None:
+            raise ValueError(f"Range '{part}' needs a step, e.g. '{part}/1'.")
+        start, stop, step = convert(start), convert(stop), convert(step)
+        if not step > step * 0:
+            raise ValueError(f"Range '{part}' needs a positive step.")
+        # Generate start + i * step rather than adding repeatedly, so float ranges do not drift.
+        count = int((stop - start) / step + 1e-9) + 1
+        values.extend(start + step * index for index in range(max(0, count)))
+    return values
+
+
+def write_table(rows: Iterable[dict], output: TextIO, output_format: str = "csv") -> int:
+    """
+    Writes sweep result rows as CSV (with a header row) or as JSON lines.
+
+    :param rows: The rows to write.
+    :param output: The text stream to write to.
+    :param output_format: "csv" or "jsonl".
+    :return: The number of rows written.
+    :rtype: int
+    """
+    if output_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown output format '{output_format}'.")
+
+    count = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=SWEEP_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            output.write(json.dumps(row))
+            output.write("\n")
+            count += 1
+    output.flush()
+    return count
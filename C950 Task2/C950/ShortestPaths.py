@@ -0,0 +1,277 @@
+import os
+import struct
+import warnings
+from array import array
+from itertools import compress
+from typing import List, Optional
+
+from DistanceMatrix import DistanceMatrix
+
+try:
+    import numpy
+except ImportError:  # The pure Python closure below is used instead (see requirements.txt).
+    numpy = None
+
+# Largest table closed without numpy. The pure Python closure is O(n^3) interpreted work: a few
+# seconds at 400 locations, minutes at a thousand. Larger tables are routed on their direct
+# distances instead, with a warning, unless a cached closure exists.
+PYTHON_CLOSURE_MAX_SIZE = 500
+
+# A path through a via point only replaces the direct leg if it is shorter by more than this many
+# miles, so float rounding in one-decimal tables (0.7 + 0.1 < 0.8) does not create fake detours.
+CLOSURE_EPSILON = 1e-9
+
+# File layout: magic bytes, one format version byte, the 32-byte input checksum, the matrix size as
+# an unsigned 32-bit integer, then the closed distances ('d') and via points ('i') in native order.
+CLOSURE_MAGIC = b"WGUPSAPSP"
+CLOSURE_VERSION = 1
+_HEADER_SIZE = len(CLOSURE_MAGIC) + 1 + 32
+_SIZE_FORMAT = "<I"
+
+
+class ClosedDistanceMatrix(DistanceMatrix):
+    def __init__(self, size: int, distances: array, addresses: List[str], via: array):
+        """
+        Initializes a distance matrix whose distances are shortest-path distances, together with
+        the via point of every pair so the actual path can be rebuilt.
+
+        :param size: Number of locations in the matrix.
+        :type size: int
+        :param distances: Row-major array of size * size shortest-path distances.
+        :type distances: array.array
+        :param addresses: Street address of each location, indexed by location number.
+        :type addresses: list
+        :param via: Row-major array of size * size location indices; via[a * size + b] is a location
+            the shortest path from a to b passes through, or -1 if the direct leg is shortest.
+        :type via: array.array
+
+        Time Complexity:
+            O(n) where n is the number of locations.
+        Space Complexity:
+            O(n^2) for the distance and via arrays.
+        """
+        super().__init__(size, distances, addresses)
+        if len(via) != size * size:
+            raise ValueError(f"Expected {size * size} via points for {size} locations, got {len(via)}.")
+        self.via = via
+
+    @classmethod
+    def from_matrix(cls, distance_matrix: DistanceMatrix) -> "ClosedDistanceMatrix":
+        """
+        Runs the Floyd-Warshall closure over a loaded distance matrix.
+
+        :param distance_matrix: The matrix of direct distances, as read from the CSV.
+        :type distance_matrix: DistanceMatrix
+        :return: The closed matrix.
+        :rtype: ClosedDistanceMatrix
+        """
+        distances, via = floyd_warshall(distance_matrix.size, distance_matrix.distances)
+        return cls(distance_matrix.size, distances, distance_matrix.addresses, via)
+
+    def path(self, point_a: int, point_b: int) -> List[int]:
+        """
+        Returns the locations the shortest path from one location to another passes through.
+
+        :param point_a: Index of the first location.
+        :type point_a: int
+        :param point_b: Index of the second location.
+        :type point_b: int
+        :return: Location indices from point_a to point_b, both included.
+        :rtype: list
+
+        Time Complexity:
+            O(p) where p is the number of locations on the path.
+        Space Complexity:
+            O(p)
+        """
+        if point_a == point_b:
+            return [point_a]
+
+        size = self.size
+        via = self.via
+        path = [point_a]
+        current = point_a
+        pending = [point_b]
+        # Split each leg at its via point until every remaining leg is direct.
+        while pending:
+            target = pending[-1]
+            middle = via[current * size + target]
+            if middle < 0:
+                path.append(target)
+                current = pending.pop()
+            else:
+                pending.append(middle)
+        return path
+
+    def detour_count(self) -> int:
+        """
+        Returns the number of ordered location pairs whose shortest path is not the direct leg.
+
+        Time Complexity:
+            O(n^2) where n is the number of locations.
+        """
+        return sum(1 for middle in self.via if middle >= 0)
+
+
+def floyd_warshall(size: int, distances: array) -> tuple:
+    """
+    Computes all-pairs shortest-path distances and via points for a row-major distance matrix.
+    Uses numpy when it is installed and a row-wise pure Python loop otherwise. The matrix need not
+    be symmetric; symmetric ones (every loaded table) take a faster path without numpy.
+
+    :param size: Number of locations.
+    :param distances: Row-major array of size * size direct distances.
+    :return: The closed distances (array 'd') and the via points (array 'i'), both row-major.
+    :rtype: tuple
+
+    Time Complexity:
+        O(n^3) where n is the number of locations.
+    Space Complexity:
+        O(n^2)
+    """
+    if numpy is not None:
+        return _floyd_warshall_numpy(size, distances)
+    return _floyd_warshall_python(size, distances)
+
+
+def _floyd_warshall_numpy(size: int, distances: array) -> tuple:
+    closed = numpy.frombuffer(distances, dtype=numpy.float64).reshape(size, size).copy()
+    via = numpy.full((size, size), -1, dtype=numpy.int32)
+    through = numpy.empty_like(closed)
+    better = numpy.empty((size, size), dtype=bool)
+
+    for k in range(size):
+        # All pairs at once: the distance from i to j through k, compared with the best so far.
+        numpy.add(closed[:, k, None], closed[None, k, :], out=through)
+        numpy.less(through, closed - CLOSURE_EPSILON, out=better)
+        if better.any():
+            numpy.copyto(closed, through, where=better)
+            via[better] = k
+
+    closed_distances = array('d')
+    closed_distances.frombytes(closed.tobytes())
+    via_points = array('i')
+    via_points.frombytes(via.astype(numpy.intc).tobytes())
+    return closed_distances, via_points
+
+
+def _floyd_warshall_python(size: int, distances: array) -> tuple:
+    rows = [distances[i * size:(i + 1) * size].tolist() for i in range(size)]
+    via_rows = [array('i', [-1]) * size for _ in range(size)]
+    symmetric = all(rows[i][j] == rows[j][i] for i in range(size) for j in range(i + 1, size))
+    # Upper bounds on each row's largest distance. Rows only shrink, so stale values stay valid.
+    row_max = [max(row, default=0.0) for row in rows]
+
+    for k in range(size):
+        row_k = rows[k]
+        # Shortest leg out of k. A detour i -> k -> j is at least d(i, k) plus this.
+        nearest = min((value for j, value in enumerate(row_k) if j != k), default=float('inf'))
+
+        for i in range(size):
+            row_i = rows[i]
+            d_ik = row_i[k]
+            if i == k or d_ik + nearest >= row_max[i] - CLOSURE_EPSILON:
+                continue  # Going through k cannot shorten any pair in this row.
+
+            # Compare a whole row slice at a time. A symmetric matrix stays symmetric, so only pairs
+            # (i, j) with j > i are compared and each shorter pair is mirrored to (j, i).
+            limit = d_ik + CLOSURE_EPSILON
+            first = i + 1 if symmetric else 0
+            shorter = [onward + limit < direct for direct, onward in zip(row_i[first:], row_k[first:])]
+            if True in shorter:
+                via_i = via_rows[i]
+                for j in compress(range(first, size), shorter):
+                    distance = d_ik + row_k[j]
+                    row_i[j] = distance
+                    via_i[j] = k
+                    if symmetric:
+                        rows[j][i] = distance
+                        via_rows[j][i] = k
+                row_max[i] = max(row_i)
+
+    closed_distances = array('d')
+    via_points = array('i')
+    for row, via_row in zip(rows, via_rows):
+        closed_distances.extend(row)
+        via_points.extend(via_row)
+    return closed_distances, via_points
+
+
+def save_closure(path: str, checksum: bytes, distance_matrix: ClosedDistanceMatrix):
+    """
+    Writes a closed distance matrix to a binary cache file, atomically like the plan cache.
+
+    :param path: The cache file to write.
+    :param checksum: The checksum of the distance and address files the closure was computed from.
+    :param distance_matrix: The closed matrix to store.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(CLOSURE_MAGIC)
+        file.write(bytes([CLOSURE_VERSION]))
+        file.write(checksum)
+        file.write(struct.pack(_SIZE_FORMAT, distance_matrix.size))
+        distance_matrix.distances.tofile(file)
+        distance_matrix.via.tofile(file)
+    os.replace(temporary_path, path)
+
+
+def load_closure(path: str, checksum: bytes, distance_matrix: DistanceMatrix) -> Optional[ClosedDistanceMatrix]:
+    """
+    Reads a cached closure of the given matrix if the file exists and matches the checksum.
+
+    :param path: The cache file to read.
+    :param checksum: The checksum of the current distance and address files.
+    :param distance_matrix: The freshly loaded matrix, whose addresses the closure is attached to.
+    :return: The closed matrix, or None if there is no valid cache for these inputs.
+    :rtype: ClosedDistanceMatrix
+    """
+    size = distance_matrix.size
+    distances = array('d')
+    via = array('i')
+    try:
+        with open(path, 'rb') as file:
+            if file.read(_HEADER_SIZE) != CLOSURE_MAGIC + bytes([CLOSURE_VERSION]) + checksum:
+                return None
+            if struct.unpack(_SIZE_FORMAT, file.read(struct.calcsize(_SIZE_FORMAT)))[0] != size:
+                return None
+            distances.fromfile(file, size * size)
+            via.fromfile(file, size * size)
+    except (OSError, EOFError, struct.error):
+        return None
+    return ClosedDistanceMatrix(size, distances, distance_matrix.addresses, via)
+
+
+def close_distance_matrix(distance_matrix: DistanceMatrix, cache_path: Optional[str] = None,
+                          checksum: Optional[bytes] = None) -> DistanceMatrix:
+    """
+    Returns the shortest-path closure of a distance matrix, reusing the cached closure when one
+    matches the checksum and refreshing the cache otherwise. Without numpy, a table larger than
+    PYTHON_CLOSURE_MAX_SIZE that has no cached closure is returned unchanged, with a warning.
+
+    :param distance_matrix: The matrix of direct distances.
+    :param cache_path: The cache file (None to always compute).
+    :param checksum: The checksum of the distance and address files; required with cache_path.
+    :return: The closed matrix (a ClosedDistanceMatrix), or the given matrix if the closure was skipped.
+    :rtype: DistanceMatrix
+    """
+    use_cache = cache_path is not None and checksum is not None
+    if use_cache:
+        closed = load_closure(cache_path, checksum, distance_matrix)
+        if closed is not None:
+            return closed
+
+    if numpy is None and distance_matrix.size > PYTHON_CLOSURE_MAX_SIZE:
+        warnings.warn(f"Skipping the shortest-path closure of {distance_matrix.size} locations: without numpy it "
+                      f"would take too long (limit {PYTHON_CLOSURE_MAX_SIZE}). Install numpy to enable it.",
+                      RuntimeWarning, stacklevel=2)
+        return distance_matrix
+
+    closed = ClosedDistanceMatrix.from_matrix(distance_matrix)
+
+    if use_cache:
+        try:
+            save_closure(cache_path, checksum, closed)
+        except OSError:
+            pass  # A read-only install still works, just without warm starts.
+    return closed
@@ -0,0 +1,201 @@
+import heapq
+from collections import deque
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from DistanceMatrix import DistanceMatrix
+from Truck import Truck
+
+# Event kinds, in the order they are processed when several share the same time. Packages
+# reaching the hub and address corrections are applied before any truck acts on them.
+HUB_ARRIVAL = 0
+ADDRESS_CHANGE = 1
+DRIVER_FREE = 2
+TRUCK_READY = 3
+DELIVERY = 4
+RETURN_TO_HUB = 5
+
+
+class _TruckState:
+    """Progress of one truck through its fixed delivery order."""
+
+    __slots__ = ("truck", "route", "next_stop", "location", "seconds", "departed", "finished")
+
+    def __init__(self, truck: Truck, route: list, location: int):
+        self.truck = truck
+        self.route = route
+        self.next_stop = 0
+        self.location = location
+        self.seconds = 0.0
+        self.departed = False
+        self.finished = False
+
+
+class Simulation:
+    def __init__(self, trucks: List[Truck], package_table, distance_matrix: DistanceMatrix, hub_location: int,
+                 drivers: Optional[int] = None, return_to_hub: bool = False):
+        """
+        Initializes a discrete-event simulation of one delivery day.
+
+        Every truck follows the delivery order already in its package list. Truck departures,
+        deliveries, returns to the hub, package arrivals at the hub and address changes are all
+        events on one heap, processed in global time order. Each event only updates the truck or
+        package it concerns.
+
+        :param trucks: The trucks to simulate, with their package lists in delivery order.
+        :param package_table: The hash table holding the packages, keyed by package ID.
+        :param distance_matrix: The distance matrix to read distances from.
+        :param hub_location: Location index of the hub.
+        :param drivers: Number of drivers; a truck cannot leave until one is free (None for one per truck).
+        :param return_to_hub: Whether trucks drive back to the hub after their last delivery. When False,
+            the driver is free as soon as the last package is delivered.
+        :raises: ValueError if fewer than one driver is given, since no truck could ever leave.
+        """
+        if drivers is not None and drivers < 1:
+            raise ValueError(f"At least one driver is needed, got {drivers}.")
+        self.package_table = package_table
+        self.distance_matrix = distance_matrix
+        self.hub_location = hub_location
+        self.return_to_hub = return_to_hub
+        self.free_drivers = drivers if drivers is not None else len(trucks)
+
+        self._events = []
+        self._sequence = 0
+        self._waiting = deque()  # Trucks ready to leave but without a driver, in readiness order
+        self._package_ready: Dict[int, float] = {}  # Package ID -> seconds it reaches the hub
+        self._states = [_TruckState(truck, [package_table.lookup(package_id) for package_id in truck.packages],
+                                    hub_location) for truck in trucks]
+        self.clock = 0.0
+        # (seconds, package ID, address, city, zipcode) of every applied address change, holding the
+        # address that was valid before the change, so status queries can show the address known at a time.
+        self.address_changes: List[tuple] = []
+
+    def _push(self, seconds: float, kind: int, payload):
+        heapq.heappush(self._events, (seconds, kind, self._sequence, payload))
+        self._sequence += 1
+
+    def schedule_hub_arrival(self, time: timedelta, package_ids: List[int]):
+        """
+        Records that packages only reach the hub at the given time. Trucks carrying them wait.
+
+        :param time: When the packages reach the hub.
+        :param package_ids: IDs of the delayed packages.
+        """
+        seconds = time.total_seconds()
+        for package_id in package_ids:
+            self._package_ready[package_id] = seconds
+        self._push(seconds, HUB_ARRIVAL, package_ids)
+
+    def schedule_address_change(self, time: timedelta, package_id: int, address: str,
+                                city: Optional[str] = None, zipcode: Optional[str] = None):
+        """
+        Changes a package's delivery address at the given time. A truck that has not yet started
+        driving to the package when the change happens drives to the new address.
+
+        :param time: When the change becomes known.
+        :param package_id: ID of the package to redirect.
+        :param address: The new street address.
+        :param city: The new city, if it changes.
+        :param zipcode: The new zipcode, if it changes.
+        """
+        self._push(time.total_seconds(), ADDRESS_CHANGE, (package_id, address, city, zipcode))
+
+    def _ready_seconds(self, state: _TruckState) -> float:
+        ready = state.truck.depart_time.total_seconds()
+        for package in state.route:
+            ready = max(ready, self._package_ready.get(package.package_id, 0.0))
+        return ready
+
+    def _depart(self, state: _TruckState, seconds: float):
+        state.departed = True
+        state.seconds = seconds
+        state.truck.mileage = 0.0
+        state.truck.depart_time = timedelta(seconds=seconds)
+        state.truck.time = state.truck.depart_time
+        for package in state.route:
+            package.departure_time = state.truck.depart_time
+            package.status = "En route"
+        self._drive_to_next_stop(state)
+
+    def _drive_to_next_stop(self, state: _TruckState):
+        truck = state.truck
+        if state.next_stop < len(state.route):
+            package = state.route[state.next_stop]
+            distance = self.distance_matrix.distance(state.location, package.location_index)
+            truck.mileage += distance
+            state.location = package.location_index
+            state.seconds += distance / truck.speed * 3600
+            self._push(state.seconds, DELIVERY, state)
+        elif self.return_to_hub and state.location != self.hub_location:
+            distance = self.distance_matrix.distance(state.location, self.hub_location)
+            truck.mileage += distance
+            state.location = self.hub_location
+            state.seconds += distance / truck.speed * 3600
+            self._push(state.seconds, RETURN_TO_HUB, state)
+        else:
+            self._finish(state)
+
+    def _finish(self, state: _TruckState):
+        state.finished = True
+        state.truck.time = timedelta(seconds=state.seconds)
+        self._push(state.seconds, DRIVER_FREE, None)
+
+    def _dispatch(self, seconds: float):
+        # Hand free drivers to waiting trucks in the order they became ready.
+        while self.free_drivers and self._waiting:
+            self.free_drivers -= 1
+            self._depart(self._waiting.popleft(), seconds)
+
+    def run(self) -> timedelta:
+        """
+        Runs the simulation until every truck has finished its route.
+
+        Afterwards each truck's mileage, time, address and depart_time, and each package's
+        departure_time, delivery_time, status and (if changed) address reflect the simulated day;
+        the addresses replaced are kept in address_changes.
+
+        :return: The time the last truck finished.
+        :rtype: timedelta
+
+        Time Complexity:
+            O((p + t + e) log (p + t + e)) for p packages, t trucks and e scheduled events.
+        Space Complexity:
+            O(p + t + e)
+        """
+        for state in self._states:
+            self._push(self._ready_seconds(state), TRUCK_READY, state)
+
+        while self._events:
+            seconds, kind, _, payload = heapq.heappop(self._events)
+            self.clock = seconds
+
+            if kind == HUB_ARRIVAL:
+                continue  # Trucks already wait for their packages' arrival time.
+            elif kind == ADDRESS_CHANGE:
+                package_id, address, city, zipcode = payload
+                package = self.package_table.lookup(package_id)
+                self.address_changes.append((seconds, package_id, package.address, package.city, package.zipcode))
+                package.address = address
+                package.city = city if city is not None else package.city
+                package.zipcode = zipcode if zipcode is not None else package.zipcode
+                package.location_index = self.distance_matrix.index_of(address)
+            elif kind == TRUCK_READY:
+                self._waiting.append(payload)
+                self._dispatch(seconds)
+            elif kind == DELIVERY:
+                state = payload
+                package = state.route[state.next_stop]
+                state.next_stop += 1
+                state.truck.time = timedelta(seconds=seconds)
+                state.truck.address = package.address
+                package.delivery_time = state.truck.time
+                package.status = "Delivered"
+                self._drive_to_next_stop(state)
+            elif kind == RETURN_TO_HUB:
+                payload.truck.address = self.distance_matrix.addresses[self.hub_location]
+                self._finish(payload)
+            elif kind == DRIVER_FREE:
+                self.free_drivers += 1
+                self._dispatch(seconds)
+
+        return timedelta(seconds=max((state.seconds for state in self._states), default=0.0))
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from BatchQuery import package_record, parse_time
+from Plan import Plan
+
+# Longest request line accepted, so one request can carry many package IDs.
+MAX_LINE_BYTES = 1 << 20
+
+COMMANDS = "PING, STATUS <time> <id>[,<id>...]|all, COUNTS <time>, TRUCKS, MILEAGE, RELOAD, QUIT"
+
+
+class _ServedPlan:
+    """A plan together with the answers that do not depend on the query, computed once per swap."""
+
+    __slots__ = ("plan", "version", "trucks", "total_mileage")
+
+    def __init__(self, plan: Plan, version: int):
+        self.plan = plan
+        self.version = version
+        self.total_mileage = round(plan.total_mileage, 1)
+        report = plan.deadline_report()
+        self.trucks = [{
+            "truck": number,
+            "packages": len(truck.packages),
+            "mileage": round(truck.mileage, 1),
+            "depart_time": str(truck.depart_time),
+            "finish_time": str(truck.time),
+            "late": summary["late"],
+            "min_slack_seconds": summary["min_slack"] if summary["packages"] else None,
+        } for number, (truck, summary) in enumerate(zip(plan.trucks, report.trucks), start=1)]
+
+
+class StatusService:
+    def __init__(self, plan: Plan, replan: Optional[Callable[[], Plan]] = None):
+        """
+        Initializes a status service over a computed plan.
+
+        Requests are single lines and every reply is one JSON object on one line, so many
+        clients can be served by one event loop without blocking: every lookup is answered
+        from the plan's status timeline in memory. A new plan can be swapped in at any time;
+        each request is answered entirely from the plan that was current when it arrived.
+
+        :param plan: The plan to serve.
+        :param replan: A picklable function that computes a fresh plan, used by RELOAD (None disables RELOAD).
+        """
+        self._served = _ServedPlan(plan, 1)
+        self._replan = replan
+        self._replanning: Optional[asyncio.Future] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def plan(self) -> Plan:
+        """The plan currently being served."""
+        return self._served.plan
+
+    def swap_plan(self, plan: Plan):
+        """
+        Replaces the served plan. Requests already being answered finish with the old plan.
+
+        :param plan: The new plan.
+        """
+        self._served = _ServedPlan(plan, self._served.version + 1)
+
+    async def reload(self) -> int:
+        """
+        Computes a new plan in a separate process, so lookups keep being answered meanwhile,
+        and swaps it in. Concurrent reloads share one re-plan.
+
+        :return: The version of the plan served afterwards.
+        :rtype: int
+        """
+        if self._replan is None:
+            raise ValueError("Re-planning is not enabled on this server.")
+        if self._replanning is None:
+            self._replanning = asyncio.ensure_future(self._replan_and_swap())
+        # Shielded, so a client disconnecting mid-reload does not cancel the re-plan for the others.
+        return await asyncio.shield(self._replanning)
+
+    def _reload_on_signal(self):
+        # Nothing awaits a reload started by a signal, so its outcome is reported here.
+        asyncio.ensure_future(self.reload()).add_done_callback(self._report_reload)
+
+    @staticmethod
+    def _report_reload(task: asyncio.Future):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"Reload failed; still serving the current plan: {type(error).__name__}: {error}", file=sys.stderr)
+
+    async def _replan_and_swap(self) -> int:
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            plan = await asyncio.get_running_loop().run_in_executor(self._executor, self._replan)
+            self.swap_plan(plan)
+            return self._served.version
+        finally:
+            self._replanning = None
+
+    def answer(self, line: str) -> dict:
+        """
+        Answers one request line (everything except RELOAD, which is asynchronous).
+
+        :param line: The request, e.g. "STATUS 10:30 1,2,3".
+        :return: The reply.
+        :rtype: dict
+        """
+        served = self._served
+        fields = line.split()
+        if not fields:
+            return {"ok": False, "error": "Empty request."}
+        command = fields[0].upper()
+
+        if command == "PING":
+            return {"ok": True, "version": served.version}
+        if command == "MILEAGE":
+            return {"ok": True, "version": served.version, "total_mileage": served.total_mileage}
+        if command == "TRUCKS":
+            return {"ok": True, "version": served.version, "trucks": served.trucks}
+        if command == "COUNTS" and len(fields) == 2:
+            time = parse_time(fields[1])
+            return {"ok": True, "version": served.version, "time": str(time),
+                    "counts": served.plan.status_timeline.counts_at(time)}
+        if command == "STATUS" and len(fields) >= 3:
+            return self._status(served, fields[1], " ".join(fields[2:]))
+        return {"ok": False, "error": f"Unknown or malformed request. Commands: {COMMANDS}."}
+
+    @staticmethod
+    def _status(served: _ServedPlan, time_text: str, targets: str) -> dict:
+        time = parse_time(time_text)
+        timeline = served.plan.status_timeline
+        package_table = served.plan.package_table
+
+        if targets.lower() == "all":
+            packages = [package_record(time, package, status, address)
+                        for package, status, address in timeline.snapshot(time)]
+            return {"ok": True, "version": served.version, "packages": packages}
+
+        packages: List[dict] = []
+        for target in targets.replace(",", " ").split():
+            if not target.isdigit():
+                packages.append({"package_id": target, "error": "Invalid package ID."})
+                continue
+            package_id = int(target)
+            if package_id not in timeline:
+                packages.append({"package_id": package_id, "error": "Unknown package ID."})
+            else:
+                packages.append(package_record(time, package_table.lookup(package_id),
+                                               timeline.status_of(package_id, time),
+                                               timeline.address_at(package_id, time)))
+        return {"ok": True, "version": served.version, "packages": packages}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves one connection until the client sends QUIT or disconnects."""
+        try:
+            while True:
+                try:
+                    raw = await reader.readline()
+                except ValueError:  # Line longer than the stream limit.
+                    writer.write(b'{"ok": false, "error": "Request too long."}\n')
+                    break
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").strip()
+                if line.upper() == "QUIT":
+                    break
+
+                try:
+                    if line.upper() == "RELOAD":
+                        reply = {"ok": True, "version": await self.reload()}
+                    else:
+                        reply = self.answer(line)
+                except Exception as error:  # Report bad requests and failed re-plans to the client only.
+                    reply = {"ok": False, "error": str(error)}
+
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str):
+        """
+        Listens on a TCP "host:port" address or a "unix:/path" socket until cancelled.
+        SIGHUP triggers a reload where signals are supported.
+
+        :param address: Where to listen.
+        """
+        if address.startswith("unix:"):
+            server = await asyncio.start_unix_server(self.handle_client, path=address[len("unix:"):],
+                                                     limit=MAX_LINE_BYTES)
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle_client, host or "127.0.0.1", int(port),
+                                                limit=MAX_LINE_BYTES)
+
+        loop = asyncio.get_running_loop()
+        if self._replan is not None:
+            try:
+                loop.add_signal_handler(signal.SIGHUP, self._reload_on_signal)
+            except (NotImplementedError, AttributeError, RuntimeError):
+                pass  # No SIGHUP here (e.g. Windows or a non-main thread); RELOAD still works.
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+
+
+def run_server(plan: Plan, address: str, replan: Optional[Callable[[], Plan]] = None):
+    """
+    Serves a plan on the given address until interrupted.
+
+    :param plan: The plan to serve.
+    :param address: A TCP "host:port" address or a "unix:/path" socket.
+    :param replan: A picklable function that computes a fresh plan, used by RELOAD and SIGHUP.
+    """
+    try:
+        asyncio.run(StatusService(plan, replan).serve(address))
+    except KeyboardInterrupt:
+        pass
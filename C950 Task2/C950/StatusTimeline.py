@@ -0,0 +1,156 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple, Union
+
+from TimeModel import seconds_since_midnight
+
+STATUS_AT_HUB = "At the hub"
+STATUS_EN_ROUTE = "En route"
+STATUS_DELIVERED = "Delivered"
+
+
+def _seconds(time: Union[timedelta, float, None]) -> float:
+    # Accepts a timedelta since midnight or plain seconds; None means the event never happens.
+    return seconds_since_midnight(time)
+
+
+class StatusTimeline:
+    def __init__(self, packages, address_changes: Iterable[tuple] = ()):
+        """
+        Builds a read-only index of package departure and delivery times after routing.
+
+        Per-package times are kept in arrays for O(1) status lookups, and both kinds of event are
+        also sorted once, so counts per state and time-range queries are answered with bisect.
+        Addresses replaced during the day are kept per package, so a query shows the address that
+        was known at its time. Queries never modify the Package objects.
+
+        :param packages: The routed packages. Each needs package_id, departure_time and delivery_time.
+        :param address_changes: (seconds, package ID, address, city, zipcode) of each address change, holding
+            the address that was valid before the change (as recorded by Simulation.address_changes).
+
+        Time Complexity:
+            O(n log n) where n is the number of packages.
+        Space Complexity:
+            O(n)
+        """
+        self._packages = sorted(packages, key=lambda package: package.package_id)
+        self._position: Dict[int, int] = {package.package_id: index for index, package in enumerate(self._packages)}
+        self._departures = array('d', (_seconds(package.departure_time) for package in self._packages))
+        self._deliveries = array('d', (_seconds(package.delivery_time) for package in self._packages))
+
+        count = len(self._packages)
+        self._departure_order = sorted(range(count), key=self._departures.__getitem__)
+        self._departure_times = array('d', (self._departures[index] for index in self._departure_order))
+        self._delivery_order = sorted(range(count), key=self._deliveries.__getitem__)
+        self._delivery_times = array('d', (self._deliveries[index] for index in self._delivery_order))
+
+        # Package ID -> (seconds of the change, (address, city, zipcode) before it), in time order.
+        self._address_history: Dict[int, List[Tuple[float, Tuple[str, str, str]]]] = {}
+        for seconds, package_id, address, city, zipcode in sorted(address_changes, key=lambda change: change[0]):
+            self._address_history.setdefault(package_id, []).append((_seconds(seconds), (address, city, zipcode)))
+
+    def __len__(self) -> int:
+        return len(self._packages)
+
+    def __contains__(self, package_id) -> bool:
+        return package_id in self._position
+
+    def _status_at(self, index: int, seconds: float) -> str:
+        if self._deliveries[index] <= seconds:
+            return STATUS_DELIVERED
+        if self._departures[index] <= seconds:
+            return STATUS_EN_ROUTE
+        return STATUS_AT_HUB
+
+    def status_of(self, package_id: int, time: Union[timedelta, float]) -> str:
+        """
+        Returns the status of one package at the given time.
+
+        :param package_id: ID of the package.
+        :param time: Time since midnight, as a timedelta or seconds.
+        :return: "At the hub", "En route" or "Delivered".
+        :rtype: str
+        :raises: KeyError if the package is not in the timeline.
+
+        Time Complexity:
+            O(1)
+        """
+        return self._status_at(self._position[package_id], _seconds(time))
+
+    def _address_at(self, package, seconds: float) -> Tuple[str, str, str]:
+        for changed, address in self._address_history.get(package.package_id, ()):
+            if seconds < changed:
+                return address
+        return package.address, package.city, package.zipcode
+
+    def address_at(self, package_id: int, time: Union[timedelta, float]) -> Tuple[str, str, str]:
+        """
+        Returns the delivery address of one package as it was known at the given time.
+
+        :param package_id: ID of the package.
+        :param time: Time since midnight, as a timedelta or seconds.
+        :return: (address, city, zipcode)
+        :rtype: tuple
+        :raises: KeyError if the package is not in the timeline.
+
+        Time Complexity:
+            O(c) where c is the number of address changes of the package (usually 0).
+        """
+        return self._address_at(self._packages[self._position[package_id]], _seconds(time))
+
+    def snapshot(self, time: Union[timedelta, float]):
+        """
+        Yields (package, status, (address, city, zipcode)) for every package at the given time,
+        in package ID order.
+
+        :param time: Time since midnight, as a timedelta or seconds.
+
+        Time Complexity:
+            O(n) where n is the number of packages.
+        """
+        seconds = _seconds(time)
+        for index, package in enumerate(self._packages):
+            yield package, self._status_at(index, seconds), self._address_at(package, seconds)
+
+    def counts_at(self, time: Union[timedelta, float]) -> Dict[str, int]:
+        """
+        Returns how many packages are in each state at the given time.
+
+        :param time: Time since midnight, as a timedelta or seconds.
+        :return: Package counts keyed by status.
+        :rtype: dict
+
+        Time Complexity:
+            O(log n) where n is the number of packages.
+        """
+        seconds = _seconds(time)
+        delivered = bisect_right(self._delivery_times, seconds)
+        departed = bisect_right(self._departure_times, seconds)
+        return {
+            STATUS_AT_HUB: len(self._packages) - departed,
+            STATUS_EN_ROUTE: departed - delivered,
+            STATUS_DELIVERED: delivered,
+        }
+
+    def delivered_between(self, start: Union[timedelta, float], end: Union[timedelta, float]) -> List[int]:
+        """
+        Returns the IDs of packages delivered between two times (inclusive), in delivery order.
+
+        Time Complexity:
+            O(log n + k) where k is the number of packages returned.
+        """
+        low = bisect_left(self._delivery_times, _seconds(start))
+        high = bisect_right(self._delivery_times, _seconds(end))
+        return [self._packages[index].package_id for index in self._delivery_order[low:high]]
+
+    def departed_between(self, start: Union[timedelta, float], end: Union[timedelta, float]) -> List[int]:
+        """
+        Returns the IDs of packages that left the hub between two times (inclusive), in departure order.
+
+        Time Complexity:
+            O(log n + k) where k is the number of packages returned.
+        """
+        low = bisect_left(self._departure_times, _seconds(start))
+        high = bisect_right(self._departure_times, _seconds(end))
+        return [self._packages[index].package_id for index in self._departure_order[low:high]]
@@ -0,0 +1,71 @@
+from typing import List, Optional
+
+
+class Stop:
+    __slots__ = ("location_index", "packages", "deadline")
+
+    def __init__(self, location_index: int, deadline: float = float('inf')):
+        """
+        Initializes a Stop: one delivery location on a route and the packages dropped off there.
+        Routing orders stops instead of packages, so packages sharing an address are handled once.
+
+        :param location_index: Index of the stop's address in the distance matrix.
+        :type location_index: int
+        :param deadline: Earliest deadline of the stop's packages, in seconds since midnight.
+        :type deadline: float
+        """
+        self.location_index = location_index
+        self.packages = []
+        self.deadline = deadline
+
+    def add(self, package, deadline: float = float('inf')):
+        """
+        Adds a package to the stop, tightening the stop's deadline if the package's is earlier.
+
+        :param package: The package delivered at this stop.
+        :param deadline: The package's deadline in seconds since midnight.
+        """
+        self.packages.append(package)
+        if deadline < self.deadline:
+            self.deadline = deadline
+
+    def __len__(self) -> int:
+        return len(self.packages)
+
+    def __repr__(self) -> str:
+        return f"Stop({self.location_index}, {len(self.packages)} packages)"
+
+
+def build_stops(packages: list, deadlines: Optional[List[float]] = None) -> List[Stop]:
+    """
+    Groups packages into stops by location index, in the order each location is first seen.
+    Packages keep their original order within a stop.
+
+    :param packages: The packages to group. Each must have a location_index.
+    :param deadlines: Deadline of each package in seconds since midnight (None for no deadlines).
+    :return: One stop per distinct location.
+    :rtype: list
+
+    Time Complexity:
+        O(n) where n is the number of packages.
+    Space Complexity:
+        O(n)
+    """
+    stops = {}
+    for position, package in enumerate(packages):
+        stop = stops.get(package.location_index)
+        if stop is None:
+            stop = stops[package.location_index] = Stop(package.location_index)
+        stop.add(package, deadlines[position] if deadlines is not None else float('inf'))
+    return list(stops.values())
+
+
+def expand_stops(stops: list) -> list:
+    """
+    Returns the packages of a stop route in delivery order.
+
+    :param stops: The stops in delivery order.
+    :return: The packages in delivery order.
+    :rtype: list
+    """
+    return [package for stop in stops for package in stop.packages]
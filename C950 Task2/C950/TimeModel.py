@@ -0,0 +1,60 @@
+import datetime
+from typing import Union
+
+# Seconds value of an event that never happens (a package that was never delivered).
+NEVER = float('inf')
+
+TimeValue = Union[datetime.timedelta, datetime.datetime, datetime.time, float, int, None]
+
+
+def seconds_since_midnight(value: TimeValue) -> float:
+    """
+    Converts any of the time representations used in the program to seconds since midnight,
+    so deadlines and delivery times can be compared directly:
+    - datetime / time (deadlines, parsed as times on 1900-01-01): the time of day.
+    - timedelta (truck clocks, departure and delivery times): the offset from midnight.
+    - int / float: already seconds.
+    - None (an event that has not happened): NEVER.
+
+    :param value: The time to convert.
+    :return: Seconds since midnight.
+    :rtype: float
+    """
+    if value is None:
+        return NEVER
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1_000_000
+    return float(value)
+
+
+def package_deadline_seconds(package) -> float:
+    """
+    Returns a package's deadline in seconds since midnight, using the stored seconds of a
+    package store view when available.
+
+    :param package: A Package or PackageView.
+    :return: Seconds since midnight of the package's deadline.
+    :rtype: float
+    """
+    seconds = getattr(package, "deadline_seconds", None)
+    if seconds is not None:
+        return float(seconds)
+    return seconds_since_midnight(package.deadline_time)
+
+
+def format_seconds(seconds: float) -> str:
+    """
+    Formats seconds since midnight (or a duration) like a timedelta, e.g. "10:30:00" or "-0:05:00".
+    Infinite values (events that never happen) are shown as "never".
+
+    :param seconds: The seconds to format.
+    :return: The formatted time.
+    :rtype: str
+    """
+    if seconds in (NEVER, -NEVER):
+        return "never"
+    if seconds < 0:
+        return "-" + str(datetime.timedelta(seconds=round(-seconds)))
+    return str(datetime.timedelta(seconds=round(seconds)))
@@ -0,0 +1,157 @@
+import argparse
+import json
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+import Routing
+from Assignment import assign_packages
+from DistanceMatrix import DistanceMatrix
+from HashMap import HashMap
+from ManifestGenerator import generate_manifest
+from PackageStore import PackageStore
+from StatusTimeline import StatusTimeline
+from Truck import Truck
+from main import HUB_ADDRESS, TRUCK_MAX_CAPACITY, TRUCK_SPEED, load_package_data
+
+DEFAULT_SIZES = [100, 1000, 5000]
+
+# Trucks get this much spare capacity beyond what the packages strictly need.
+FLEET_SLACK = 1.25
+
+# Random status queries timed per size.
+STATUS_QUERIES = 10_000
+
+
+def measure(stage, trace_memory: bool) -> tuple:
+    """
+    Runs a stage once untraced for its wall time and, if requested, once more under tracemalloc
+    for its peak memory (tracing slows Python down too much to time the same run).
+
+    :param stage: A function taking no arguments.
+    :param trace_memory: Whether to measure peak memory.
+    :return: The stage's result, its wall time in seconds and its peak traced memory in bytes (or None).
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    result = stage()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        stage()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run_size(directory: str, stops: int, trace_memory: bool, seed: int = 0) -> dict:
+    """
+    Generates a manifest of the given size and times loading, HashMap operations, routing and
+    status queries on it.
+
+    :param directory: Directory to write the generated files into.
+    :param stops: Number of delivery addresses.
+    :param trace_memory: Whether to measure the peak memory of each stage.
+    :param seed: Random seed for the manifest and the queries.
+    :return: One machine-readable result record.
+    :rtype: dict
+    """
+    manifest = generate_manifest(directory, stops, seed=seed,
+                                 trucks=max(3, math.ceil(stops * 3 // 2 / TRUCK_MAX_CAPACITY)))
+    record = {"stops": stops, "packages": manifest["packages"], "stages": {}}
+
+    def record_stage(name, stage):
+        result, seconds, peak = measure(stage, trace_memory)
+        record["stages"][name] = {"seconds": round(seconds, 6), "peak_bytes": peak}
+        return result
+
+    def load():
+        distance_matrix = DistanceMatrix.from_csv(manifest["distance_file"], manifest["address_file"])
+        package_table = PackageStore()
+        load_package_data(manifest["package_file"], package_table, distance_matrix)
+        return distance_matrix, package_table
+
+    distance_matrix, package_table = record_stage("load", load)
+    packages = sorted(package_table.values(), key=lambda package: package.package_id)
+    package_ids = [package.package_id for package in packages]
+
+    def hashmap_operations():
+        table = HashMap()
+        for package in packages:
+            table.insert(package.package_id, package)
+        for package_id in package_ids:
+            table.lookup(package_id)
+        for package_id in package_ids[::2]:
+            table.hash_remove(package_id)
+        return table
+
+    record_stage("hashmap", hashmap_operations)
+
+    hub_location = distance_matrix.index_of(HUB_ADDRESS)
+    truck_count = max(3, math.ceil(len(packages) * FLEET_SLACK / TRUCK_MAX_CAPACITY))
+
+    def route():
+        trucks = [Truck(capacity=TRUCK_MAX_CAPACITY, speed=TRUCK_SPEED, address=HUB_ADDRESS,
+                        depart_time=timedelta(hours=8, minutes=10 * (index % 13)))
+                  for index in range(truck_count)]
+        unassigned = assign_packages(trucks, packages, distance_matrix, hub_location)
+        for truck in trucks:
+            Routing.deliver_packages(truck, package_table, distance_matrix)
+        return trucks, unassigned
+
+    trucks, unassigned = record_stage("routing", route)
+    record["trucks"] = truck_count
+    record["unassigned_packages"] = len(unassigned)
+    record["total_mileage"] = round(sum(truck.mileage for truck in trucks), 1)
+
+    rng = random.Random(seed)
+    query_ids = [rng.choice(package_ids) for _ in range(STATUS_QUERIES)]
+    query_times = [rng.uniform(8 * 3600, 18 * 3600) for _ in range(STATUS_QUERIES)]
+
+    def status_queries():
+        timeline = StatusTimeline(packages)
+        for package_id, seconds in zip(query_ids, query_times):
+            timeline.status_of(package_id, seconds)
+        for seconds in query_times[:100]:
+            timeline.counts_at(seconds)
+        return timeline
+
+    record_stage("status_queries", status_queries)
+    record["max_rss_kilobytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, HashMap, routing and status queries "
+                                                 "on synthetic manifests.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Numbers of stops to benchmark (100 to 50000).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--data-dir", help="Keep the generated manifests here instead of a temporary directory.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced peak-memory runs.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        for stops in args.sizes:
+            directory = os.path.join(args.data_dir or temporary_directory, f"stops_{stops}")
+            record = run_size(directory, stops, not args.no_memory, args.seed)
+            results.append(record)
+            print(json.dumps(record), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": sys.version.split()[0], "results": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+import time
+
+from HashMap import HashMap
+
+
+class LegacyHashMap:
+    """
+    The original fixed-size chaining hash map (20 buckets of [key, item] lists), kept here
+    only as the comparison baseline for the benchmark.
+    """
+
+    def __init__(self, initial_capacity: int = 20):
+        self.buckets = [[] for _ in range(initial_capacity)]
+
+    def insert(self, key, item) -> bool:
+        bucket = self.buckets[hash(key) % len(self.buckets)]
+        for kv_pair in bucket:
+            if kv_pair[0] == key:
+                kv_pair[1] = item
+                return True
+        bucket.append([key, item])
+        return True
+
+    def append_unique(self, key, item):
+        # Builds the same bucket layout as insert() for keys known to be unique. Used so the
+        # baseline can be filled with a million keys without its O(n^2 / buckets) insert cost.
+        self.buckets[hash(key) % len(self.buckets)].append([key, item])
+
+    def lookup(self, key):
+        bucket = self.buckets[hash(key) % len(self.buckets)]
+        for kv_pair in bucket:
+            if kv_pair[0] == key:
+                return kv_pair[1]
+        return None
+
+
+def time_lookups(table, keys) -> float:
+    """
+    Looks up every key once and returns the throughput in lookups per second.
+
+    :param table: The hash map to query.
+    :param keys: The keys to look up.
+    :return: Lookups per second.
+    :rtype: float
+    """
+    lookup = table.lookup
+    start = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    elapsed = time.perf_counter() - start
+    return len(keys) / elapsed if elapsed > 0 else float('inf')
+
+
+def run_benchmark(size: int, lookups: int, legacy_lookups: int, seed: int = 0) -> dict:
+    """
+    Fills both hash maps with `size` package IDs and measures lookup throughput.
+
+    :param size: Number of package IDs to load.
+    :param lookups: Number of random lookups against the resizing HashMap.
+    :param legacy_lookups: Number of random lookups against the legacy map (its lookups are O(n / 20)).
+    :param seed: Seed for choosing the looked-up IDs.
+    :return: A dictionary of timings for this size.
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    package_ids = range(1, size + 1)
+
+    table = HashMap()
+    start = time.perf_counter()
+    for package_id in package_ids:
+        table.insert(package_id, package_id)
+    insert_seconds = time.perf_counter() - start
+
+    legacy = LegacyHashMap()
+    for package_id in package_ids:
+        legacy.append_unique(package_id, package_id)
+
+    keys = [rng.randint(1, size) for _ in range(lookups)]
+    legacy_keys = keys[:legacy_lookups]
+
+    hashmap_rate = time_lookups(table, keys)
+    legacy_rate = time_lookups(legacy, legacy_keys)
+
+    return {
+        "size": size,
+        "capacity": table.capacity,
+        "insert_seconds": round(insert_seconds, 6),
+        "hashmap_lookups_per_second": round(hashmap_rate),
+        "legacy_lookups_per_second": round(legacy_rate),
+        "speedup": round(hashmap_rate / legacy_rate, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HashMap lookup throughput with the legacy fixed-size map.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="Numbers of package IDs to load.")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Random lookups per size.")
+    parser.add_argument("--legacy-lookups", type=int, default=2_000,
+                        help="Random lookups per size against the legacy map.")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print(json.dumps(run_benchmark(size, args.lookups, min(args.legacy_lookups, args.lookups))))
+
+
+if __name__ == "__main__":
+    main()
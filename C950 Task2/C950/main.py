@@ -2,129 +2,95 @@
 # Student ID: 001344143
 # Title: C950 - Data Structures and Algorithms II
 
-import csv
+import argparse
 import datetime
+import functools
+import json
+import os
+import sys
 from datetime import timedelta
 from typing import Optional
 
 from Truck import Truck
 
-from HashMap import HashMap
-from Package import Package
-
-
-def read_csv_file(file_path: str) -> list:
-    """
-    Reads the contents of a CSV file and returns a list of rows.
-
-    :param file_path: Path to the CSV file to be read.
-    :type file_path: str
-    :return: A list containing rows of the CSV, each row is also a list.
-    :rtype: list
-    """
-    with open(file_path, 'r') as file:
-        csv_content = csv.reader(file)
-        return list(csv_content)
-
-
-# Read the distance information from the CSV file
-distance_data = read_csv_file("DistanceFile.csv")
-
-# Read the address information from the CSV file
-address_data = read_csv_file("AddressFile.csv")
-
-# Read the package information from the CSV file
-package_data = read_csv_file("PackageFile.csv")
-
-
-def load_package_data(filename, package_hash_table):
+import Instrumentation
+import ParallelRouting
+import Routing
+from Assignment import assign_packages, parse_special_notes
+from BatchPlanner import PACKAGE_FILE_NAME, find_manifests, plan_manifests
+from BatchQuery import parse_time, run_batch
+from DistanceMatrix import DistanceMatrix
+from HeldKarp import ExactSolverLimitExceeded, optimality_gap
+from PackageLoader import ValidationReport, load_packages
+from PackageStore import PackageStore
+from RouteCache import RouteCache
+from Plan import Plan
+from ScenarioCache import input_checksum, load_plan, planning_sources, save_plan
+from ScenarioSweep import parse_grid, sweep, write_table
+from ShortestPaths import close_distance_matrix
+from Simulation import Simulation
+from StatusServer import run_server
+from TimeModel import package_deadline_seconds
+
+
+# Input files, next to this script so the module can be imported from any working directory
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DISTANCE_FILE = os.path.join(BASE_DIRECTORY, "DistanceFile.csv")
+ADDRESS_FILE = os.path.join(BASE_DIRECTORY, "AddressFile.csv")
+PACKAGE_FILE = os.path.join(BASE_DIRECTORY, "PackageFile.csv")
+
+# Compiled scenario cache: the loaded tables and computed plan, reused while the inputs are unchanged
+PLAN_CACHE_FILE = os.path.join(BASE_DIRECTORY, "plan.cache")
+
+# Shortest-path closure of the distance table, reused while the distance and address files are unchanged
+DISTANCE_CACHE_FILE = os.path.join(BASE_DIRECTORY, "distances.cache")
+
+# Optimized stop orders from earlier runs, keyed by distance table, start and stop set (None to disable).
+# Recurring manifests reuse them instead of routing again; the least recently used are evicted first.
+ROUTE_CACHE_FILE = os.path.join(BASE_DIRECTORY, "routes.cache")
+ROUTE_CACHE_MAX_ENTRIES = 4096
+
+
+def load_package_data(filename, package_hash_table, distance_matrix: DistanceMatrix) -> ValidationReport:
     """
-    Loads package data from a CSV file and inserts them into a hash table.
+    Loads package data from a CSV file and inserts them into a hash table (or package store).
+    Each package's address is resolved to its distance matrix index at load time.
+    The file is streamed in chunks; invalid rows are skipped and listed in the returned report.
 
     :param filename: The path to the CSV file containing the package data.
     :param package_hash_table: The hash table where package data will be stored.
+    :param distance_matrix: The distance matrix used to resolve package addresses.
+    :return: The validation report of the load.
+    :rtype: ValidationReport
     """
-
-    with open(filename) as package_info:
-        local_package_data = csv.reader(package_info)  # Rename to local_package_data or similar
-        for row in local_package_data:
-            package_id = int(row[0])  # Convert the package_id to an integer
-            address = row[1]
-            city = row[2]
-            state = row[3]
-            zipcode = row[4]
-
-            # Parsing the deadline_time based on the format in the CSV file
-            if row[5] == "EOD":
-                deadline_time = datetime.datetime.strptime("11:59:59 PM", '%I:%M:%S %p')
-            else:
-                deadline_time = datetime.datetime.strptime(row[5], '%I:%M %p')
-
-            # Assuming the weight in the CSV is always in format 'xx Kilos'. Extracting numerical value.
-            weight = float(row[6].split()[0])
-
-            # Default status is "At Hub"
-            status = "At the Hub"
-
-            # Create a package object
-            package = Package(
-                package_id=package_id,
-                address=address,
-                city=city,
-                state=state,
-                zipcode=zipcode,
-                deadline_time=deadline_time,
-                weight=weight,
-                status=status
-            )
-
-            # Insert package data into the hash table
-            package_hash_table.insert(package_id, package)
+    return load_packages(filename, package_hash_table, distance_matrix)
 
 
 def distance_between_points(point_a: int, point_b: int) -> float:
     """
-    Returns the distance between two points using distance data from a CSV.
+    Returns the distance between two points using the preloaded distance matrix.
 
-    :param point_a: Index of the first point in the CSV distance matrix.
+    :param point_a: Index of the first point in the distance matrix.
     :type point_a: int
-    :param point_b: Index of the second point in the CSV distance matrix.
+    :param point_b: Index of the second point in the distance matrix.
     :type point_b: int
     :return: Distance between the two points.
     :rtype: float
     """
-
-    # Attempt to get the distance from the CSV matrix using the provided indices
-    distance = distance_data[point_a][point_b]
-
-    # If the distance is not found in the above cell (is empty), then get it from the transposed cell
-    if not distance:
-        distance = distance_data[point_b][point_a]
-
-    # Convert the distance string to a float and return
-    return float(distance)
+    return get_plan().distance_matrix.distance(point_a, point_b)
 
 
 def extract_address_number(address_str: str) -> int:
     """
-    Extracts the address number from a given address string based on data from a CSV.
+    Extracts the address number from a given address string using the preloaded address index.
 
-    :param address_str: The address string to search for in the CSV.
+    :param address_str: The address string to search for.
     :type address_str: str
     :return: The address number corresponding to the given address string.
     :rtype: int
     :raises: ValueError if the address string is not found in the CSV.
     """
-
-    # Iterate through each row in the CSV address data
-    for row in address_data:
-        # Check if the provided address string exists within the current row's address field
-        if address_str in row[2]:
-            # Return the corresponding address number (assuming it's in the first column of the row)
-            return int(row[0])
-
-    # If no match found, raise a ValueError exception with a message
-    raise ValueError(f"The address '{address_str}' was not found in the CSV.")
+    return get_plan().distance_matrix.index_of(address_str)
 
 
 # Constants for truck attributes
@@ -132,46 +98,75 @@ TRUCK_MAX_CAPACITY = 16
 TRUCK_SPEED = 18
 HUB_ADDRESS = "4001 South 700 East"
 
-# Truck 1: Loaded with specific packages and is scheduled to depart first at 8:00 am.
-truck1_packages = [1, 13, 14, 15, 16, 20, 29, 30, 31, 34, 37, 40]
-truck1 = Truck(
-    capacity=TRUCK_MAX_CAPACITY,
-    speed=TRUCK_SPEED,
-    packages=truck1_packages,
-    address=HUB_ADDRESS,
-    depart_time=timedelta(hours=8)
-)
-
-# Truck 2: Will depart at 10:20 am with its assigned packages.
-truck2_packages = [3, 6, 12, 17, 18, 19, 21, 22, 23, 24, 26, 27, 35, 36, 38, 39]
-truck2 = Truck(
-    capacity=TRUCK_MAX_CAPACITY,
-    speed=TRUCK_SPEED,
-    packages=truck2_packages,
-    address=HUB_ADDRESS,
-    depart_time=timedelta(hours=10, minutes=20)
-)
-
-# Truck 3: Departs at 9:05 am with its package list, possibly those without early deadlines.
-truck3_packages = [2, 4, 5, 6, 7, 8, 9, 10, 11, 25, 28, 32, 33]
-truck3 = Truck(
-    capacity=TRUCK_MAX_CAPACITY,
-    speed=TRUCK_SPEED,
-    packages=truck3_packages,
-    address=HUB_ADDRESS,
-    depart_time=timedelta(hours=9, minutes=5)
-)
-
-# Initialize a hash table to store package data
-package_table = HashMap()
-
-# Load packages into hash table
-load_package_data("PackageFile.csv", package_table)
-
-
-def deliver_packages(truck):
-    """
-    Determine the delivery order for packages on a truck using the nearest neighbor algorithm.
+# Route improvement: refine each nearest neighbor route with 2-opt / Or-opt local search.
+# The search stops after the given number of improving moves or seconds (None for no limit).
+IMPROVE_ROUTES = False
+IMPROVEMENT_MAX_ITERATIONS = None
+IMPROVEMENT_TIME_BUDGET = 1.0
+
+# Routing method: "nearest_neighbor" (greedy heuristic), "exact" (Held-Karp) or "multi_start"
+# (MULTI_START_RUNS nearest neighbor and randomized routes per truck, each refined by local search
+# for up to IMPROVEMENT_TIME_BUDGET seconds, on ROUTING_WORKERS processes; None for one per CPU).
+# The exact solver falls back to the heuristic above EXACT_MAX_STOPS distinct stops or past
+# EXACT_TIME_BUDGET seconds; a full truck of 16 stops takes about 2 seconds.
+ROUTING_METHOD = "nearest_neighbor"
+EXACT_MAX_STOPS = TRUCK_MAX_CAPACITY
+EXACT_TIME_BUDGET = 5.0
+MULTI_START_RUNS = 8
+ROUTING_WORKERS = None
+
+# Replace each direct distance with the shortest path through other addresses when that is shorter,
+# since the distance table does not always satisfy the triangle inequality.
+CLOSE_DISTANCE_TABLE = True
+
+# Only two drivers are available, so at most two trucks are on the road at once.
+DRIVER_COUNT = 2
+
+# Address corrections: (time known, package ID, address, city, zipcode).
+ADDRESS_CORRECTIONS = [
+    (timedelta(hours=10, minutes=20), 9, "410 S State St", "Salt Lake City", "84111"),
+]
+
+# Departure time of each truck, in truck number order.
+# Truck 1 leaves first at 8:00 am, truck 2 at 10:20 am once the corrected address for package 9 is
+# known, and truck 3 at 9:05 am when the delayed packages reach the hub.
+TRUCK_DEPARTURES = [
+    timedelta(hours=8),
+    timedelta(hours=10, minutes=20),
+    timedelta(hours=9, minutes=5),
+]
+
+def load_scenario() -> tuple:
+    """
+    Loads the distance table, address table and packages from the CSV files. With
+    CLOSE_DISTANCE_TABLE set, the distance table is replaced by its shortest-path closure.
+
+    :return: The distance matrix and the package store.
+    :rtype: tuple
+    """
+    # Load the distance and address tables once into a numeric matrix and an address index
+    with Instrumentation.stage("distances"):
+        distance_matrix = DistanceMatrix.from_csv(DISTANCE_FILE, ADDRESS_FILE)
+
+    # Route and report mileage with shortest-path distances (the closure is cached on disk)
+    if CLOSE_DISTANCE_TABLE:
+        with Instrumentation.stage("closure"):
+            distance_matrix = close_distance_matrix(distance_matrix, DISTANCE_CACHE_FILE,
+                                                    input_checksum([DISTANCE_FILE, ADDRESS_FILE]))
+
+    # Initialize a columnar package store (a compact stand-in for the hash table) and load the packages into it
+    package_table = PackageStore()
+    with Instrumentation.stage("packages"):
+        report = load_package_data(PACKAGE_FILE, package_table, distance_matrix)
+    if not report.ok:
+        print(report, file=sys.stderr)
+    return distance_matrix, package_table
+
+
+def deliver_packages(truck, package_table, distance_matrix: DistanceMatrix, route_cache: Optional[RouteCache] = None):
+    """
+    Determine the delivery order for packages on a truck using the routing method configured by
+    ROUTING_METHOD, followed by the optional local search stage configured by IMPROVE_ROUTES.
     This function will:
     - Update the truck's package list in the order they should be delivered.
     - Calculate the mileage the truck drives.
@@ -179,58 +174,235 @@ def deliver_packages(truck):
 
     :param truck: An instance of the Truck class that is being used for delivery.
     :type truck: Truck
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param route_cache: Cache of optimized stop orders to reuse and fill (None to always route from scratch).
     """
+    Routing.deliver_packages(truck, package_table, distance_matrix, improve=IMPROVE_ROUTES,
+                             max_iterations=IMPROVEMENT_MAX_ITERATIONS, time_budget=IMPROVEMENT_TIME_BUDGET,
+                             method=ROUTING_METHOD, max_exact_stops=EXACT_MAX_STOPS, route_cache=route_cache,
+                             exact_time_budget=EXACT_TIME_BUDGET)
 
-    # Create a list of packages that are yet to be delivered using the truck's package list and the hash table.
-    not_delivered = [package_table.lookup(packageID) for packageID in truck.packages]
 
-    # Clear the truck's package list. We'll re-add packages in delivery order.
-    truck.packages.clear()
+def planning_settings() -> tuple:
+    """
+    Returns everything the computed plan depends on besides the input files; part of the cache
+    checksum. Read at call time, so settings changed after import still invalidate the cached plan.
 
-    # Continue delivering packages as long as there are packages that have not been delivered.
-    while not_delivered:
-        # Initialize variables to keep track of the nearest package and its distance.
-        nearest_distance = float('inf')
-        nearest_package = None
+    :return: The current planning settings.
+    :rtype: tuple
+    """
+    return (TRUCK_MAX_CAPACITY, TRUCK_SPEED, HUB_ADDRESS, IMPROVE_ROUTES, IMPROVEMENT_MAX_ITERATIONS, ROUTING_METHOD,
+            EXACT_MAX_STOPS, MULTI_START_RUNS, CLOSE_DISTANCE_TABLE, DRIVER_COUNT, ADDRESS_CORRECTIONS,
+            TRUCK_DEPARTURES)
 
-        # For each undelivered package, determine its distance from the truck's current location.
-        for package in not_delivered:
-            current_distance = distance_between_points(extract_address_number(truck.address),
-                                                       extract_address_number(package.address))
 
-            # If this package is closer than previous packages, update our "nearest" tracking variables.
-            if current_distance <= nearest_distance:
-                nearest_distance = current_distance
-                nearest_package = package
+_route_cache: Optional[RouteCache] = None
 
-        # Add the nearest package's ID to the truck's package list.
-        truck.packages.append(nearest_package.package_id)
 
-        # Remove the delivered package from the not_delivered list.
-        not_delivered.remove(nearest_package)
+def get_route_cache() -> Optional[RouteCache]:
+    """
+    Returns the route cache for the current routing settings, loading ROUTE_CACHE_FILE on first
+    use, or None if route caching is disabled.
 
-        # Update the truck's total mileage and address to reflect the delivery.
-        truck.mileage += nearest_distance
-        truck.address = nearest_package.address
+    :return: The route cache.
+    :rtype: RouteCache
+    """
+    global _route_cache
+    if ROUTE_CACHE_FILE is None:
+        return None
+    # Routes found under other settings are kept apart, so switching methods never mixes them.
+    namespace = repr((ROUTING_METHOD, IMPROVE_ROUTES, IMPROVEMENT_MAX_ITERATIONS, EXACT_MAX_STOPS, MULTI_START_RUNS))
+    if _route_cache is None or _route_cache.namespace != namespace:
+        _route_cache = RouteCache.load(ROUTE_CACHE_FILE, ROUTE_CACHE_MAX_ENTRIES, namespace)
+    return _route_cache
 
-        # Update the truck's current time by adding the time taken to travel to the nearest package.
-        truck.time += datetime.timedelta(hours=nearest_distance / 18)
 
-        # Set the delivery time of the package and the truck's departure time.
-        nearest_package.delivery_time = truck.time
-        nearest_package.departure_time = truck.depart_time
+def use_corrected_locations(trucks, package_table, distance_matrix: DistanceMatrix, address_corrections) -> list:
+    """
+    Moves each corrected package whose truck leaves once the correction is known to the corrected
+    location, so the truck is routed where it will actually drive. The package's listed address is
+    left alone; the simulation changes it at the correction time.
+
+    :param trucks: The trucks, with their assigned package IDs.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param distance_matrix: The distance matrix used to resolve the corrected addresses.
+    :param address_corrections: (time known, package ID, address, city, zipcode) of each address correction.
+    :return: (package, previous location index) of every package moved, to restore after routing.
+    :rtype: list
+    """
+    moved = []
+    for correction_time, package_id, address, *_ in address_corrections:
+        for truck in trucks:
+            if package_id in truck.packages and truck.depart_time >= correction_time:
+                package = package_table.lookup(package_id)
+                moved.append((package, package.location_index))
+                package.location_index = distance_matrix.index_of(address)
+    return moved
+
+
+def route_trucks(trucks, distance_matrix: DistanceMatrix, package_table, hub_address: str = HUB_ADDRESS,
+                 use_route_cache: bool = True, address_corrections=()) -> list:
+    """
+    Assigns the packages to the given trucks and plans each truck's delivery order with the
+    configured routing method.
+
+    :param trucks: The empty trucks to fill, in truck number order.
+    :param distance_matrix: The distance matrix to read distances from.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param hub_address: Address of the hub the trucks leave from.
+    :param use_route_cache: Whether to reuse and store routes in ROUTE_CACHE_FILE.
+    :param address_corrections: (time known, package ID, address, city, zipcode) of each address correction;
+        trucks leaving once a correction is known are routed to the corrected address.
+    :return: IDs of packages that could not be placed on a truck.
+    :rtype: list
+    """
+    hub_location = distance_matrix.index_of(hub_address)
+
+    # Assign packages to trucks from their special instructions, capacities and departure times.
+    with Instrumentation.stage("assign"):
+        packages = sorted(package_table.values(), key=lambda package: package.package_id)
+        unassigned_packages = assign_packages(trucks, packages, distance_matrix, hub_location)
+
+    # Plan the delivery order for each truck, reusing routes of stop sets seen in earlier runs.
+    route_cache = get_route_cache() if use_route_cache else None
+    moved = use_corrected_locations(trucks, package_table, distance_matrix, address_corrections)
+    try:
+        if ROUTING_METHOD == "multi_start":
+            with Instrumentation.stage("route"):
+                ParallelRouting.deliver_trucks(trucks, package_table, distance_matrix, starts=MULTI_START_RUNS,
+                                               workers=ROUTING_WORKERS, max_iterations=IMPROVEMENT_MAX_ITERATIONS,
+                                               time_budget=IMPROVEMENT_TIME_BUDGET, route_cache=route_cache)
+        else:
+            for number, truck in enumerate(trucks, start=1):
+                with Instrumentation.stage(f"route truck {number}"):
+                    deliver_packages(truck, package_table, distance_matrix, route_cache)
+    finally:
+        # The listed address (and its location) still changes only at the correction time.
+        for package, location in moved:
+            package.location_index = location
+
+    if route_cache is not None:
+        try:
+            route_cache.save(ROUTE_CACHE_FILE)
+        except OSError:
+            pass  # A read-only install still works, just without reusing routes.
+    return unassigned_packages
+
+
+def plan_routes(distance_matrix: DistanceMatrix, package_table, hub_address: str = HUB_ADDRESS,
+                address_corrections=ADDRESS_CORRECTIONS, fleet=None, drivers: int = DRIVER_COUNT,
+                use_route_cache: bool = True) -> Plan:
+    """
+    Assigns the packages to trucks, routes each truck and simulates the day.
+
+    :param distance_matrix: The distance matrix to read distances from.
+    :param package_table: The hash table holding the packages, keyed by package ID.
+    :param hub_address: Address of the hub the trucks leave from.
+    :param address_corrections: (time known, package ID, address, city, zipcode) of each address correction.
+    :param fleet: (departure, capacity, speed) of each truck, where a capacity or speed of None means the
+        configured one (None for the configured fleet, TRUCK_DEPARTURES).
+    :param drivers: Number of drivers.
+    :param use_route_cache: Whether to reuse and store routes in ROUTE_CACHE_FILE.
+    :return: The computed plan.
+    :rtype: Plan
+    """
+    hub_location = distance_matrix.index_of(hub_address)
+    if fleet is None:
+        fleet = [(departure, None, None) for departure in TRUCK_DEPARTURES]
+    trucks = [Truck(capacity=capacity or TRUCK_MAX_CAPACITY, speed=speed or TRUCK_SPEED, address=hub_address,
+                    depart_time=departure) for departure, capacity, speed in fleet]
+    unassigned_packages = route_trucks(trucks, distance_matrix, package_table, hub_address, use_route_cache,
+                                       address_corrections)
+
+    # Simulate the day with every truck on one clock: trucks wait for a free driver and for delayed
+    # packages to reach the hub, and corrected addresses (package 9's at 10:20 am) become known.
+    with Instrumentation.stage("simulate"):
+        simulation = Simulation(trucks, package_table, distance_matrix, hub_location, drivers=drivers)
+        for package in package_table.values():
+            constraints = parse_special_notes(package.notes)
+            if constraints.available_time and not constraints.wrong_address:
+                simulation.schedule_hub_arrival(constraints.available_time, [package.package_id])
+        for correction_time, package_id, address, city, zipcode in address_corrections:
+            simulation.schedule_address_change(correction_time, package_id, address, city, zipcode)
+        simulation.run()
+
+    with Instrumentation.stage("timeline"):
+        return Plan(distance_matrix, package_table, trucks, hub_location, unassigned_packages,
+                    simulation.address_changes)
+
+
+def plan_manifest(distance_matrix: DistanceMatrix, package_file: str, hub_address: str, fleet=None) -> tuple:
+    """
+    Loads one package file against an already loaded distance matrix and plans its day with
+    the configured routing settings. Used by the multi-manifest batch runner, so the sample's
+    address corrections are not applied, and the route cache (kept for the sample) is neither
+    read nor written.
+
+    :param distance_matrix: The distance matrix of the manifest's hub.
+    :param package_file: The manifest's package CSV file.
+    :param hub_address: Address of the hub the trucks leave from.
+    :param fleet: (departure, capacity, speed) of each truck, with one driver per truck (None for the
+        configured fleet and DRIVER_COUNT).
+    :return: The plan and the package file's validation report.
+    :rtype: tuple
+    """
+    package_table = PackageStore()
+    with Instrumentation.stage("packages"):
+        report = load_package_data(package_file, package_table, distance_matrix)
+    with Instrumentation.stage("plan"):
+        plan = plan_routes(distance_matrix, package_table, hub_address, address_corrections=(), fleet=fleet,
+                           drivers=len(fleet) if fleet is not None else DRIVER_COUNT, use_route_cache=False)
+    return plan, report
+
+
+def build_plan(use_cache: bool = True) -> Plan:
+    """
+    Returns the plan for the current input files. With the cache enabled, a cached plan whose
+    checksum (input files, planning settings and program sources) matches is loaded directly,
+    skipping CSV parsing and routing; otherwise the plan is computed and the cache is refreshed.
+
+    :param use_cache: Whether to read and write PLAN_CACHE_FILE.
+    :return: The computed or cached plan.
+    :rtype: Plan
+    """
+    checksum = None
+    if use_cache:
+        with Instrumentation.stage("plan cache"):
+            checksum = input_checksum([DISTANCE_FILE, ADDRESS_FILE, PACKAGE_FILE] + planning_sources(),
+                                      planning_settings())
+            plan = load_plan(PLAN_CACHE_FILE, checksum)
+        if plan is not None:
+            return plan
 
+    with Instrumentation.stage("load"):
+        scenario = load_scenario()
+    with Instrumentation.stage("plan"):
+        plan = plan_routes(*scenario)
 
-# Deliver packages for each truck in sequence.
-# Truck1 starts its deliveries first.
-deliver_packages(truck1)
+    if use_cache:
+        try:
+            save_plan(PLAN_CACHE_FILE, checksum, plan)
+        except OSError:
+            pass  # A read-only install still works, just without warm starts.
+    return plan
 
-# Then, Truck2 starts its deliveries.
-deliver_packages(truck2)
 
-# Truck3 starts its deliveries once the earliest of Truck1 or Truck2 has completed its deliveries.
-truck3.depart_time = min(truck1.time, truck2.time)
-deliver_packages(truck3)
+_plan: Optional[Plan] = None
+
+
+def get_plan(use_cache: bool = True) -> Plan:
+    """
+    Returns the current plan, building (or loading) it on first use.
+
+    :param use_cache: Whether the first build may use the plan cache.
+    :return: The plan.
+    :rtype: Plan
+    """
+    global _plan
+    if _plan is None:
+        _plan = build_plan(use_cache)
+    return _plan
 
 
 class Main:
@@ -244,7 +416,9 @@ class Main:
         print("Welcome to the Western Governors University Parcel Service (WGUPS) package tracker!")
         print("With this system, you can check the status of packages at any given time.\n")
         # Display total mileage of all trucks
-        print(f"Total mileage across all trucks today: {truck1.mileage + truck2.mileage + truck3.mileage} miles\n")
+        print(f"Total mileage across all trucks today: {get_plan().total_mileage} miles")
+        report = get_plan().deadline_report()
+        print(f"Packages delivered on time: {report.on_time} of {report.package_count}\n")
         print("=" * 60 + "\n")
 
     @staticmethod
@@ -269,6 +443,8 @@ class Main:
     @staticmethod
     def display_package_status(time: datetime.timedelta):
         """Display the package status based on user preference (all or solo)."""
+        package_table = get_plan().package_table
+        status_timeline = get_plan().status_timeline
         while True:
             # Ask if the user wants to update the current time
             change_time = input("Would you like to change the time before checking package status? (yes/no): ").lower()
@@ -288,23 +464,23 @@ class Main:
             # Handle the user's choice
             if choice == '1':
                 # Prompt for a specific package ID
-                package_id = input("Enter the package ID you want to view (1-40): ")
+                package_id = input(f"Enter the package ID you want to view (1-{len(status_timeline)}): ")
                 try:
                     package_id_num = int(package_id)
-                    if package_id_num < 1 or package_id_num > 40:
-                        print("Invalid package ID. Please enter a number between 1 and 40.")
+                    if package_id_num not in status_timeline:
+                        print(f"Invalid package ID. Please enter a number between 1 and {len(status_timeline)}.")
                         continue
                     package = package_table.lookup(package_id_num)
-                    package.update_status(time)
-                    print(str(package))
+                    print(package.format_status(status_timeline.status_of(package_id_num, time),
+                                                status_timeline.address_at(package_id_num, time)))
                 except ValueError:
-                    print("Invalid entry. Please enter a numeric ID between 1 and 40.")
+                    print(f"Invalid entry. Please enter a numeric ID between 1 and {len(status_timeline)}.")
             elif choice == '2':
-                # Display the status of all packages
-                for packageID in range(1, 41):
-                    package = package_table.lookup(packageID)
-                    package.update_status(time)
-                    print(str(package))
+                # Display the status of all packages, then how many are in each state
+                for package, status, address in status_timeline.snapshot(time):
+                    print(package.format_status(status, address))
+                counts = status_timeline.counts_at(time)
+                print(", ".join(f"{status}: {count}" for status, count in counts.items()))
             elif choice == '3':
                 # Exit the program
                 exit()
@@ -360,12 +536,202 @@ class Main:
                 print("Invalid choice. Please select a valid option from the menu.")
 
 
-# To run the program
-Main.run()
-
-
+def parse_arguments(argv=None) -> argparse.Namespace:
+    """Parse the command-line options for batch queries, multi-manifest planning, the status server, scenario
+    sweeps, the deadline report, the plan cache and instrumentation."""
+    parser = argparse.ArgumentParser(description="WGUPS package tracker.")
+    parser.add_argument("--batch", metavar="QUERIES",
+                        help="Answer 'time,package_id' or 'time,all' queries from a file ('-' for stdin) "
+                             "instead of starting the interactive menu.")
+    parser.add_argument("--output", default="-", help="File to write batch results to ('-' for stdout).")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv", help="Batch result format.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-parse the CSV files and re-plan instead of using the plan cache.")
+    parser.add_argument("--deadline-report", action="store_true",
+                        help="Print the on-time/late report of the plan (JSON with --format jsonl) and exit.")
+    parser.add_argument("--optimality-gap", action="store_true",
+                        help="Print how far each truck's planned route is from the shortest on-time order of the "
+                             "same packages (JSON with --format jsonl) and exit.")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="Serve package status to clients on a TCP 'host:port' address or a 'unix:/path' socket.")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Record stage timings and hot-path counters and write them as JSON to FILE ('-' for "
+                             f"stderr). Also enabled by the {Instrumentation.METRICS_ENV} environment variable.")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Run under cProfile and write a pstats dump to FILE (read it with 'python -m pstats "
+                             f"FILE'). Also enabled by {Instrumentation.PROFILE_ENV}.")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="With --metrics, also record each stage's allocation peak (slower). "
+                             f"Also enabled by {Instrumentation.TRACE_MEMORY_ENV}=1.")
+    parser.add_argument("--plan-dir", metavar="MANIFESTS",
+                        help="Plan every manifest (directory with a PackageFile.csv) under MANIFESTS, each with the "
+                             "nearest AddressFile.csv and DistanceFile.csv (and FleetFile.csv, if any), and write "
+                             "the plans and a summary to --plan-output.")
+    parser.add_argument("--plan-output", default="plans", metavar="DIRECTORY",
+                        help="Directory for the plans and summary of --plan-dir.")
+    parser.add_argument("--workers", type=int, help="Worker processes for --plan-dir (one per CPU by default).")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Evaluate every combination of the --departures, --speeds, --capacities, --truck-counts "
+                             "and --drivers values and write one row per scenario to --output.")
+    parser.add_argument("--departures", action="append", metavar="TIMES",
+                        help="Departure options of the next truck, e.g. '8:00,8:30' or '8:00..9:00/0:15' "
+                             "(repeat once per truck; the configured departures by default).")
+    parser.add_argument("--speeds", default=str(TRUCK_SPEED), help="Truck speeds, e.g. '15,18' or '15..25/2.5'.")
+    parser.add_argument("--capacities", default=str(TRUCK_MAX_CAPACITY), help="Truck capacities, e.g. '12..16/2'.")
+    parser.add_argument("--truck-counts", default=str(len(TRUCK_DEPARTURES)), help="Fleet sizes, e.g. '2,3'.")
+    parser.add_argument("--drivers", default=str(DRIVER_COUNT), help="Driver counts, e.g. '2,3'.")
+    arguments = parser.parse_args(argv)
+
+    if arguments.plan_dir is not None:
+        if not os.path.isdir(arguments.plan_dir):
+            parser.error(f"--plan-dir: '{arguments.plan_dir}' is not a directory.")
+        if not find_manifests(arguments.plan_dir):
+            parser.error(f"--plan-dir: no {PACKAGE_FILE_NAME} found under '{arguments.plan_dir}'.")
+    if arguments.workers is not None and arguments.workers < 1:
+        parser.error("--workers must be at least 1.")
+    if arguments.sweep:
+        try:
+            arguments.sweep_grid = sweep_grid(arguments)
+        except ValueError as error:
+            parser.error(f"--sweep: {error}")
+    return arguments
+
+
+def sweep_grid(arguments: argparse.Namespace) -> dict:
+    """
+    Parses and checks the value grids of a sweep from the command-line options.
 
+    :param arguments: The parsed command-line options.
+    :return: The departures, speeds, capacities, truck_counts and driver_counts arguments of ScenarioSweep.sweep.
+    :rtype: dict
+    :raises: ValueError if a grid is malformed, empty or out of range, or a fleet has more trucks than
+        departure options.
+    """
+    if arguments.departures:
+        departures = [parse_grid(times, parse_time) for times in arguments.departures]
+    else:
+        departures = [[departure] for departure in TRUCK_DEPARTURES]
+    grid = {
+        "departures": departures,
+        "speeds": parse_grid(arguments.speeds, float, "1"),
+        "capacities": parse_grid(arguments.capacities, int, "1"),
+        "truck_counts": parse_grid(arguments.truck_counts, int, "1"),
+        "driver_counts": parse_grid(arguments.drivers, int, "1"),
+    }
+
+    if not all(departures):
+        raise ValueError("--departures gives no times for a truck.")
+    for option, values in (("--speeds", grid["speeds"]), ("--capacities", grid["capacities"]),
+                           ("--truck-counts", grid["truck_counts"]), ("--drivers", grid["driver_counts"])):
+        if not values:
+            raise ValueError(f"{option} gives no values.")
+        if min(values) <= 0:
+            raise ValueError(f"{option} values must be positive.")
+    if max(grid["truck_counts"]) > len(departures):
+        raise ValueError(f"fleets of up to {max(grid['truck_counts'])} trucks need a --departures option per truck, "
+                         f"but only {len(departures)} are given.")
+    return grid
+
+
+def optimality_gaps(plan: Plan) -> list:
+    """
+    Measures each truck's planned route against the exact optimum for the same packages: the
+    shortest order from the hub that keeps every package on time, found with Held-Karp within
+    EXACT_MAX_STOPS distinct stops and EXACT_TIME_BUDGET seconds per truck.
 
+    :param plan: The computed plan.
+    :return: Per truck, its number and the planned miles, optimal miles and gap (or an error if the
+        load is too large to solve exactly).
+    :rtype: list
+    """
+    gaps = []
+    for number, truck in enumerate(plan.trucks, start=1):
+        route = [plan.package_table.lookup(package_id) for package_id in truck.packages]
+        try:
+            gap = optimality_gap(route, plan.distance_matrix, plan.hub_location, EXACT_MAX_STOPS, EXACT_TIME_BUDGET,
+                                 truck.depart_time.total_seconds(), truck.speed,
+                                 [package_deadline_seconds(package) for package in route])
+        except ExactSolverLimitExceeded as error:
+            gap = {"error": str(error)}
+        gaps.append(dict(truck=number, **gap))
+    return gaps
+
+
+def run_sweep(arguments: argparse.Namespace):
+    """
+    Runs a what-if sweep from the command-line options and writes the result table. Each fleet is
+    routed once on a freshly loaded scenario; every other combination re-times its tours.
 
+    :param arguments: The parsed command-line options.
+    """
+    grid = arguments.sweep_grid if hasattr(arguments, "sweep_grid") else sweep_grid(arguments)
+    distance_matrix, package_table = load_scenario()
+    rows = sweep(functools.partial(route_trucks, distance_matrix=distance_matrix, package_table=package_table),
+                 package_table, distance_matrix, HUB_ADDRESS, planning_speed=TRUCK_SPEED,
+                 address_corrections=ADDRESS_CORRECTIONS, **grid)
+
+    if arguments.output == "-":
+        write_table(rows, sys.stdout, arguments.format)
+    else:
+        with open(arguments.output, "w", newline="") as output:
+            write_table(rows, output, arguments.format)
+
+
+def main(argv=None):
+    """Run the tracker: a sweep, report, server or batch mode when requested, the interactive menu otherwise."""
+    arguments = parse_arguments(argv)
+    metrics_path, profile_path, trace_memory = Instrumentation.settings_from_environment(
+        arguments.metrics, arguments.profile, arguments.trace_memory)
+    if metrics_path or profile_path:
+        Instrumentation.enable(trace_memory=trace_memory, profile=profile_path is not None)
+    try:
+        run_mode(arguments)
+    finally:
+        if Instrumentation.is_enabled():
+            Instrumentation.disable()
+            Instrumentation.export(metrics_path, profile_path)
+
+
+def run_mode(arguments: argparse.Namespace):
+    """Runs the mode selected by the command-line options."""
+    if arguments.sweep:
+        with Instrumentation.stage("sweep"):
+            run_sweep(arguments)
+        return
+    if arguments.plan_dir:
+        with Instrumentation.stage("manifests"):
+            rows = plan_manifests(arguments.plan_dir, arguments.plan_output, plan_manifest, arguments.workers,
+                                  close_tables=CLOSE_DISTANCE_TABLE)
+        failed = sum(1 for row in rows if row.get("error"))
+        print(f"Planned {len(rows) - failed} of {len(rows)} manifests; summary in "
+              f"{os.path.join(arguments.plan_output, 'summary.csv')}", file=sys.stderr)
+        return
+
+    plan = get_plan(use_cache=not arguments.no_cache)
+    if plan.unassigned_packages:
+        print(f"Warning: packages {plan.unassigned_packages} could not be assigned to a truck.", file=sys.stderr)
+
+    if arguments.optimality_gap:
+        with Instrumentation.stage("optimality gap"):
+            for gap in optimality_gaps(plan):
+                print(json.dumps(gap) if arguments.format == "jsonl" else
+                      f"Truck {gap['truck']}: " + (gap["error"] if "error" in gap else
+                                                   f"{gap['heuristic_miles']} miles planned, {gap['optimal_miles']} "
+                                                   f"optimal ({gap['gap_percent']}% above)"))
+    elif arguments.deadline_report:
+        with Instrumentation.stage("report"):
+            report = plan.deadline_report()
+            print(json.dumps(report.as_dict()) if arguments.format == "jsonl" else report)
+    elif arguments.serve:
+        # RELOAD re-plans from the input files in a worker process, bypassing the plan cache.
+        run_server(plan, arguments.serve, replan=functools.partial(build_plan, use_cache=False))
+    elif arguments.batch:
+        with Instrumentation.stage("batch"):
+            run_batch(arguments.batch, plan.status_timeline, plan.package_table, arguments.output, arguments.format)
+    else:
+        Main.run()
 
 
+# To run the program
+if __name__ == "__main__":
+    main()
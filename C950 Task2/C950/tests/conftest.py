@@ -0,0 +1,66 @@
+import datetime
+import math
+import os
+import random
+import sys
+from array import array
+
+import pytest
+
+# The modules import each other by bare name, as main.py does when run from the project directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DistanceMatrix import DistanceMatrix  # noqa: E402
+from HashMap import HashMap  # noqa: E402
+from Package import Package  # noqa: E402
+from Truck import Truck  # noqa: E402
+
+PROJECT_DIR = sys.path[0]
+
+
+def random_matrix(size: int, seed: int) -> DistanceMatrix:
+    """
+    Builds a symmetric matrix of straight-line distances between random points, so that
+    distances obey the triangle inequality like the closed WGUPS table does.
+    """
+    generator = random.Random(seed)
+    points = [(generator.uniform(0, 10), generator.uniform(0, 10)) for _ in range(size)]
+    distances = array('d', (round(math.dist(a, b), 1) for a in points for b in points))
+    return DistanceMatrix(size, distances, [f"{index} Test St" for index in range(size)])
+
+
+def random_packages(distance_matrix: DistanceMatrix, count: int, seed: int) -> HashMap:
+    """
+    Returns a hash table of end-of-day packages, keyed by ID from 1, each at its own random
+    location other than location 0 (where test trucks start).
+    """
+    generator = random.Random(seed)
+    end_of_day = datetime.datetime(1900, 1, 1, 17)
+    package_table = HashMap()
+    for package_id, location in enumerate(generator.sample(range(1, distance_matrix.size), count), start=1):
+        package_table.insert(package_id, Package(package_id, distance_matrix.addresses[location], "", "", "",
+                                                 end_of_day, 1.0, location_index=location))
+    return package_table
+
+
+def truck_for(distance_matrix: DistanceMatrix, package_ids, depart_time=datetime.timedelta(hours=8)) -> Truck:
+    """Returns a truck at location 0 loaded with the given packages."""
+    return Truck(capacity=len(package_ids), speed=18, packages=list(package_ids),
+                 address=distance_matrix.addresses[0], depart_time=depart_time)
+
+
+@pytest.fixture
+def make_matrix():
+    return random_matrix
+
+
+@pytest.fixture
+def sample_scenario(tmp_path, monkeypatch):
+    """
+    Returns main.load_scenario for the sample files, with the distance and route caches kept out of
+    the project directory.
+    """
+    import main
+    monkeypatch.setattr(main, "DISTANCE_CACHE_FILE", str(tmp_path / "distances.cache"))
+    monkeypatch.setattr(main, "ROUTE_CACHE_FILE", None)
+    return main.load_scenario
@@ -0,0 +1,78 @@
+import datetime
+import os
+from datetime import timedelta
+
+import pytest
+
+from Assignment import assign_packages, parse_special_notes
+from DistanceMatrix import DistanceMatrix
+from Package import Package
+from PackageLoader import load_packages
+from PackageStore import PackageStore
+from Truck import Truck
+from conftest import PROJECT_DIR
+from main import HUB_ADDRESS, TRUCK_DEPARTURES, TRUCK_MAX_CAPACITY, TRUCK_SPEED
+
+# Constraints from the special instructions of the sample PackageFile.csv.
+TRUCK_2_ONLY = [3, 18, 36, 38]
+DELIVERED_TOGETHER = [13, 14, 15, 16, 19, 20]
+DELAYED_UNTIL_9_05 = [6, 25, 28, 32]
+WRONG_ADDRESS = 9
+
+
+@pytest.fixture(scope="module")
+def sample():
+    distance_matrix = DistanceMatrix.from_csv(os.path.join(PROJECT_DIR, "DistanceFile.csv"),
+                                              os.path.join(PROJECT_DIR, "AddressFile.csv"))
+    package_table = PackageStore()
+    report = load_packages(os.path.join(PROJECT_DIR, "PackageFile.csv"), package_table, distance_matrix)
+    assert report.ok
+    packages = sorted(package_table.values(), key=lambda package: package.package_id)
+
+    trucks = [Truck(capacity=TRUCK_MAX_CAPACITY, speed=TRUCK_SPEED, address=HUB_ADDRESS, depart_time=departure)
+              for departure in TRUCK_DEPARTURES]
+    unassigned = assign_packages(trucks, packages, distance_matrix, distance_matrix.index_of(HUB_ADDRESS))
+    truck_of = {package_id: number for number, truck in enumerate(trucks, start=1) for package_id in truck.packages}
+    return packages, trucks, unassigned, truck_of
+
+
+def test_every_package_is_placed_once(sample):
+    packages, trucks, unassigned, truck_of = sample
+    assert unassigned == []
+    assert sum(len(truck.packages) for truck in trucks) == len(packages) == 40
+    assert sorted(truck_of) == [package.package_id for package in packages]
+    for truck in trucks:
+        assert len(truck.packages) <= truck.capacity
+
+
+def test_truck_restrictions(sample):
+    truck_of = sample[3]
+    assert all(truck_of[package_id] == 2 for package_id in TRUCK_2_ONLY)
+
+
+def test_grouped_packages_share_a_truck(sample):
+    truck_of = sample[3]
+    assert len({truck_of[package_id] for package_id in DELIVERED_TOGETHER}) == 1
+
+
+def test_delayed_packages_leave_after_they_arrive(sample):
+    packages, trucks, _, truck_of = sample
+    for package_id in DELAYED_UNTIL_9_05:
+        assert trucks[truck_of[package_id] - 1].depart_time >= timedelta(hours=9, minutes=5)
+    # The corrected address of package 9 is known at 10:20 am.
+    assert trucks[truck_of[WRONG_ADDRESS] - 1].depart_time >= timedelta(hours=10, minutes=20)
+
+    # And in general: no package leaves before the time its instructions allow.
+    for package in packages:
+        constraints = parse_special_notes(package.notes)
+        assert trucks[truck_of[package.package_id] - 1].depart_time >= constraints.available_time
+
+
+def test_conflicting_truck_restrictions_are_rejected(make_matrix):
+    end_of_day = datetime.datetime(1900, 1, 1, 17)
+    packages = [Package(1, "1 Test St", "", "", "", end_of_day, 1.0, location_index=1,
+                        notes="Can only be on truck 1, must be delivered with 2"),
+                Package(2, "2 Test St", "", "", "", end_of_day, 1.0, location_index=2, notes="Can only be on truck 2")]
+    trucks = [Truck(capacity=TRUCK_MAX_CAPACITY, speed=TRUCK_SPEED) for _ in range(2)]
+    with pytest.raises(ValueError):
+        assign_packages(trucks, packages, make_matrix(3, 0), 0)
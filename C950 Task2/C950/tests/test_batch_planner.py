@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import main
+from BatchPlanner import FLEET_FILE_NAME, PACKAGE_FILE_NAME, find_manifests, load_fleet, plan_manifests
+from BatchQuery import parse_time
+from ManifestGenerator import generate_manifest
+
+
+def add_day(hub_directory: str, day: str, stops: int, packages: int, seed: int):
+    """Writes a day's package file under a hub; the same stops and seed always write the same hub tables."""
+    files = generate_manifest(hub_directory, stops, packages, seed=seed)
+    os.makedirs(os.path.join(hub_directory, day))
+    os.replace(files["package_file"], os.path.join(hub_directory, day, PACKAGE_FILE_NAME))
+
+
+@pytest.fixture
+def manifest_root(tmp_path):
+    root = tmp_path / "manifests"
+    for day, packages in (("day0", 30), ("day1", 45), ("day2", 20)):
+        add_day(str(root / "hubA"), day, 25, packages, seed=1)
+    for day, packages in (("day0", 40), ("day1", 35)):
+        add_day(str(root / "hubB"), day, 30, packages, seed=2)
+    (root / "hubB" / "day1" / FLEET_FILE_NAME).write_text("departure,capacity,speed\n8:00,12,\n8:30,,20\n")
+    # A package file without tables anywhere above it.
+    (root / "orphan").mkdir()
+    shutil.copy(root / "hubA" / "day0" / PACKAGE_FILE_NAME, root / "orphan" / PACKAGE_FILE_NAME)
+    return str(root)
+
+
+def plan_files(output_directory: str) -> dict:
+    plans = {}
+    for directory, _, files in os.walk(output_directory):
+        if "plan.json" in files:
+            with open(os.path.join(directory, "plan.json")) as file:
+                plans[os.path.relpath(directory, output_directory)] = json.load(file)
+    return plans
+
+
+def test_find_manifests(manifest_root):
+    manifests = find_manifests(manifest_root)
+
+    assert [(manifest.name, manifest.hub) for manifest in manifests] == [
+        ("hubA/day0", "hubA"), ("hubA/day1", "hubA"), ("hubA/day2", "hubA"), ("hubB/day0", "hubB"),
+        ("hubB/day1", "hubB"), ("orphan", "")]
+    assert [manifest.fleet_file is not None for manifest in manifests] == [False] * 4 + [True, False]
+    assert manifests[-1].address_file is None and manifests[-1].distance_file is None
+
+
+def test_load_fleet(manifest_root, tmp_path):
+    fleet_file = os.path.join(manifest_root, "hubB", "day1", FLEET_FILE_NAME)
+    assert load_fleet(fleet_file) == [(parse_time("8:00"), 12, None), (parse_time("8:30"), None, 20.0)]
+
+    for text in ("capacity,speed\n12,18\n", "departure\n", "departure,capacity\n8:00,0\n", "departure\nlate\n"):
+        path = tmp_path / FLEET_FILE_NAME
+        path.write_text(text)
+        with pytest.raises(ValueError):
+            load_fleet(str(path))
+
+
+def test_one_worker_matches_two(manifest_root, tmp_path):
+    results = {}
+    for workers in (1, 2):
+        output_directory = str(tmp_path / f"plans-{workers}")
+        rows = plan_manifests(manifest_root, output_directory, main.plan_manifest, workers=workers)
+        with open(os.path.join(output_directory, "summary.json")) as file:
+            summary = json.load(file)
+        for row in rows:
+            row.pop("plan_seconds", None)
+        summary.pop("wall_seconds")
+        for totals in [summary] + list(summary["hubs"].values()):
+            totals.pop("plan_seconds")
+        results[workers] = rows, summary, plan_files(output_directory)
+
+    rows, summary, plans = results[1]
+    assert results[2] == results[1]
+    assert [row["manifest"] for row in rows] == ["hubA/day0", "hubA/day1", "hubA/day2", "hubB/day0", "hubB/day1",
+                                                 "orphan"]
+    assert [row["packages"] for row in rows[:5]] == [30, 45, 20, 40, 35]
+    assert all(not row.get("error") for row in rows[:5])
+    assert "AddressFile.csv" in rows[5]["error"]
+    assert summary["distance_tables"] == 2
+    assert (summary["manifests"], summary["failed"], summary["packages"]) == (6, 1, 170)
+    assert sorted(plans) == ["hubA/day0", "hubA/day1", "hubA/day2", "hubB/day0", "hubB/day1"]
+    # The fleet file's two trucks plan hubB/day1; every other day uses the configured fleet.
+    assert len(plans["hubB/day1"]["trucks"]) == 2
+    assert plans["hubB/day1"]["trucks"][0]["depart_time"] == "8:00:00"
+    assert len(plans["hubA/day0"]["trucks"]) == len(main.TRUCK_DEPARTURES)
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+
+import main
+from DeadlineReport import DeadlineReport, check_route
+from HashMap import HashMap
+from Package import Package
+from TimeModel import NEVER, package_deadline_seconds, seconds_since_midnight
+
+
+@pytest.fixture
+def sample_plan(sample_scenario):
+    return main.plan_routes(*sample_scenario())
+
+
+def slack_of(package) -> float:
+    return package_deadline_seconds(package) - seconds_since_midnight(package.delivery_time)
+
+
+def as_hash_map(package_table) -> HashMap:
+    """Copies the packages into Package objects in a HashMap, so the report takes its generic path."""
+    table = HashMap()
+    for package in package_table.values():
+        copy = Package(package.package_id, package.address, package.city, package.state, package.zipcode,
+                       package.deadline_time, package.weight, package.status, package.location_index, package.notes)
+        copy.departure_time, copy.delivery_time = package.departure_time, package.delivery_time
+        table.insert(package.package_id, copy)
+    return table
+
+
+def test_sample_plan_is_on_time(sample_plan):
+    report = sample_plan.deadline_report()
+
+    assert report.feasible
+    assert (report.package_count, report.on_time, report.late, report.undelivered) == (40, 40, 0, 0)
+    assert report.first_late is None
+    assert sum(truck["packages"] for truck in report.trucks) == 40
+    for number, truck in enumerate(sample_plan.trucks, start=1):
+        packages = [sample_plan.package_table.lookup(package_id) for package_id in truck.packages]
+        tightest = min(packages, key=slack_of)
+        assert report.trucks[number - 1] == {"truck": number, "packages": len(packages), "late": 0,
+                                             "min_slack": pytest.approx(slack_of(tightest)),
+                                             "tightest_package": tightest.package_id}
+
+
+@pytest.mark.parametrize("convert", [lambda table: table, as_hash_map], ids=["store", "hash map"])
+def test_late_sample_plan(sample_plan, convert):
+    # Every delivery two hours later than planned.
+    for package in sample_plan.package_table.values():
+        package.delivery_time += timedelta(hours=2)
+    package_table = convert(sample_plan.package_table)
+
+    report = DeadlineReport(package_table, sample_plan.trucks)
+
+    late = [package for package in package_table.values() if slack_of(package) < 0]
+    lateness = sorted(-slack_of(package) for package in late)
+    assert late
+    assert (report.late, report.on_time, report.undelivered) == (len(late), 40 - len(late), 0)
+    assert report.max_lateness == pytest.approx(lateness[-1])
+    assert report.mean_lateness == pytest.approx(sum(lateness) / len(lateness))
+    assert report.lateness_buckets == [sum(1 for seconds in lateness if low * 60 < seconds <= high * 60)
+                                       for low, high in ((0, 15), (15, 30), (30, 60), (60, NEVER))]
+    first = min(late, key=lambda package: (package_deadline_seconds(package), package.package_id))
+    assert report.first_late["package_id"] == first.package_id
+    assert first.package_id in sample_plan.trucks[report.first_late["truck"] - 1].packages
+    assert [truck["late"] for truck in report.trucks] == [
+        sum(1 for package_id in truck.packages if slack_of(package_table.lookup(package_id)) < 0)
+        for truck in sample_plan.trucks]
+    assert report.as_dict()["late"] == len(late)
+    assert f"late: {len(late)}" in str(report)
+
+
+def test_undelivered_packages_are_late(sample_plan):
+    sample_plan.package_table.lookup(5).delivery_time = None
+
+    report = sample_plan.deadline_report()
+
+    assert (report.late, report.undelivered) == (1, 1)
+    assert report.as_dict()["first_late"]["delivery"] is None
+    assert report.max_lateness == 0.0
+
+
+def test_check_route_times_the_sample_trucks(sample_plan):
+    distance_matrix = sample_plan.distance_matrix
+    for truck in sample_plan.trucks:
+        packages = [sample_plan.package_table.lookup(package_id) for package_id in truck.packages]
+        start = truck.depart_time.total_seconds()
+
+        check = check_route([package.location_index for package in packages],
+                            [package_deadline_seconds(package) for package in packages],
+                            distance_matrix, sample_plan.hub_location, start, truck.speed)
+
+        assert check.miles == pytest.approx(truck.mileage)
+        assert check.feasible and check.first_late == -1
+        assert check.min_slack == pytest.approx(min(slack_of(package) for package in packages), abs=1e-3)
+
+        # With every deadline at the departure time, each package after the first mile is late.
+        check = check_route([package.location_index for package in packages], [start] * len(packages),
+                            distance_matrix, sample_plan.hub_location, start, truck.speed)
+        miles = 0.0
+        arrivals = []
+        location = sample_plan.hub_location
+        for package in packages:
+            miles += distance_matrix.distance(location, package.location_index)
+            location = package.location_index
+            arrivals.append(miles)
+        assert check.late == sum(1 for miles in arrivals if miles > 0)
+        assert check.first_late == next(position for position, miles in enumerate(arrivals) if miles > 0)
@@ -0,0 +1,89 @@
+import pickle
+import random
+
+import pytest
+
+from HashMap import HashMap
+
+
+def assert_matches(table: HashMap, expected: dict):
+    assert len(table) == len(expected)
+    assert dict(table.items()) == expected
+    assert sorted(table.keys()) == sorted(expected)
+    for key, item in expected.items():
+        assert key in table
+        assert table.lookup(key) == item
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        HashMap(0)
+    with pytest.raises(ValueError):
+        HashMap(10, load_factor=1.5)
+
+
+def test_insert_updates_existing_key():
+    table = HashMap()
+    assert table.insert(1, "a")
+    assert table.insert(1, "b")
+    assert len(table) == 1
+    assert table.lookup(1) == "b"
+    assert table.lookup(2) is None
+
+
+def test_grows_past_load_factor():
+    table = HashMap(initial_capacity=4, load_factor=0.75)
+    expected = {}
+    for key in range(200):
+        table.insert(key, key * 10)
+        expected[key] = key * 10
+        assert len(table) <= table.capacity * table.load_factor
+    assert table.capacity > 4
+    assert_matches(table, expected)
+
+
+def test_remove():
+    table = HashMap(initial_capacity=8)
+    for key in range(6):
+        table.insert(key, str(key))
+    assert table.hash_remove(3)
+    assert not table.hash_remove(3)
+    assert not table.hash_remove(99)
+    assert 3 not in table
+    assert table.lookup(3) is None
+    # Keys probed past the removed slot are still found, and the slot can be reused.
+    assert_matches(table, {key: str(key) for key in range(6) if key != 3})
+    table.insert(3, "again")
+    assert table.lookup(3) == "again"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_operations_match_dict(seed):
+    generator = random.Random(seed)
+    table = HashMap(initial_capacity=2)
+    expected = {}
+    for _ in range(3000):
+        # A small key range forces collisions, updates and removals of present and missing keys.
+        key = generator.randrange(400)
+        operation = generator.random()
+        if operation < 0.55:
+            table.insert(key, operation)
+            expected[key] = operation
+        elif operation < 0.85:
+            assert table.hash_remove(key) == (key in expected)
+            expected.pop(key, None)
+        else:
+            assert table.lookup(key) == expected.get(key)
+            assert (key in table) == (key in expected)
+    assert_matches(table, expected)
+
+
+def test_bulk_insert_and_pickle():
+    table = HashMap()
+    entries = [(f"key {index}", index) for index in range(100)]
+    assert table.bulk_insert(entries) == 100
+    table.hash_remove("key 7")
+    expected = dict(entries)
+    del expected["key 7"]
+    assert_matches(table, expected)
+    assert_matches(pickle.loads(pickle.dumps(table)), expected)
@@ -0,0 +1,89 @@
+import itertools
+import random
+
+import pytest
+
+from HeldKarp import ExactSolverLimitExceeded, optimality_gap, route_miles, solve_exact
+from Stop import Stop
+
+START_SECONDS = 8 * 3600.0
+SPEED = 18.0
+
+
+def on_time(route: list, deadline_of: dict, distance_matrix, start_location: int) -> bool:
+    miles = 0.0
+    current = start_location
+    for item in route:
+        miles += distance_matrix.distance(current, item.location_index)
+        current = item.location_index
+        if START_SECONDS + miles / SPEED * 3600 > deadline_of[id(item)] + 1e-6:
+            return False
+    return True
+
+
+def brute_force_miles(route: list, distance_matrix, start_location: int, deadline_of=None) -> float:
+    """Shortest miles over every order (every on-time order when deadlines are given, if there is one)."""
+    orders = list(itertools.permutations(route))
+    if deadline_of is not None:
+        feasible = [order for order in orders if on_time(order, deadline_of, distance_matrix, start_location)]
+        orders = feasible or orders
+    return min(route_miles(order, distance_matrix, start_location) for order in orders)
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_brute_force(make_matrix, seed):
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(12, seed)
+    route = [Stop(location) for location in generator.sample(range(1, 12), generator.randint(1, 7))]
+
+    exact = solve_exact(route, distance_matrix, 0, START_SECONDS, SPEED)
+
+    assert sorted(map(id, exact)) == sorted(map(id, route))
+    assert route_miles(exact, distance_matrix, 0) == pytest.approx(brute_force_miles(route, distance_matrix, 0))
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_matches_brute_force_with_deadlines(make_matrix, seed):
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(12, seed)
+    route = [Stop(location) for location in generator.sample(range(1, 12), generator.randint(2, 7))]
+    # Tight enough that the shortest order is sometimes late, and a few instances have no on-time order.
+    deadlines = [START_SECONDS + generator.uniform(0.5, 3.0) * 3600 for _ in route]
+    deadline_of = {id(item): deadline for item, deadline in zip(route, deadlines)}
+
+    exact = solve_exact(route, distance_matrix, 0, START_SECONDS, SPEED, deadlines)
+
+    expected = brute_force_miles(route, distance_matrix, 0, deadline_of)
+    assert route_miles(exact, distance_matrix, 0) == pytest.approx(expected)
+    any_on_time = any(on_time(order, deadline_of, distance_matrix, 0) for order in itertools.permutations(route))
+    assert on_time(exact, deadline_of, distance_matrix, 0) == any_on_time
+
+
+def test_packages_at_one_stop_stay_together(make_matrix):
+    distance_matrix = make_matrix(8, 3)
+    route = [Stop(2), Stop(5), Stop(2), Stop(7), Stop(5)]
+
+    exact = solve_exact(route, distance_matrix, 0)
+
+    locations = [item.location_index for item in exact]
+    assert sorted(locations) == [2, 2, 5, 5, 7]
+    assert len(list(itertools.groupby(locations))) == 3
+    # Packages sharing a stop keep their original order.
+    assert [item for item in exact if item.location_index == 2] == [route[0], route[2]]
+
+
+def test_rejects_too_many_stops(make_matrix):
+    distance_matrix = make_matrix(8, 0)
+    with pytest.raises(ExactSolverLimitExceeded):
+        solve_exact([Stop(location) for location in range(1, 8)], distance_matrix, 0, max_stops=6)
+
+
+def test_optimality_gap_is_never_negative(make_matrix):
+    generator = random.Random(7)
+    distance_matrix = make_matrix(12, 7)
+    route = [Stop(location) for location in generator.sample(range(1, 12), 8)]
+
+    gap = optimality_gap(route, distance_matrix, 0)
+
+    assert gap["optimal_miles"] <= gap["heuristic_miles"]
+    assert gap["gap_percent"] >= 0
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from DeadlineReport import check_route
+from HeldKarp import route_miles, solve_exact
+from LocalSearch import improve_route
+from Stop import Stop
+
+START_SECONDS = 8 * 3600.0
+SPEED = 18.0
+
+
+def late_items(route: list, deadline_of: dict, distance_matrix, start_location: int) -> set:
+    """Returns the ids of the route items delivered after their deadline."""
+    late = set()
+    miles = 0.0
+    current = start_location
+    for item in route:
+        miles += distance_matrix.distance(current, item.location_index)
+        current = item.location_index
+        if START_SECONDS + miles / SPEED * 3600 > deadline_of[id(item)] + 1e-6:
+            late.add(id(item))
+    return late
+
+
+def random_route(distance_matrix, generator: random.Random, stops: int) -> list:
+    locations = generator.sample(range(1, distance_matrix.size), stops)
+    return [Stop(location) for location in locations]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_never_increases_miles(make_matrix, seed):
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(40, seed)
+    route = random_route(distance_matrix, generator, generator.randint(3, 30))
+
+    improved = improve_route(route, distance_matrix, 0, START_SECONDS, SPEED)
+
+    assert sorted(map(id, improved)) == sorted(map(id, route))
+    assert route_miles(improved, distance_matrix, 0) <= route_miles(route, distance_matrix, 0) + 1e-9
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_never_makes_packages_late(make_matrix, seed):
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(40, seed)
+    route = random_route(distance_matrix, generator, generator.randint(3, 30))
+
+    # Deadlines around each item's arrival on the starting route, so some are tight and some already missed.
+    deadlines = []
+    miles = 0.0
+    current = 0
+    for item in route:
+        miles += distance_matrix.distance(current, item.location_index)
+        current = item.location_index
+        deadlines.append(START_SECONDS + miles / SPEED * 3600 * generator.uniform(0.5, 1.5))
+    deadline_of = {id(item): deadline for item, deadline in zip(route, deadlines)}
+
+    improved = improve_route(route, distance_matrix, 0, START_SECONDS, SPEED, deadlines)
+
+    before = late_items(route, deadline_of, distance_matrix, 0)
+    after = late_items(improved, deadline_of, distance_matrix, 0)
+    assert after <= before
+    assert route_miles(improved, distance_matrix, 0) <= route_miles(route, distance_matrix, 0) + 1e-9
+    check = check_route([item.location_index for item in improved], [deadline_of[id(item)] for item in improved],
+                        distance_matrix, 0, START_SECONDS, SPEED)
+    assert check.late == len(after)
+
+
+def test_short_routes_are_returned_unchanged(make_matrix):
+    distance_matrix = make_matrix(5, 0)
+    route = [Stop(3), Stop(1)]
+    assert improve_route(route, distance_matrix, 0, START_SECONDS, SPEED) == route
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_improves_a_small_route_on_a_large_matrix(make_matrix, seed):
+    # A truck's stops are a small part of the matrix, so few of them are near each other in it.
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(500, seed)
+    route = random_route(distance_matrix, generator, 10)
+
+    improved = improve_route(route, distance_matrix, 0, START_SECONDS, SPEED)
+
+    optimal_miles = route_miles(solve_exact(route, distance_matrix, 0), distance_matrix, 0)
+    start_miles = route_miles(route, distance_matrix, 0)
+    improved_miles = route_miles(improved, distance_matrix, 0)
+    assert start_miles > optimal_miles
+    assert improved_miles < start_miles
+    # 2-opt and Or-opt together should close most of the gap to the optimum.
+    assert improved_miles - optimal_miles <= (start_miles - optimal_miles) / 2
@@ -0,0 +1,112 @@
+from array import array
+
+import pytest
+
+from DistanceMatrix import DistanceMatrix
+from HashMap import HashMap
+from PackageLoader import END_OF_DAY_SECONDS, ValidationReport, load_packages, parse_deadline, parse_weight
+from PackageStore import PackageStore
+
+ADDRESSES = ["4001 South 700 East", "195 W Oakland Ave", "2530 S 500 E"]
+
+# Line number -> row; the comments say what is wrong with each rejected row.
+ROWS = [
+    "1,195 W Oakland Ave,Salt Lake City,UT,84115,10:30 AM,21 Kilos,,,,,,",
+    "2,2530 S 500 E,Salt Lake City,UT,84106,EOD,44 Kilos,'Must be delivered with 1, 3',,,,",
+    "3,1 Nowhere Rd,Salt Lake City,UT,84106,EOD,2 Kilos,,,,,,",                 # unknown address
+    "1,2530 S 500 E,Salt Lake City,UT,84106,EOD,2 Kilos,,,,,,",                 # duplicate of line 1
+    "4,195 W Oakland Ave,Salt Lake City,UT,84115,25:00 AM,2 Kilos,,,,,,",       # bad deadline
+    "5,195 W Oakland Ave,Salt Lake City,UT,84115,EOD,heavy,,,,,,",              # bad weight
+    "six,195 W Oakland Ave,Salt Lake City,UT,84115,EOD,1 Kilos,,,,,,",          # bad ID
+    "7,195 W Oakland Ave,Salt Lake City",                                       # too few columns
+    "8,1 Nowhere Rd,Salt Lake City,UT,84106,EOD,2 Kilos,,,,,,",                 # unknown address again
+    "9,195 W Oakland Ave,Salt Lake City,UT,84115,EOD,1.5,,,,,,",
+]
+LOADED_IDS = [1, 2, 9]
+
+
+@pytest.fixture
+def distance_matrix():
+    size = len(ADDRESSES)
+    return DistanceMatrix(size, array('d', [1.0]) * (size * size), ADDRESSES)
+
+
+@pytest.fixture
+def package_file(tmp_path):
+    path = tmp_path / "PackageFile.csv"
+    # A blank line in the middle is skipped without counting as a row.
+    path.write_text("\n".join(ROWS[:5] + [""] + ROWS[5:]) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4096])
+def test_report_is_the_same_for_any_chunk_size(distance_matrix, package_file, chunk_size):
+    package_table = PackageStore()
+
+    report = load_packages(package_file, package_table, distance_matrix, chunk_size=chunk_size)
+
+    assert (report.rows_read, report.rows_loaded, report.error_count) == (10, 3, 7)
+    assert not report.ok
+    # File line numbers, counting the blank line.
+    assert [line_number for line_number, _ in report.errors] == [3, 4, 5, 7, 8, 9, 10]
+    messages = [message for _, message in report.errors]
+    assert "unknown address '1 Nowhere Rd'" in messages[0]
+    assert messages[1] == "Duplicate package ID 1."
+    assert "Invalid deadline" in messages[2]
+    assert "Invalid weight" in messages[3]
+    assert messages[4] == "Invalid package ID 'six'."
+    assert messages[5] == "Expected at least 7 columns, got 3."
+    assert "unknown address '1 Nowhere Rd'" in messages[6]
+    assert list(package_table.keys()) == LOADED_IDS
+
+
+@pytest.mark.parametrize("package_table", [PackageStore(), HashMap()], ids=["store", "hash map"])
+def test_loaded_fields(distance_matrix, package_file, package_table):
+    load_packages(package_file, package_table, distance_matrix, chunk_size=2)
+
+    first, second, ninth = (package_table.lookup(package_id) for package_id in LOADED_IDS)
+    # The duplicate on line 4 does not replace the first package 1.
+    assert (first.address, first.location_index, first.weight) == ("195 W Oakland Ave", 1, 21.0)
+    assert (first.deadline_time.hour, first.deadline_time.minute) == (10, 30)
+    assert second.notes == "Must be delivered with 1, 3"
+    assert second.location_index == 2
+    assert ninth.weight == 1.5
+
+
+def test_ids_already_in_the_table_are_duplicates(distance_matrix, package_file):
+    package_table = PackageStore()
+    package_table.append(9, "195 W Oakland Ave", "Salt Lake City", "UT", "84115", END_OF_DAY_SECONDS, 1.0)
+
+    report = load_packages(package_file, package_table, distance_matrix)
+
+    assert report.rows_loaded == 2
+    assert (11, "Duplicate package ID 9.") in report.errors
+
+
+def test_report_keeps_only_the_first_errors(distance_matrix, package_file):
+    report = load_packages(package_file, PackageStore(), distance_matrix, report=ValidationReport(max_reported=2))
+
+    assert report.error_count == 7
+    assert len(report.errors) == 2
+    text = str(report)
+    assert text.startswith("Loaded 3 of 10 package rows (7 rejected).")
+    assert text.endswith("... and 5 more")
+
+
+def test_parse_deadline():
+    assert parse_deadline("EOD") == END_OF_DAY_SECONDS
+    assert parse_deadline("9:00 AM") == 9 * 3600
+    assert parse_deadline("12:00 AM") == 0
+    assert parse_deadline("12:30 PM") == 12 * 3600 + 30 * 60
+    assert parse_deadline("5:15 pm") == 17 * 3600 + 15 * 60
+    for text in ("", "10:30", "13:00 PM", "10:5 AM", "noon"):
+        with pytest.raises(ValueError):
+            parse_deadline(text)
+
+
+def test_parse_weight():
+    assert parse_weight("21 Kilos") == 21.0
+    assert parse_weight("0.5") == 0.5
+    for text in ("", "Kilos", "-1 Kilos", "nan"):
+        with pytest.raises(ValueError):
+            parse_weight(text)
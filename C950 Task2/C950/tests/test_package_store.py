@@ -0,0 +1,120 @@
+import datetime
+import random
+from datetime import timedelta
+
+import pytest
+
+from Package import Package
+from PackageStore import PackageStore
+
+FIELDS = ("package_id", "address", "city", "state", "zipcode", "deadline_time", "weight", "status",
+          "location_index", "notes", "departure_time", "delivery_time")
+
+
+def make_package(package_id: int, generator: random.Random) -> Package:
+    package = Package(package_id, f"{generator.randrange(9999)} Main St", generator.choice(["Murray", "Holladay"]),
+                      "UT", str(84100 + generator.randrange(50)),
+                      datetime.datetime(1900, 1, 1, generator.randrange(8, 18), generator.choice([0, 30])),
+                      float(generator.randrange(1, 90)), generator.choice(["At the hub", "En route", "Delivered"]),
+                      generator.randrange(27), generator.choice(["", "Can only be on truck 2"]))
+    if generator.random() < 0.5:
+        package.departure_time = timedelta(hours=8, minutes=generator.randrange(60))
+        package.delivery_time = package.departure_time + timedelta(minutes=generator.randrange(1, 120))
+    return package
+
+
+def assert_same_fields(view, package: Package):
+    for field in FIELDS:
+        assert getattr(view, field) == getattr(package, field), field
+
+
+def test_views_read_their_own_row():
+    generator = random.Random(0)
+    store = PackageStore()
+    packages = [make_package(package_id, generator) for package_id in range(1, 41)]
+    for package in packages:
+        store.insert(package.package_id, package)
+
+    for package in packages:
+        assert_same_fields(store.lookup(package.package_id), package)
+    assert str(store.lookup(7)) == str(packages[6])
+
+
+def test_views_write_only_their_own_row():
+    generator = random.Random(1)
+    store = PackageStore()
+    packages = [make_package(package_id, generator) for package_id in (1, 2, 3)]
+    for package in packages:
+        store.insert(package.package_id, package)
+
+    view = store.lookup(2)
+    view.address = "410 S State St"
+    view.zipcode = "84111"
+    view.location_index = 19
+    view.status = "Delivered"
+    view.departure_time = timedelta(hours=10, minutes=20)
+    view.delivery_time = None
+    view.deadline_time = datetime.datetime(1900, 1, 1, 10, 30)
+
+    again = store.lookup(2)
+    assert again == view
+    assert (again.address, again.zipcode, again.location_index, again.status) == ("410 S State St", "84111", 19,
+                                                                                 "Delivered")
+    assert again.departure_time == timedelta(hours=10, minutes=20)
+    assert again.delivery_time is None
+    assert again.deadline_seconds == 10 * 3600 + 30 * 60
+    assert_same_fields(store.lookup(1), packages[0])
+    assert_same_fields(store.lookup(3), packages[2])
+
+
+def test_remove_and_reinsert():
+    generator = random.Random(2)
+    store = PackageStore()
+    for package_id in (1, 2, 3):
+        store.insert(package_id, make_package(package_id, generator))
+
+    assert store.hash_remove(2)
+    assert not store.hash_remove(2)
+    assert 2 not in store and store.lookup(2) is None
+    assert list(store.keys()) == [1, 3]
+
+    replacement = make_package(2, generator)
+    store.insert(2, replacement)
+    assert len(store) == 3
+    assert list(store.keys()) == [1, 3, 2]
+    assert_same_fields(store.lookup(2), replacement)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_random_operations_match_dict(seed):
+    generator = random.Random(seed)
+    store = PackageStore(initial_capacity=16)
+    expected = {}
+    # Small IDs use the flat index, large and negative ones the HashMap.
+    key_space = list(range(1, 60)) + [10 ** 6 + offset for offset in range(20)] + [-5, -1]
+    for _ in range(1500):
+        package_id = generator.choice(key_space)
+        if generator.random() < 0.6:
+            package = make_package(package_id, generator)
+            store.insert(package_id, package)
+            expected[package_id] = package
+        else:
+            assert store.hash_remove(package_id) == (package_id in expected)
+            expected.pop(package_id, None)
+
+    assert len(store) == len(expected)
+    assert list(store.keys()) == list(expected)
+    for (package_id, view), package in zip(store.items(), expected.values()):
+        assert package_id == package.package_id
+        assert_same_fields(view, package)
+    assert all(store.lookup(package_id) is None for package_id in key_space if package_id not in expected)
+
+
+def test_repeated_strings_are_stored_once():
+    store = PackageStore()
+    for package_id in range(1, 101):
+        store.append(package_id, f"{package_id} Main St", "Salt Lake City", "UT", "84115", 17 * 3600, 1.0)
+
+    # 100 addresses plus one city, state, zipcode, status and empty note.
+    assert len(store._strings) == 105
+    assert {view.city for view in store.values()} == {"Salt Lake City"}
@@ -0,0 +1,35 @@
+import pytest
+
+import ParallelRouting
+from HeldKarp import route_miles, solve_exact
+from conftest import random_matrix, random_packages, truck_for
+
+
+@pytest.fixture(scope="module")
+def large_matrix():
+    return random_matrix(500, 11)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_runs_reach_the_optimum_on_a_large_matrix(large_matrix, seed):
+    # A truck's 12 stops are a small part of the matrix.
+    package_table = random_packages(large_matrix, 12, seed)
+    truck = truck_for(large_matrix, range(1, 13))
+
+    ParallelRouting.deliver_trucks([truck], package_table, large_matrix, starts=4, workers=1)
+
+    optimal_route = solve_exact([package_table.lookup(package_id) for package_id in range(1, 13)], large_matrix, 0)
+    assert sorted(truck.packages) == list(range(1, 13))
+    assert truck.mileage <= route_miles(optimal_route, large_matrix, 0) * 1.01
+
+
+def test_pool_matches_one_worker(large_matrix):
+    package_table = random_packages(large_matrix, 30, 5)
+    in_process = [truck_for(large_matrix, range(1, 16)), truck_for(large_matrix, range(16, 31))]
+    pooled = [truck_for(large_matrix, range(1, 16)), truck_for(large_matrix, range(16, 31))]
+
+    ParallelRouting.deliver_trucks(in_process, package_table, large_matrix, starts=3, workers=1)
+    ParallelRouting.deliver_trucks(pooled, package_table, large_matrix, starts=3, workers=2)
+
+    assert [truck.packages for truck in pooled] == [truck.packages for truck in in_process]
+    assert [truck.mileage for truck in pooled] == pytest.approx([truck.mileage for truck in in_process])
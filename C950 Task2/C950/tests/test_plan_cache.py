@@ -0,0 +1,31 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def plan_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "PLAN_CACHE_FILE", str(tmp_path / "plan.cache"))
+    monkeypatch.setattr(main, "DISTANCE_CACHE_FILE", str(tmp_path / "distances.cache"))
+    monkeypatch.setattr(main, "ROUTE_CACHE_FILE", None)
+    return tmp_path / "plan.cache"
+
+
+def test_same_settings_load_the_cached_plan(plan_cache, monkeypatch):
+    miles = main.build_plan().total_mileage
+    assert plan_cache.exists()
+
+    def fail(*arguments, **keywords):
+        raise AssertionError("the cached plan should have been used")
+
+    monkeypatch.setattr(main, "plan_routes", fail)
+    assert main.build_plan().total_mileage == pytest.approx(miles)
+
+
+def test_changing_a_setting_after_import_invalidates_the_cached_plan(plan_cache, monkeypatch):
+    cached_miles = main.build_plan().total_mileage
+
+    monkeypatch.setattr(main, "IMPROVE_ROUTES", True)
+    improved_miles = main.build_plan().total_mileage
+
+    assert improved_miles < cached_miles
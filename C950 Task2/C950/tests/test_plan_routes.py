@@ -0,0 +1,24 @@
+import pytest
+
+import main
+from Truck import Truck
+
+
+def test_planned_routes_match_the_simulated_day(sample_scenario):
+    # Route the sample's trucks without simulating, then plan (and simulate) the same day.
+    distance_matrix, package_table = sample_scenario()
+    routed = [Truck(capacity=main.TRUCK_MAX_CAPACITY, speed=main.TRUCK_SPEED, address=main.HUB_ADDRESS,
+                    depart_time=departure) for departure in main.TRUCK_DEPARTURES]
+    main.route_trucks(routed, distance_matrix, package_table, address_corrections=main.ADDRESS_CORRECTIONS)
+
+    # Routing leaves package 9 at its listed (wrong) address until the simulation corrects it.
+    assert package_table.lookup(9).address == "300 State St"
+    assert package_table.lookup(9).location_index == distance_matrix.index_of("300 State St")
+
+    plan = main.plan_routes(*sample_scenario())
+
+    assert package_table.lookup(9).address == "300 State St"
+    assert plan.package_table.lookup(9).address == "410 S State St"
+    # Package 9's truck was routed to the corrected address, so it drives exactly the planned miles.
+    assert [truck.packages for truck in plan.trucks] == [truck.packages for truck in routed]
+    assert [truck.mileage for truck in plan.trucks] == pytest.approx([truck.mileage for truck in routed])
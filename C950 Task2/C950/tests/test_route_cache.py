@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from HeldKarp import route_miles, solve_exact
+from RouteCache import RouteCache
+from Routing import cached_route
+from Stop import Stop
+from conftest import random_matrix
+
+START_SECONDS = 8 * 3600.0
+SPEED = 18.0
+
+
+def stops_at(locations) -> list:
+    return [Stop(location) for location in locations]
+
+
+def order(route) -> list:
+    return [stop.location_index for stop in route]
+
+
+def test_exact_hit_ignores_stop_order(make_matrix):
+    distance_matrix = make_matrix(10, 0)
+    cache = RouteCache()
+    cache.store(distance_matrix, 0, stops_at([3, 1, 2]))
+
+    assert order(cache.lookup(distance_matrix, 0, stops_at([1, 2, 3]))) == [3, 1, 2]
+    assert cache.lookup(distance_matrix, 0, stops_at([1, 2])) is None
+    assert cache.lookup(distance_matrix, 4, stops_at([1, 2, 3])) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_routes_from_other_settings_are_not_returned(tmp_path, make_matrix):
+    distance_matrix = make_matrix(10, 0)
+    cache = RouteCache(namespace="exact")
+    cache.store(distance_matrix, 0, stops_at([3, 1, 2]))
+    path = str(tmp_path / "routes.cache")
+    cache.save(path)
+
+    assert RouteCache.load(path, namespace="exact").lookup(distance_matrix, 0, stops_at([1, 2, 3])) is not None
+    assert RouteCache.load(path, namespace="nearest_neighbor").lookup(distance_matrix, 0, stops_at([1, 2, 3])) is None
+
+
+def test_evicts_least_recently_used(make_matrix):
+    distance_matrix = make_matrix(10, 0)
+    cache = RouteCache(max_entries=2)
+    cache.store(distance_matrix, 0, stops_at([1, 2]))
+    cache.store(distance_matrix, 0, stops_at([3, 4]))
+    # Using the first route makes the second the least recently used.
+    assert cache.lookup(distance_matrix, 0, stops_at([1, 2])) is not None
+    cache.store(distance_matrix, 0, stops_at([5, 6]))
+
+    assert len(cache) == 2
+    assert cache.lookup(distance_matrix, 0, stops_at([3, 4])) is None
+    assert cache.lookup(distance_matrix, 0, stops_at([1, 2])) is not None
+    assert cache.lookup(distance_matrix, 0, stops_at([5, 6])) is not None
+    # Evicted routes are gone from near-miss searches too.
+    assert cache.nearest(distance_matrix, 0, stops_at([3, 4]), max_difference=2) is None
+
+
+def test_near_miss_keeps_the_cached_order_and_inserts_new_stops(make_matrix):
+    distance_matrix = make_matrix(12, 0)
+    cache = RouteCache()
+    cache.store(distance_matrix, 0, stops_at([5, 1, 4, 2, 3]))
+
+    route = cache.nearest(distance_matrix, 0, stops_at([1, 2, 3, 4, 9]))
+
+    assert sorted(order(route)) == [1, 2, 3, 4, 9]
+    assert [location for location in order(route) if location != 9] == [1, 4, 2, 3]
+    assert cache.near_misses == 1
+    # Five stops added or removed is beyond the default limit.
+    assert cache.nearest(distance_matrix, 0, stops_at([6, 7, 8])) is None
+
+
+def test_save_and_load(tmp_path, make_matrix):
+    distance_matrix = make_matrix(10, 0)
+    cache = RouteCache(max_entries=3)
+    for locations in ([1, 2], [3, 4], [5, 6]):
+        cache.store(distance_matrix, 0, stops_at(locations))
+    path = str(tmp_path / "routes.cache")
+    cache.save(path)
+
+    loaded = RouteCache.load(path, max_entries=2)
+    assert len(loaded) == 2
+    assert loaded.lookup(distance_matrix, 0, stops_at([1, 2])) is None
+    assert order(loaded.lookup(distance_matrix, 0, stops_at([6, 5]))) == [5, 6]
+    assert len(RouteCache.load(str(tmp_path / "missing.cache"))) == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_warm_start_improves_a_near_miss_on_a_large_matrix(seed):
+    # A truck's 12 stops are a small part of the matrix; the cached order is a poor one.
+    distance_matrix = random_matrix(500, 11)
+    generator = random.Random(seed)
+    locations = generator.sample(range(1, distance_matrix.size), 12)
+    cache = RouteCache()
+    cache.store(distance_matrix, 0, stops_at(locations[:11]))
+
+    stops = stops_at(locations[1:])
+    route = cached_route(cache, stops, distance_matrix, 0, START_SECONDS, SPEED, warm_start=True)
+
+    warm_start = RouteCache()
+    warm_start.store(distance_matrix, 0, stops_at(locations[:11]))
+    starting_miles = route_miles(warm_start.nearest(distance_matrix, 0, stops), distance_matrix, 0)
+    optimal_miles = route_miles(solve_exact(stops, distance_matrix, 0), distance_matrix, 0)
+    assert sorted(order(route)) == sorted(locations[1:])
+    assert route_miles(route, distance_matrix, 0) < starting_miles
+    assert route_miles(route, distance_matrix, 0) - optimal_miles <= (starting_miles - optimal_miles) / 2
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from Routing import nearest_neighbor_route
+from Stop import Stop
+
+
+def random_packages(distance_matrix, generator: random.Random, locations: int, packages: int) -> list:
+    """Packages spread over the given number of locations, several of them sharing a location."""
+    chosen = generator.sample(range(distance_matrix.size), locations)
+    return [Stop(chosen[index % locations]) for index in generator.sample(range(packages), packages)]
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("candidates", [1, 3, 10])
+def test_candidate_lists_match_full_scan(make_matrix, seed, candidates):
+    generator = random.Random(seed)
+    # Distances are rounded to 0.1 mile, so there are plenty of ties for the tie-break rule.
+    distance_matrix = make_matrix(generator.randint(2, 200), seed)
+    locations = generator.randint(1, distance_matrix.size)
+    packages = random_packages(distance_matrix, generator, locations, locations + generator.randint(0, 60))
+    start_location = generator.randrange(distance_matrix.size)
+
+    with_candidates = nearest_neighbor_route(packages, distance_matrix, start_location, candidates=candidates)
+    full_scan = nearest_neighbor_route(packages, distance_matrix, start_location, candidates=0)
+
+    assert [id(package) for package in with_candidates] == [id(package) for package in full_scan]
+    assert sorted(map(id, full_scan)) == sorted(map(id, packages))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_small_route_on_a_large_matrix_matches_full_scan(make_matrix, seed):
+    generator = random.Random(seed)
+    distance_matrix = make_matrix(500, seed)
+    packages = random_packages(distance_matrix, generator, 15, 20)
+    start_location = generator.randrange(distance_matrix.size)
+
+    with_candidates = nearest_neighbor_route(packages, distance_matrix, start_location, candidates=3)
+    full_scan = nearest_neighbor_route(packages, distance_matrix, start_location, candidates=0)
+
+    assert [id(package) for package in with_candidates] == [id(package) for package in full_scan]
+
+
+def test_full_scan_breaks_ties_towards_the_last_package(make_matrix):
+    distance_matrix = make_matrix(4, 0)
+    # Both packages are at the start location, so each is at distance zero.
+    first, second = Stop(2), Stop(2)
+    assert nearest_neighbor_route([first, second], distance_matrix, 2, candidates=0) == [second, first]
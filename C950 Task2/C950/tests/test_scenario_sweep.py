@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pytest
+
+import main
+from Assignment import parse_special_notes
+from DeadlineReport import DeadlineReport
+from ScenarioSweep import dispatch, parse_grid, sweep
+from Simulation import Simulation
+from TimeModel import format_seconds
+from Truck import Truck
+
+# Truck 2 carries package 9, so its options start once the corrected address is known.
+DEPARTURES = [
+    [timedelta(hours=8), timedelta(hours=9, minutes=30)],
+    [timedelta(hours=10, minutes=20), timedelta(hours=11)],
+    [timedelta(hours=9, minutes=5)],
+]
+
+
+def simulate(load_scenario, routed, departures, speed, drivers):
+    """Drives the routed trucks' package lists through a full simulation of the sample day, like plan_routes."""
+    distance_matrix, package_table = load_scenario()
+    trucks = [Truck(capacity=truck.capacity, speed=speed, address=main.HUB_ADDRESS, depart_time=departure)
+              for truck, departure in zip(routed, departures)]
+    for truck, routed_truck in zip(trucks, routed):
+        truck.packages = list(routed_truck.packages)
+
+    simulation = Simulation(trucks, package_table, distance_matrix, distance_matrix.index_of(main.HUB_ADDRESS),
+                            drivers=drivers)
+    for package in package_table.values():
+        constraints = parse_special_notes(package.notes)
+        if constraints.available_time and not constraints.wrong_address:
+            simulation.schedule_hub_arrival(constraints.available_time, [package.package_id])
+    for correction_time, package_id, address, city, zipcode in main.ADDRESS_CORRECTIONS:
+        simulation.schedule_address_change(correction_time, package_id, address, city, zipcode)
+    finish = simulation.run()
+    return trucks, package_table, finish
+
+
+def test_retiming_matches_a_full_simulation(sample_scenario):
+    distance_matrix, package_table = sample_scenario()
+    routed = []
+
+    def route_fleet(trucks):
+        routed[:] = trucks
+        return main.route_trucks(trucks, distance_matrix, package_table)
+
+    rows = sweep(route_fleet, package_table, distance_matrix, main.HUB_ADDRESS, DEPARTURES, speeds=[18.0, 10.0],
+                 capacities=[main.TRUCK_MAX_CAPACITY], truck_counts=[3], driver_counts=[1, 2, None],
+                 planning_speed=main.TRUCK_SPEED, address_corrections=main.ADDRESS_CORRECTIONS)
+
+    assert 9 in routed[1].packages
+    assert len(rows) == 3 * 2 * 4
+    assert any(row["late"] for row in rows) and not all(row["late"] for row in rows)
+    for row in rows:
+        departures = [timedelta(hours=int(hours), minutes=int(minutes))
+                      for hours, minutes, _ in (text.split(":") for text in row["departures"].split())]
+        trucks, simulated, finish = simulate(sample_scenario, routed, departures, row["speed"], row["drivers"])
+        report = DeadlineReport(simulated, trucks)
+
+        assert row["mileage"] == pytest.approx(sum(truck.mileage for truck in trucks), abs=0.05)
+        assert row["late"] == report.late
+        assert row["max_lateness_minutes"] == pytest.approx(report.max_lateness / 60, abs=0.05)
+        assert row["total_lateness_minutes"] == pytest.approx(report.mean_lateness * report.late / 60, abs=0.05)
+        assert row["min_slack_minutes"] == pytest.approx(min(truck["min_slack"] for truck in report.trucks) / 60,
+                                                         abs=0.05)
+        assert row["finish_time"] == format_seconds(finish.total_seconds())
+
+
+def test_sweep_without_enough_departures():
+    with pytest.raises(ValueError):
+        sweep(lambda trucks: [], None, None, main.HUB_ADDRESS, DEPARTURES[:1], [18.0], [16], [2])
+
+
+def test_dispatch_waits_for_free_drivers():
+    assert dispatch([0, 0, 0], [10, 20, 30]) == [0, 0, 0]
+    assert dispatch([0, 5, 0], [10, 20, 30], drivers=1) == [0, 40, 10]
+    assert dispatch([100, 0], [10, 20], drivers=2) == [100, 0]
+
+
+def test_parse_grid():
+    assert parse_grid("15,18", float) == [15.0, 18.0]
+    assert parse_grid("15..25/5", int) == [15, 20, 25]
+    assert parse_grid("1..3", int, "1") == [1, 2, 3]
+    assert parse_grid("0.1..0.3/0.1", float) == pytest.approx([0.1, 0.2, 0.3])
+    assert parse_grid("3..1/1", int) == []
+    for text in ("1..3", "1..3/0", "a"):
+        with pytest.raises(ValueError):
+            parse_grid(text, int)
+
+
+@pytest.mark.parametrize("options", [
+    ["--speeds", "fast"],
+    ["--speeds", "0"],
+    ["--capacities", "16..12/1"],
+    ["--truck-counts", "1..3/0"],
+    ["--drivers", "-1"],
+    ["--truck-counts", "4"],
+    ["--departures", "8:00", "--truck-counts", "2"],
+    ["--departures", "9:00..8:00/0:15", "--truck-counts", "1"],
+])
+def test_bad_grids_are_parser_errors(options, capsys):
+    with pytest.raises(SystemExit) as error:
+        main.parse_arguments(["--sweep"] + options)
+
+    assert error.value.code == 2
+    assert "--sweep:" in capsys.readouterr().err
+
+
+def test_sweep_grid_defaults():
+    grid = main.parse_arguments(["--sweep", "--speeds", "15..18/1.5", "--departures", "8:00,8:30",
+                                 "--truck-counts", "1"]).sweep_grid
+
+    assert grid == {"departures": [[timedelta(hours=8), timedelta(hours=8, minutes=30)]],
+                    "speeds": [15.0, 16.5, 18.0], "capacities": [main.TRUCK_MAX_CAPACITY], "truck_counts": [1],
+                    "driver_counts": [main.DRIVER_COUNT]}
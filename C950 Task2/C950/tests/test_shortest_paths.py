@@ -0,0 +1,103 @@
+import random
+from array import array
+
+import pytest
+
+import ShortestPaths
+from DistanceMatrix import DistanceMatrix
+from ShortestPaths import ClosedDistanceMatrix, close_distance_matrix, floyd_warshall
+
+IMPLEMENTATIONS = [
+    ShortestPaths._floyd_warshall_python,
+    pytest.param(getattr(ShortestPaths, "_floyd_warshall_numpy", None),
+                 marks=pytest.mark.skipif(ShortestPaths.numpy is None, reason="numpy is not installed")),
+]
+
+
+def random_table(size: int, seed: int, symmetric: bool) -> DistanceMatrix:
+    """A table of one-decimal distances that often break the triangle inequality, like the sample's."""
+    generator = random.Random(seed)
+    rows = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            if i != j and (not symmetric or j > i):
+                rows[i][j] = round(generator.uniform(0.5, 10.0), 1)
+                if symmetric:
+                    rows[j][i] = rows[i][j]
+    return DistanceMatrix(size, array('d', (value for row in rows for value in row)),
+                          [f"{index} Test St" for index in range(size)])
+
+
+def naive_closure(distance_matrix: DistanceMatrix) -> list:
+    size = distance_matrix.size
+    closed = [[distance_matrix.distance(i, j) for j in range(size)] for i in range(size)]
+    for k in range(size):
+        for i in range(size):
+            for j in range(size):
+                if closed[i][k] + closed[k][j] < closed[i][j] - ShortestPaths.CLOSURE_EPSILON:
+                    closed[i][j] = closed[i][k] + closed[k][j]
+    return closed
+
+
+@pytest.mark.parametrize("implementation", IMPLEMENTATIONS)
+@pytest.mark.parametrize("symmetric", [True, False])
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_the_triple_loop(implementation, symmetric, seed):
+    table = random_table(25, seed, symmetric)
+
+    distances, via = implementation(table.size, table.distances)
+
+    expected = naive_closure(table)
+    size = table.size
+    for i in range(size):
+        for j in range(size):
+            assert distances[i * size + j] == pytest.approx(expected[i][j])
+            # A via point is only recorded for pairs the closure shortened.
+            assert (via[i * size + j] >= 0) == (distances[i * size + j] < table.distance(i, j))
+
+
+@pytest.mark.parametrize("symmetric", [True, False])
+def test_paths_follow_direct_legs(symmetric):
+    table = random_table(20, 7, symmetric)
+    closed = ClosedDistanceMatrix.from_matrix(table)
+    assert closed.detour_count() > 0
+
+    for i in range(table.size):
+        for j in range(table.size):
+            path = closed.path(i, j)
+            assert path[0] == i and path[-1] == j
+            assert len(set(path)) == len(path)
+            # Driving the path leg by leg on the direct table costs exactly the closed distance.
+            miles = sum(table.distance(a, b) for a, b in zip(path, path[1:]))
+            assert miles == pytest.approx(closed.distance(i, j))
+
+
+def test_metric_table_is_unchanged():
+    table = DistanceMatrix(3, array('d', [0, 1, 2, 1, 0, 1, 2, 1, 0]), ["A", "B", "C"])
+
+    distances, via = floyd_warshall(table.size, table.distances)
+
+    assert list(distances) == list(table.distances)
+    assert set(via) == {-1}
+
+
+def test_closure_is_cached(tmp_path):
+    table = random_table(12, 3, True)
+    cache_path = str(tmp_path / "distances.cache")
+    checksum = bytes(32)
+
+    closed = close_distance_matrix(table, cache_path, checksum)
+    cached = ShortestPaths.load_closure(cache_path, checksum, table)
+
+    assert list(cached.distances) == list(closed.distances)
+    assert list(cached.via) == list(closed.via)
+    assert ShortestPaths.load_closure(cache_path, bytes([1]) * 32, table) is None
+
+
+def test_large_table_without_numpy_is_left_unclosed(monkeypatch):
+    monkeypatch.setattr(ShortestPaths, "numpy", None)
+    monkeypatch.setattr(ShortestPaths, "PYTHON_CLOSURE_MAX_SIZE", 10)
+    table = random_table(12, 3, True)
+
+    with pytest.warns(RuntimeWarning):
+        assert close_distance_matrix(table) is table
@@ -0,0 +1,141 @@
+import datetime
+from array import array
+from datetime import timedelta
+
+import pytest
+
+from DistanceMatrix import DistanceMatrix
+from HashMap import HashMap
+from Package import Package
+from Simulation import Simulation
+from Truck import Truck
+
+# Four locations on a straight road, 9 miles (half an hour at 18 mph) apart: the hub, then A, B and C.
+ADDRESSES = ["Hub", "A St", "B St", "C St"]
+POSITIONS = [0, 9, 18, 27]
+
+
+@pytest.fixture
+def distance_matrix():
+    distances = array('d', (abs(a - b) for a in POSITIONS for b in POSITIONS))
+    return DistanceMatrix(len(POSITIONS), distances, ADDRESSES)
+
+
+def package_table(locations: dict) -> HashMap:
+    """Returns end-of-day packages keyed by ID, each at the given location."""
+    table = HashMap()
+    for package_id, location in locations.items():
+        table.insert(package_id, Package(package_id, ADDRESSES[location], "City", "UT", "84000",
+                                         datetime.datetime(1900, 1, 1, 17), 1.0, location_index=location))
+    return table
+
+
+def truck(package_ids, depart=timedelta(hours=8)) -> Truck:
+    return Truck(capacity=16, speed=18, packages=list(package_ids), address="Hub", depart_time=depart)
+
+
+def test_delivers_in_route_order(distance_matrix):
+    packages = package_table({1: 2, 2: 1})
+    trucks = [truck([2, 1])]
+
+    finished = Simulation(trucks, packages, distance_matrix, 0).run()
+
+    assert finished == timedelta(hours=9)
+    assert packages.lookup(2).delivery_time == timedelta(hours=8, minutes=30)
+    assert packages.lookup(1).delivery_time == timedelta(hours=9)
+    assert packages.lookup(1).departure_time == timedelta(hours=8)
+    assert packages.lookup(1).status == "Delivered"
+    assert trucks[0].mileage == 18
+    assert trucks[0].address == "B St"
+
+
+def test_waiting_truck_leaves_when_the_driver_is_free(distance_matrix):
+    packages = package_table({1: 1, 2: 3})
+    trucks = [truck([1]), truck([2], depart=timedelta(hours=8, minutes=10))]
+
+    Simulation(trucks, packages, distance_matrix, 0, drivers=1).run()
+
+    # The only driver delivers package 1 at 8:30 and then takes the second truck.
+    assert trucks[1].depart_time == timedelta(hours=8, minutes=30)
+    assert packages.lookup(2).departure_time == timedelta(hours=8, minutes=30)
+    assert packages.lookup(2).delivery_time == timedelta(hours=10)
+
+
+def test_driver_returning_to_the_hub_hands_off_on_arrival(distance_matrix):
+    packages = package_table({1: 1, 2: 3})
+    trucks = [truck([1]), truck([2])]
+
+    Simulation(trucks, packages, distance_matrix, 0, drivers=1, return_to_hub=True).run()
+
+    assert trucks[0].mileage == 18
+    assert trucks[0].address == "Hub"
+    assert trucks[1].depart_time == timedelta(hours=9)
+
+
+def test_every_truck_has_a_driver_by_default(distance_matrix):
+    packages = package_table({1: 1, 2: 3})
+    trucks = [truck([1]), truck([2])]
+
+    Simulation(trucks, packages, distance_matrix, 0).run()
+
+    assert [each.depart_time for each in trucks] == [timedelta(hours=8)] * 2
+
+
+def test_truck_waits_for_delayed_packages(distance_matrix):
+    packages = package_table({1: 1, 2: 2})
+    trucks = [truck([1, 2])]
+    simulation = Simulation(trucks, packages, distance_matrix, 0)
+    simulation.schedule_hub_arrival(timedelta(hours=9, minutes=5), [2])
+
+    simulation.run()
+
+    assert trucks[0].depart_time == timedelta(hours=9, minutes=5)
+    assert packages.lookup(1).delivery_time == timedelta(hours=9, minutes=35)
+    assert packages.lookup(2).delivery_time == timedelta(hours=10, minutes=5)
+
+
+def test_address_correction_before_the_truck_heads_there(distance_matrix):
+    packages = package_table({1: 1, 2: 2})
+    trucks = [truck([1, 2])]
+    simulation = Simulation(trucks, packages, distance_matrix, 0)
+    simulation.schedule_address_change(timedelta(hours=8, minutes=20), 2, "C St", zipcode="84111")
+
+    simulation.run()
+
+    package = packages.lookup(2)
+    assert (package.address, package.city, package.zipcode) == ("C St", "City", "84111")
+    assert package.location_index == 3
+    # After A (8:30) the truck drives 18 miles to C instead of 9 to B.
+    assert package.delivery_time == timedelta(hours=9, minutes=30)
+    assert trucks[0].mileage == 27
+    assert simulation.address_changes == [(8 * 3600 + 20 * 60, 2, "B St", "City", "84000")]
+
+
+def test_address_correction_at_departure_applies_first(distance_matrix):
+    packages = package_table({1: 2})
+    trucks = [truck([1], depart=timedelta(hours=10, minutes=20))]
+    simulation = Simulation(trucks, packages, distance_matrix, 0)
+    simulation.schedule_address_change(timedelta(hours=10, minutes=20), 1, "A St")
+
+    simulation.run()
+
+    assert trucks[0].mileage == 9
+    assert packages.lookup(1).delivery_time == timedelta(hours=10, minutes=50)
+
+
+def test_address_correction_after_the_truck_heads_there(distance_matrix):
+    packages = package_table({1: 1, 2: 2})
+    trucks = [truck([1, 2])]
+    simulation = Simulation(trucks, packages, distance_matrix, 0)
+    # The truck left A for B at 8:30; the change comes too late for this trip.
+    simulation.schedule_address_change(timedelta(hours=8, minutes=45), 2, "C St")
+
+    simulation.run()
+
+    assert packages.lookup(2).delivery_time == timedelta(hours=9)
+    assert trucks[0].mileage == 18
+
+
+def test_rejects_fewer_than_one_driver(distance_matrix):
+    with pytest.raises(ValueError):
+        Simulation([truck([])], package_table({}), distance_matrix, 0, drivers=0)
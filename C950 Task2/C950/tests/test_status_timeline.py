@@ -0,0 +1,102 @@
+import datetime
+import random
+from datetime import timedelta
+
+import pytest
+
+import main
+from Package import Package
+from StatusTimeline import STATUS_AT_HUB, STATUS_DELIVERED, STATUS_EN_ROUTE, StatusTimeline
+
+
+def routed_package(package_id: int, departure, delivery) -> Package:
+    package = Package(package_id, f"{package_id} Test St", "City", "UT", "84000", datetime.datetime(1900, 1, 1, 17),
+                      1.0)
+    package.departure_time = departure
+    package.delivery_time = delivery
+    return package
+
+
+def test_status_at_the_event_times():
+    timeline = StatusTimeline([routed_package(1, timedelta(hours=8), timedelta(hours=9))])
+
+    assert timeline.status_of(1, timedelta(hours=7, minutes=59)) == STATUS_AT_HUB
+    assert timeline.status_of(1, timedelta(hours=8)) == STATUS_EN_ROUTE
+    assert timeline.status_of(1, 9 * 3600 - 1) == STATUS_EN_ROUTE
+    assert timeline.status_of(1, timedelta(hours=9)) == STATUS_DELIVERED
+    with pytest.raises(KeyError):
+        timeline.status_of(2, timedelta(hours=9))
+
+
+def test_undelivered_packages_never_change_state():
+    timeline = StatusTimeline([routed_package(1, None, None), routed_package(2, timedelta(hours=8), None)])
+
+    assert timeline.status_of(1, timedelta(hours=23)) == STATUS_AT_HUB
+    assert timeline.status_of(2, timedelta(hours=23)) == STATUS_EN_ROUTE
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_counts_and_ranges_match_per_package_status(seed):
+    generator = random.Random(seed)
+    packages = []
+    for package_id in generator.sample(range(1, 500), 60):
+        # Whole minutes, so many packages share a departure or delivery time.
+        departure = 8 * 60 + generator.randrange(0, 180, 15)
+        packages.append(routed_package(package_id, timedelta(minutes=departure),
+                                       timedelta(minutes=departure + generator.randrange(0, 240, 5))))
+    timeline = StatusTimeline(packages)
+    assert len(timeline) == 60
+
+    for minutes in range(7 * 60, 16 * 60, 5):
+        time = timedelta(minutes=minutes)
+        snapshot = list(timeline.snapshot(time))
+        statuses = {package.package_id: status for package, status, _ in snapshot}
+        assert [package.package_id for package, _, _ in snapshot] == sorted(statuses)
+        assert statuses == {package.package_id: timeline.status_of(package.package_id, time) for package in packages}
+
+        expected = {STATUS_AT_HUB: 0, STATUS_EN_ROUTE: 0, STATUS_DELIVERED: 0}
+        for status in statuses.values():
+            expected[status] += 1
+        assert timeline.counts_at(time) == expected
+
+        start, end = time - timedelta(minutes=30), time
+        assert sorted(timeline.delivered_between(start, end)) == sorted(
+            package.package_id for package in packages if start <= package.delivery_time <= end)
+        assert sorted(timeline.departed_between(start, end)) == sorted(
+            package.package_id for package in packages if start <= package.departure_time <= end)
+
+
+def test_ranges_are_in_event_order():
+    packages = [routed_package(1, timedelta(hours=8), timedelta(hours=10)),
+                routed_package(2, timedelta(hours=8), timedelta(hours=9))]
+    timeline = StatusTimeline(packages)
+
+    assert timeline.delivered_between(timedelta(hours=8), timedelta(hours=12)) == [2, 1]
+
+
+def test_sample_address_before_and_after_the_correction(sample_scenario):
+    plan = main.plan_routes(*sample_scenario())
+    timeline = plan.status_timeline
+    correction_time = timedelta(hours=10, minutes=20)
+
+    assert timeline.address_at(9, correction_time - timedelta(seconds=1)) == ("300 State St", "Salt Lake City",
+                                                                               "84103")
+    assert timeline.address_at(9, correction_time) == ("410 S State St", "Salt Lake City", "84111")
+    assert timeline.address_at(9, timedelta(hours=17)) == ("410 S State St", "Salt Lake City", "84111")
+    # Packages without a correction always show their listed address.
+    package = plan.package_table.lookup(1)
+    assert timeline.address_at(1, timedelta(hours=8)) == (package.address, package.city, package.zipcode)
+
+    addresses = {package.package_id: address for package, _, address in timeline.snapshot(timedelta(hours=9))}
+    assert addresses[9] == ("300 State St", "Salt Lake City", "84103")
+
+
+def test_sample_counts(sample_scenario):
+    timeline = main.plan_routes(*sample_scenario()).status_timeline
+
+    assert timeline.counts_at(timedelta(hours=7)) == {STATUS_AT_HUB: 40, STATUS_EN_ROUTE: 0, STATUS_DELIVERED: 0}
+    assert timeline.counts_at(timedelta(hours=17)) == {STATUS_AT_HUB: 0, STATUS_EN_ROUTE: 0, STATUS_DELIVERED: 40}
+    # Package 9 and the packages delayed until 9:05 are still at the hub at 9:00.
+    at_nine = {package.package_id: status for package, status, _ in timeline.snapshot(timedelta(hours=9))}
+    assert all(at_nine[package_id] == STATUS_AT_HUB for package_id in (6, 9, 25, 28, 32))
+    assert timeline.counts_at(timedelta(hours=9))[STATUS_AT_HUB] >= 5